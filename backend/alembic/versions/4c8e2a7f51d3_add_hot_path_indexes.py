@@ -0,0 +1,67 @@
+"""add_hot_path_indexes
+
+Revision ID: 4c8e2a7f51d3
+Revises: 9e5a0741bce0
+Create Date: 2026-10-17 10:12:45.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4c8e2a7f51d3'
+down_revision: Union[str, Sequence[str], None] = '9e5a0741bce0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        'ix_pricing_record_property_id_created_at',
+        'pricing_record',
+        ['property_id', 'created_at'],
+        unique=False,
+        postgresql_include=['suggested_price'],
+    )
+    op.create_index('ix_pricing_record_created_at', 'pricing_record', ['created_at'], unique=False)
+    op.create_index(
+        'ix_transaction_property_id_created_at',
+        'transaction',
+        ['property_id', 'created_at'],
+        unique=False,
+        postgresql_include=['check_in_date', 'actual_price', 'advance_days'],
+    )
+    op.create_index(
+        'ix_feedback_pricing_record_id_created_at',
+        'feedback',
+        ['pricing_record_id', 'created_at'],
+        unique=False,
+    )
+    op.create_index(
+        'ix_message_conversation_id_created_at',
+        'message',
+        ['conversation_id', 'created_at'],
+        unique=False,
+    )
+    op.create_index(
+        'ix_conversation_status_last_active_at',
+        'conversation',
+        ['status', 'last_active_at'],
+        unique=False,
+    )
+    op.create_index('ix_property_room_type_area', 'property', ['room_type', 'area'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_property_room_type_area', table_name='property')
+    op.drop_index('ix_conversation_status_last_active_at', table_name='conversation')
+    op.drop_index('ix_message_conversation_id_created_at', table_name='message')
+    op.drop_index('ix_feedback_pricing_record_id_created_at', table_name='feedback')
+    op.drop_index('ix_transaction_property_id_created_at', table_name='transaction')
+    op.drop_index('ix_pricing_record_created_at', table_name='pricing_record')
+    op.drop_index('ix_pricing_record_property_id_created_at', table_name='pricing_record')
@@ -0,0 +1,28 @@
+"""add_message_model_profile
+
+Revision ID: 5f3c8a1d92e7
+Revises: 7b2d9c4e6a18
+Create Date: 2026-10-17 18:05:31.224816
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5f3c8a1d92e7'
+down_revision: Union[str, Sequence[str], None] = '7b2d9c4e6a18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('message', sa.Column('model_profile', sa.String(length=20), nullable=True, comment='生成该回复的模型档位'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('message', 'model_profile')
@@ -0,0 +1,30 @@
+"""add_conversation_summary
+
+Revision ID: 7b2d9c4e6a18
+Revises: 4c8e2a7f51d3
+Create Date: 2026-10-17 15:40:12.507316
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7b2d9c4e6a18'
+down_revision: Union[str, Sequence[str], None] = '4c8e2a7f51d3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('conversation', sa.Column('summary', sa.Text(), nullable=True, comment='早期对话的滚动摘要'))
+    op.add_column('conversation', sa.Column('summary_until_id', sa.Integer(), nullable=True, comment='摘要已覆盖的最后一条消息 id'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('conversation', 'summary_until_id')
+    op.drop_column('conversation', 'summary')
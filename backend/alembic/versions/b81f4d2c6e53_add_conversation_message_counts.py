@@ -0,0 +1,36 @@
+"""add_conversation_message_counts
+
+Revision ID: b81f4d2c6e53
+Revises: 5f3c8a1d92e7
+Create Date: 2026-10-17 20:12:47.381025
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b81f4d2c6e53'
+down_revision: Union[str, Sequence[str], None] = '5f3c8a1d92e7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('conversation', sa.Column('message_count', sa.Integer(), server_default='0', nullable=False, comment='消息数'))
+    op.add_column('conversation', sa.Column('user_message_count', sa.Integer(), server_default='0', nullable=False, comment='用户消息数'))
+    op.execute(
+        "UPDATE conversation SET "
+        "message_count = (SELECT count(*) FROM message WHERE message.conversation_id = conversation.id), "
+        "user_message_count = (SELECT count(*) FROM message "
+        "WHERE message.conversation_id = conversation.id AND message.role = 'user')"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('conversation', 'user_message_count')
+    op.drop_column('conversation', 'message_count')
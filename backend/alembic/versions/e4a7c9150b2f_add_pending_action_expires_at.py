@@ -0,0 +1,38 @@
+"""add_pending_action_expires_at
+
+Revision ID: e4a7c9150b2f
+Revises: b81f4d2c6e53
+Create Date: 2026-10-17 21:03:18.662907
+
+"""
+from datetime import datetime, timedelta
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4a7c9150b2f'
+down_revision: Union[str, Sequence[str], None] = 'b81f4d2c6e53'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('pending_action', sa.Column('expires_at', sa.DateTime(), nullable=True, comment='过期时间，过期后无法确认并由后台任务清理'))
+    # 已有的待确认操作从迁移时起保留默认有效期（30 分钟），之后由后台任务清理
+    op.execute(
+        sa.text('UPDATE pending_action SET expires_at = :expires_at')
+        .bindparams(expires_at=datetime.utcnow() + timedelta(minutes=30))
+    )
+    with op.batch_alter_table('pending_action') as batch_op:
+        batch_op.alter_column('expires_at', existing_type=sa.DateTime(), nullable=False)
+    op.create_index('ix_pending_action_expires_at', 'pending_action', ['expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_pending_action_expires_at', table_name='pending_action')
+    op.drop_column('pending_action', 'expires_at')
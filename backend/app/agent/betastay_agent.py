@@ -1,9 +1,12 @@
 from langchain.agents import create_agent
 from langchain_community.chat_models import ChatTongyi
 from app.core.config import settings
+from app.agent.checkpointer import get_checkpointer
+from app.agent.fake_model import FakeStreamingChatModel
+from app.agent.middleware import ContextMessageMiddleware, ModelProfileMiddleware
 from app.agent.prompts import SYSTEM_PROMPT
 from app.tools.property_tool import property_create_tool, property_query_tool, show_property_form_tool
-from app.tools.pricing_tool import pricing_calculate_tool
+from app.tools.pricing_tool import pricing_calculate_range_tool, pricing_calculate_tool
 from app.tools.feedback_tool import feedback_record_tool
 from app.tools.excel_tool import excel_parse_tool
 from app.tools.datetime_tool import get_current_time_tool
@@ -15,26 +18,79 @@ def get_tools():
         property_query_tool,
         show_property_form_tool,
         pricing_calculate_tool,
+        pricing_calculate_range_tool,
         feedback_record_tool,
         excel_parse_tool,
         get_current_time_tool,
     ]
 
 
-def create_betastay_agent(checkpointer=None):
-    """创建BetaStay Agent实例"""
-    model = ChatTongyi(
-        model=settings.DASHSCOPE_MODEL,
+def create_chat_model(profile: dict):
+    """按档位配置创建流式对话模型：model 缺省为 DASHSCOPE_MODEL，enable_thinking 控制深度思考。
+    LLM_PROVIDER=fake 时使用本地模拟模型"""
+    if settings.LLM_PROVIDER == "fake":
+        return FakeStreamingChatModel.from_settings(profile.get("enable_thinking", True))
+    return ChatTongyi(
+        model=profile.get("model") or settings.DASHSCOPE_MODEL,
         streaming=True,
-        model_kwargs={"enable_thinking": True, "incremental_output": True},
+        model_kwargs={
+            "enable_thinking": profile.get("enable_thinking", True),
+            "incremental_output": True,
+        },
         api_key=settings.DASHSCOPE_API_KEY,
     )
 
+
+def create_betastay_agent(checkpointer=None):
+    """创建BetaStay Agent实例，每轮按 model_profile_var 选择的档位调用对应模型"""
+    models = {
+        name: create_chat_model(profile)
+        for name, profile in settings.MODEL_PROFILES.items()
+    }
+
     agent = create_agent(
-        model=model,
+        model=models[settings.MODEL_DEFAULT_PROFILE],
         tools=get_tools(),
         system_prompt=SYSTEM_PROMPT,
+        middleware=[ContextMessageMiddleware(), ModelProfileMiddleware(models)],
         checkpointer=checkpointer,
     )
 
     return agent
+
+
+_shared_agent = None
+
+
+def get_betastay_agent():
+    """获取进程内共享的 Agent 实例。
+
+    编译后的图与模型客户端不保存请求状态，可在并发请求间复用；
+    DB Session 等请求级状态通过 app.tools.context 的 ContextVar 传入。
+    DashScope SDK 在进程内复用同一个 HTTP 连接池，共享客户端即可复用连接。
+    checkpointer 被替换后（应用启动、测试）重新编译。
+    """
+    global _shared_agent
+    checkpointer = get_checkpointer()
+    if _shared_agent is None or _shared_agent.checkpointer is not checkpointer:
+        _shared_agent = create_betastay_agent(checkpointer=checkpointer)
+    return _shared_agent
+
+
+_summary_model = None
+
+
+def get_summary_model():
+    """压缩对话历史使用的模型：非流式、不开启思考，进程内共享"""
+    global _summary_model
+    if _summary_model is None:
+        if settings.LLM_PROVIDER == "fake":
+            # 摘要只需要正文，不发出工具调用
+            fake = FakeStreamingChatModel.from_settings(enable_thinking=False)
+            _summary_model = fake.model_copy(update={"tool_calls": []})
+        else:
+            _summary_model = ChatTongyi(
+                model=settings.DASHSCOPE_MODEL,
+                api_key=settings.DASHSCOPE_API_KEY,
+            )
+    return _summary_model
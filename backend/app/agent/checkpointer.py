@@ -0,0 +1,62 @@
+"""
+LangGraph 会话状态持久化。
+
+每个会话对应一个 thread（thread_id = conversation_id），每轮只需把新消息追加到线程状态。
+数据库为 PostgreSQL 时使用 AsyncPostgresSaver（连接池），其余情况（本地开发、测试）使用进程内存。
+"""
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from langgraph.checkpoint.memory import InMemorySaver
+from sqlalchemy.engine import make_url
+
+from app.core.config import settings
+
+CHECKPOINT_POOL_SIZE = 10
+
+_checkpointer: BaseCheckpointSaver | None = None
+
+
+def _postgres_conninfo(url: str) -> str | None:
+    """SQLAlchemy 连接串转换为 psycopg 连接串；非 PostgreSQL 时返回 None"""
+    parsed = make_url(url)
+    if parsed.get_backend_name() != "postgresql":
+        return None
+    return parsed.set(drivername="postgresql").render_as_string(hide_password=False)
+
+
+@asynccontextmanager
+async def open_checkpointer() -> AsyncIterator[BaseCheckpointSaver]:
+    """按配置创建 checkpointer，并在退出时释放连接（供应用 lifespan 使用）"""
+    conninfo = _postgres_conninfo(settings.DATABASE_URL)
+    if conninfo is None:
+        yield InMemorySaver()
+        return
+
+    from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
+    from psycopg.rows import dict_row
+    from psycopg_pool import AsyncConnectionPool
+
+    async with AsyncConnectionPool(
+        conninfo=conninfo,
+        max_size=CHECKPOINT_POOL_SIZE,
+        kwargs={"autocommit": True, "prepare_threshold": 0, "row_factory": dict_row},
+    ) as pool:
+        saver = AsyncPostgresSaver(pool)
+        await saver.setup()
+        yield saver
+
+
+def get_checkpointer() -> BaseCheckpointSaver:
+    """进程内共享的 checkpointer；未经 lifespan 配置时退回进程内存"""
+    global _checkpointer
+    if _checkpointer is None:
+        _checkpointer = InMemorySaver()
+    return _checkpointer
+
+
+def configure_checkpointer(checkpointer: BaseCheckpointSaver | None) -> None:
+    """替换 checkpointer（lifespan 与测试使用）；传 None 则下次退回进程内存"""
+    global _checkpointer
+    _checkpointer = checkpointer
@@ -0,0 +1,105 @@
+"""
+本地模拟模型：按脚本流式输出思考、工具调用与正文，不发起网络请求。
+
+用于压测与联调（LLM_PROVIDER=fake），输出确定、可复现。脚本格式见 Settings.FAKE_LLM_SCRIPT：
+- 本轮第一次调用（最后一条不是工具结果）：先输出 reasoning 思考片段；脚本带 tool_calls 时发出工具调用，否则输出 reply
+- 工具执行完成后的调用：输出 reply 正文
+
+文本按 chunk_chars 个字符切成片段，首个片段前等待 first_token_delay 秒，之后每个片段间隔 token_delay 秒。
+"""
+import asyncio
+import json
+from typing import Any, AsyncIterator, Iterator
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from app.core.config import settings
+
+
+class FakeStreamingChatModel(BaseChatModel):
+    """按脚本输出的流式对话模型，工具绑定被忽略（脚本直接给出工具名与参数）"""
+
+    reasoning: str = ""
+    tool_calls: list[dict] = []
+    reply: str = "好的。"
+    enable_thinking: bool = True
+    first_token_delay: float = 0.0
+    token_delay: float = 0.0
+    chunk_chars: int = 2
+
+    @classmethod
+    def from_settings(cls, enable_thinking: bool = True) -> "FakeStreamingChatModel":
+        script = settings.FAKE_LLM_SCRIPT
+        return cls(
+            **{key: script[key] for key in ("reasoning", "tool_calls", "reply") if key in script},
+            enable_thinking=enable_thinking,
+            first_token_delay=settings.FAKE_LLM_FIRST_TOKEN_MS / 1000,
+            token_delay=settings.FAKE_LLM_TOKEN_DELAY_MS / 1000,
+            chunk_chars=settings.FAKE_LLM_CHUNK_CHARS,
+        )
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-streaming"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _split(self, text: str) -> list[str]:
+        return [text[i:i + self.chunk_chars] for i in range(0, len(text), self.chunk_chars)]
+
+    def _script_chunks(self, messages: list[BaseMessage]) -> list[AIMessageChunk]:
+        """本次调用要输出的消息片段"""
+        after_tool = bool(messages) and isinstance(messages[-1], ToolMessage)
+        chunks = []
+        if self.enable_thinking and self.reasoning and not after_tool:
+            chunks += [
+                AIMessageChunk(content="", additional_kwargs={"reasoning_content": piece})
+                for piece in self._split(self.reasoning)
+            ]
+        if self.tool_calls and not after_tool:
+            turn = sum(isinstance(m, ToolMessage) for m in messages)
+            chunks.append(AIMessageChunk(content="", tool_call_chunks=[
+                {
+                    "name": call["name"],
+                    "args": json.dumps(call.get("args", {}), ensure_ascii=False),
+                    "id": f"fake-call-{turn}-{index}",
+                    "index": index,
+                }
+                for index, call in enumerate(self.tool_calls)
+            ]))
+        else:
+            chunks += [AIMessageChunk(content=piece) for piece in self._split(self.reply)]
+        return chunks
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        merged = AIMessageChunk(content="")
+        for chunk in self._script_chunks(messages):
+            merged += chunk
+        message = AIMessage(
+            content=merged.content,
+            additional_kwargs=merged.additional_kwargs,
+            tool_calls=merged.tool_calls,
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        for message in self._script_chunks(messages):
+            chunk = ChatGenerationChunk(message=message)
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+    async def _astream(
+        self, messages, stop=None, run_manager=None, **kwargs: Any
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        for index, message in enumerate(self._script_chunks(messages)):
+            delay = self.first_token_delay if index == 0 else self.token_delay
+            if delay:
+                await asyncio.sleep(delay)
+            chunk = ChatGenerationChunk(message=message)
+            if run_manager:
+                await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
@@ -0,0 +1,49 @@
+from langchain.agents.middleware import AgentMiddleware, ModelRequest
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import SystemMessage
+
+from app.agent.model_router import model_profile_var
+
+
+class ContextMessageMiddleware(AgentMiddleware):
+    """把线程中的 system 消息（历史摘要、置顶上下文）并入系统提示词。
+
+    DashScope 要求 system 消息位于首位，压缩历史时写入线程的 system 消息不能原样发送。
+    """
+
+    def _merge(self, request: ModelRequest) -> ModelRequest:
+        context = [m for m in request.messages if isinstance(m, SystemMessage)]
+        if not context:
+            return request
+        parts = [request.system_message.content] if request.system_message else []
+        parts.extend(m.content for m in context)
+        return request.override(
+            system_message=SystemMessage(content="\n\n".join(parts)),
+            messages=[m for m in request.messages if not isinstance(m, SystemMessage)],
+        )
+
+    def wrap_model_call(self, request, handler):
+        return handler(self._merge(request))
+
+    async def awrap_model_call(self, request, handler):
+        return await handler(self._merge(request))
+
+
+class ModelProfileMiddleware(AgentMiddleware):
+    """按本轮选定的档位（model_profile_var）替换调用的模型，未设置档位时使用 Agent 的默认模型"""
+
+    def __init__(self, models: dict[str, BaseChatModel]):
+        super().__init__()
+        self.models = models
+
+    def _select(self, request: ModelRequest) -> ModelRequest:
+        model = self.models.get(model_profile_var.get(None))
+        if model is None or model is request.model:
+            return request
+        return request.override(model=model)
+
+    def wrap_model_call(self, request, handler):
+        return handler(self._select(request))
+
+    async def awrap_model_call(self, request, handler):
+        return await handler(self._select(request))
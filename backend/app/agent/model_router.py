@@ -0,0 +1,53 @@
+"""
+按轮次选择模型档位。
+
+寒暄、简单查询等短消息用 fast 档（不开启思考），定价、反馈、录入等需要推理或写入的消息用 max 档（开启思考）。
+分类只用关键词与长度等廉价规则，不额外调用模型；拿不准时用 max 档，保证定价问题的回答质量。
+档位的模型与参数在 Settings.MODEL_PROFILES 中配置。
+"""
+from contextvars import ContextVar
+
+from prometheus_client import Counter
+
+from app.core.config import settings
+
+FAST_PROFILE = "fast"
+MAX_PROFILE = "max"
+
+# 本轮选定的档位，由 ModelProfileMiddleware 读取
+model_profile_var: ContextVar[str] = ContextVar("model_profile")
+
+PROFILE_SELECTED = Counter("chat_model_profile_total", "各模型档位被选中的轮数", ["profile"])
+
+# 定价、反馈：需要解释计算依据或理解房东的诉求
+REASONING_KEYWORDS = (
+    "价", "收益", "入住", "空置", "节假日", "旺季", "淡季", "为什么", "怎么算", "分析", "建议",
+    "反馈", "太贵", "太便宜", "偏高", "偏低", "没人订", "订满",
+)
+# 录入、导入等写操作：需要准确构造工具参数
+WRITE_KEYWORDS = ("[房源表单提交]", "录入", "新建", "添加", "新增", "修改", "导入", "表格", "Excel", "excel")
+# 只读查询：一次简单工具调用即可回答
+LOOKUP_KEYWORDS = ("查询", "查看", "查一下", "列表", "有哪些", "房源信息", "几点", "今天几号", "星期几")
+
+
+def classify_turn(text: str) -> str:
+    """按消息内容选择档位"""
+    text = text.strip()
+    if any(k in text for k in REASONING_KEYWORDS + WRITE_KEYWORDS):
+        return MAX_PROFILE
+    if len(text) <= settings.MODEL_FAST_MAX_CHARS:
+        return FAST_PROFILE
+    if any(k in text for k in LOOKUP_KEYWORDS):
+        return FAST_PROFILE
+    return MAX_PROFILE
+
+
+def select_profile(text: str) -> str:
+    """本轮使用的档位；关闭路由或档位未配置时使用默认档位"""
+    profile = settings.MODEL_DEFAULT_PROFILE
+    if settings.MODEL_ROUTING:
+        chosen = classify_turn(text)
+        if chosen in settings.MODEL_PROFILES:
+            profile = chosen
+    PROFILE_SELECTED.labels(profile).inc()
+    return profile
@@ -0,0 +1,53 @@
+"""
+Token 数估算：优先使用 DashScope SDK 自带的 Qwen 分词器（依赖 tiktoken），
+不可用时退回按字符估算（中文约 1 字 1 token，其余约 4 字符 1 token）。
+"""
+import json
+import re
+from functools import lru_cache
+from typing import Any
+
+# 每条消息的角色、分隔符等固定开销
+MESSAGE_OVERHEAD_TOKENS = 4
+
+_CJK_PATTERN = re.compile(r"[\u3000-\u303f\u4e00-\u9fff\uff00-\uffef]")
+
+
+@lru_cache(maxsize=1)
+def _get_tokenizer():
+    try:
+        from dashscope import get_tokenizer
+
+        return get_tokenizer("qwen-turbo")
+    except ImportError:
+        return None
+
+
+def estimate_tokens(text: str) -> int:
+    """估算一段文本的 token 数"""
+    if not text:
+        return 0
+    tokenizer = _get_tokenizer()
+    if tokenizer is not None:
+        return len(tokenizer.encode(text))
+    cjk = len(_CJK_PATTERN.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def _message_text(message: Any) -> str:
+    if isinstance(message, dict):
+        content = message.get("content", "")
+        tool_calls = message.get("tool_calls")
+    else:
+        content = message.content
+        tool_calls = getattr(message, "tool_calls", None)
+    if not isinstance(content, str):
+        content = json.dumps(content, ensure_ascii=False)
+    if tool_calls:
+        content += json.dumps(tool_calls, ensure_ascii=False, default=str)
+    return content
+
+
+def estimate_messages_tokens(messages: list) -> int:
+    """估算消息列表的 token 数，消息可以是 dict 或 LangChain 消息对象"""
+    return sum(estimate_tokens(_message_text(m)) + MESSAGE_OVERHEAD_TOKENS for m in messages)
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Request
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -11,10 +11,20 @@ from app.services import (
     property_service,
 )
 from app.services.action_store import pop_pending_action
+from app.services.admission import AdmissionRejected
+from app.services.replay_buffer import get_generation, parse_event_id
 
 router = APIRouter(prefix="/chat", tags=["chat"])
 
 
+def _check_admission(conversation_id: str) -> None:
+    """会话正在生成返回 409，排队已满返回 503"""
+    try:
+        chat_service.check_admission(conversation_id)
+    except AdmissionRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
+
+
 class ConversationCreate(BaseModel):
     title: str | None = None
 
@@ -69,6 +79,7 @@ async def delete_conversation(conversation_id: str, db: AsyncSession = Depends(g
     success = await conversation_service.delete_conversation(db, conversation_id)
     if not success:
         raise HTTPException(status_code=404, detail="Conversation not found")
+    await chat_service.reset_thread(conversation_id)
     return {"success": True}
 
 
@@ -80,20 +91,27 @@ async def send_message(
     conv = await conversation_service.get_conversation(db, conversation_id)
     if not conv:
         raise HTTPException(status_code=404, detail="Conversation not found")
-    return await chat_service.process_message(db, conversation_id, data.content)
+    try:
+        return await chat_service.process_message(db, conversation_id, data.content)
+    except AdmissionRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
 
 
 @router.post("/conversations/{conversation_id}/messages/stream")
 async def send_message_stream(
-    conversation_id: str, data: MessageSend, db: AsyncSession = Depends(get_db)
+    conversation_id: str,
+    data: MessageSend,
+    request: Request,
+    db: AsyncSession = Depends(get_db),
 ):
     """流式发送消息，返回SSE事件流"""
     conv = await conversation_service.get_conversation(db, conversation_id)
     if not conv:
         raise HTTPException(status_code=404, detail="Conversation not found")
+    _check_admission(conversation_id)
 
     return StreamingResponse(
-        chat_service.stream_message(db, conversation_id, data.content),
+        chat_service.stream_message(db, conversation_id, data.content, request),
         media_type="text/event-stream",
         headers={
             "Cache-Control": "no-cache",
@@ -105,15 +123,21 @@ async def send_message_stream(
 
 @router.post("/conversations/{conversation_id}/messages/edit")
 async def edit_message_stream(
-    conversation_id: str, data: MessageEdit, db: AsyncSession = Depends(get_db)
+    conversation_id: str,
+    data: MessageEdit,
+    request: Request,
+    db: AsyncSession = Depends(get_db),
 ):
     """编辑消息后重新生成，返回SSE事件流"""
     conv = await conversation_service.get_conversation(db, conversation_id)
     if not conv:
         raise HTTPException(status_code=404, detail="Conversation not found")
+    _check_admission(conversation_id)
 
     return StreamingResponse(
-        chat_service.stream_edit(db, conversation_id, data.message_id, data.content),
+        chat_service.stream_edit(
+            db, conversation_id, data.message_id, data.content, request
+        ),
         media_type="text/event-stream",
         headers={
             "Cache-Control": "no-cache",
@@ -125,15 +149,48 @@ async def edit_message_stream(
 
 @router.post("/conversations/{conversation_id}/messages/regenerate")
 async def regenerate_message_stream(
-    conversation_id: str, data: MessageRegenerate, db: AsyncSession = Depends(get_db)
+    conversation_id: str,
+    data: MessageRegenerate,
+    request: Request,
+    db: AsyncSession = Depends(get_db),
 ):
     """重新生成AI回复，返回SSE事件流"""
     conv = await conversation_service.get_conversation(db, conversation_id)
     if not conv:
         raise HTTPException(status_code=404, detail="Conversation not found")
+    _check_admission(conversation_id)
+
+    return StreamingResponse(
+        chat_service.stream_regenerate(db, conversation_id, data.message_id, request),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "X-Accel-Buffering": "no",
+        },
+    )
+
+
+@router.get("/conversations/{conversation_id}/messages/stream/resume")
+async def resume_message_stream(
+    conversation_id: str,
+    request: Request,
+    last_event_id: str | None = Header(default=None),
+):
+    """断线重连：按 Last-Event-ID 重放错过的事件，再继续接收实时输出，不重新调用模型"""
+    parsed = parse_event_id(last_event_id or "")
+    if parsed is None:
+        raise HTTPException(status_code=400, detail="缺少或无效的 Last-Event-ID")
+    generation_id, after = parsed
+
+    generation = get_generation(generation_id)
+    if not generation or generation.conversation_id != conversation_id:
+        raise HTTPException(status_code=404, detail="生成已结束或不存在")
+    if not generation.can_resume(after):
+        raise HTTPException(status_code=409, detail="错过的事件已过期，请重新生成")
 
     return StreamingResponse(
-        chat_service.stream_regenerate(db, conversation_id, data.message_id),
+        chat_service.resume_stream(generation, after, request),
         media_type="text/event-stream",
         headers={
             "Cache-Control": "no-cache",
@@ -152,6 +209,7 @@ async def get_messages(conversation_id: str, db: AsyncSession = Depends(get_db))
             "role": m.role,
             "content": m.content,
             "created_at": m.created_at.isoformat(),
+            "model_profile": m.model_profile,
         }
         for m in messages
     ]
@@ -173,12 +231,9 @@ async def confirm_action(
 
     if action_type == "create_property":
         result = await property_service.create_property(db, action_data)
-        await conversation_service.save_message(
-            db,
-            conversation_id,
-            "assistant",
-            f"房源「{result.name}」已成功录入（ID: {result.id}）",
-        )
+        note = f"房源「{result.name}」已成功录入（ID: {result.id}）"
+        await conversation_service.save_message(db, conversation_id, "assistant", note)
+        await chat_service.append_to_thread(conversation_id, note)
         return {
             "success": True,
             "type": "property",
@@ -188,12 +243,9 @@ async def confirm_action(
 
     elif action_type == "record_feedback":
         result = await feedback_service.create_feedback(db, action_data)
-        await conversation_service.save_message(
-            db,
-            conversation_id,
-            "assistant",
-            f"反馈已记录（ID: {result.id}，类型: {result.feedback_type}）",
-        )
+        note = f"反馈已记录（ID: {result.id}，类型: {result.feedback_type}）"
+        await conversation_service.save_message(db, conversation_id, "assistant", note)
+        await chat_service.append_to_thread(conversation_id, note)
         return {"success": True, "type": "feedback", "id": result.id}
 
     else:
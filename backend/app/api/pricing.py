@@ -1,12 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
-from datetime import date
+from datetime import date, timedelta
 from app.core.database import get_db
 from app.services import pricing_service
 
 router = APIRouter(prefix="/pricing", tags=["pricing"])
 
+MAX_BATCH_DAYS = 366
+
 
 class PricingCalculateRequest(BaseModel):
     property_id: int
@@ -14,6 +16,13 @@ class PricingCalculateRequest(BaseModel):
     base_price: float | None = None
 
 
+class PricingBatchRequest(BaseModel):
+    start_date: date  # YYYY-MM-DD，格式错误返回 422
+    end_date: date  # YYYY-MM-DD，含当天
+    property_ids: list[int] | None = None  # 不传则对全部房源定价
+    save: bool = False
+
+
 class PricingRecordResponse(BaseModel):
     id: int
     property_id: int
@@ -45,6 +54,31 @@ async def calculate_pricing(data: PricingCalculateRequest, db: AsyncSession = De
     }
 
 
+@router.post("/batch")
+async def calculate_pricing_batch(data: PricingBatchRequest, db: AsyncSession = Depends(get_db)):
+    start, end = data.start_date, data.end_date
+    if end < start:
+        raise HTTPException(status_code=400, detail="end_date must not be earlier than start_date")
+    if (end - start).days >= MAX_BATCH_DAYS:
+        raise HTTPException(status_code=400, detail=f"Date range must not exceed {MAX_BATCH_DAYS} days")
+
+    dates = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+    matrix = await pricing_service.calculate_batch(db, dates, data.property_ids, data.save)
+    return {
+        "dates": [d.isoformat() for d in dates],
+        "properties": [
+            {
+                "property_id": pid,
+                "conservative_price": matrix["conservative_price"][i].tolist(),
+                "suggested_price": matrix["suggested_price"][i].tolist(),
+                "aggressive_price": matrix["aggressive_price"][i].tolist(),
+            }
+            for i, pid in enumerate(matrix["property_ids"].tolist())
+        ],
+        "saved_count": matrix["saved_count"],
+    }
+
+
 @router.get("/records/{property_id}")
 async def list_pricing_records(property_id: int, db: AsyncSession = Depends(get_db)):
     records = await pricing_service.list_by_property(db, property_id)
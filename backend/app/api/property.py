@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
 from app.core.database import get_db
@@ -64,8 +64,26 @@ async def get_property(property_id: int, db: AsyncSession = Depends(get_db)):
 
 
 @router.get("", response_model=list[PropertyResponse])
-async def list_properties(db: AsyncSession = Depends(get_db)):
-    return await property_service.list_properties(db)
+async def list_properties(
+    keyword: str | None = None,
+    room_type: str | None = None,
+    min_area: float | None = None,
+    max_area: float | None = None,
+    price_from: float | None = None,
+    price_to: float | None = None,
+    after_id: int | None = None,
+    limit: int | None = Query(None, ge=1, le=200),
+    db: AsyncSession = Depends(get_db),
+):
+    filters = property_service.PropertyFilter(
+        keyword=keyword,
+        room_type=room_type,
+        min_area=min_area,
+        max_area=max_area,
+        price_from=price_from,
+        price_to=price_to,
+    )
+    return await property_service.list_properties(db, filters, after_id=after_id, limit=limit)
 
 
 @router.put("/{property_id}", response_model=PropertyResponse)
@@ -1,4 +1,5 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Response
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 from app.api.property import router as property_router
 from app.api.upload import router as upload_router
 from app.api.chat import router as chat_router
@@ -18,3 +19,9 @@ api_router.include_router(dashboard_router)
 @api_router.get("/health")
 async def health_check():
     return {"status": "ok", "app": "BetaStay"}
+
+
+@api_router.get("/metrics")
+async def metrics():
+    """Prometheus 指标（模型调用排队深度、等待时间等）"""
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
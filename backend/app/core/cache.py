@@ -0,0 +1,82 @@
+"""
+通用键值缓存：默认进程内 TTL 缓存，配置 REDIS_URL 时使用 Redis。
+
+缓存只用于加速读取，后端异常时按未命中处理，不影响业务请求。
+"""
+import json
+import logging
+import time
+from typing import Any
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryCache:
+    """进程内 TTL 缓存，命中时直接返回已缓存的对象"""
+
+    def __init__(self):
+        self._data: dict[str, tuple[float, Any]] = {}
+
+    async def get(self, key: str) -> Any | None:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            self._data.pop(key, None)
+            return None
+        return value
+
+    async def set(self, key: str, value: Any, ttl: int) -> None:
+        self._data[key] = (time.monotonic() + ttl, value)
+
+    async def delete(self, key: str) -> None:
+        self._data.pop(key, None)
+
+
+class RedisCache:
+    """Redis 缓存，值以 JSON 存储，多进程共享"""
+
+    def __init__(self, url: str):
+        from redis.asyncio import from_url
+
+        self._client = from_url(url, decode_responses=True)
+
+    async def get(self, key: str) -> Any | None:
+        try:
+            raw = await self._client.get(key)
+        except Exception as e:
+            logger.warning("redis cache get failed: %s", e)
+            return None
+        return json.loads(raw) if raw is not None else None
+
+    async def set(self, key: str, value: Any, ttl: int) -> None:
+        try:
+            await self._client.set(key, json.dumps(value, ensure_ascii=False), ex=ttl)
+        except Exception as e:
+            logger.warning("redis cache set failed: %s", e)
+
+    async def delete(self, key: str) -> None:
+        try:
+            await self._client.delete(key)
+        except Exception as e:
+            logger.warning("redis cache delete failed: %s", e)
+
+
+_cache: MemoryCache | RedisCache | None = None
+
+
+def get_cache() -> MemoryCache | RedisCache:
+    """进程内共享的缓存实例，首次调用时按配置创建"""
+    global _cache
+    if _cache is None:
+        _cache = RedisCache(settings.REDIS_URL) if settings.REDIS_URL else MemoryCache()
+    return _cache
+
+
+def configure_cache(cache: MemoryCache | RedisCache | None) -> None:
+    """替换缓存实例（测试使用）；传 None 则下次按配置重新创建"""
+    global _cache
+    _cache = cache
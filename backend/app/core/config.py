@@ -14,7 +14,68 @@ class Settings(BaseSettings):
     DATABASE_URL_SYNC: str = os.getenv("DATABASE_URL_SYNC")
 
     # Redis
-    REDIS_URL: str = os.getenv("REDIS_URL")
+    REDIS_URL: str | None = os.getenv("REDIS_URL")
+
+    # Cache
+    DASHBOARD_CACHE_TTL: int = 60  # 首页概览缓存秒数
+
+    # 对话历史压缩
+    HISTORY_TOKEN_BUDGET: int = 6000  # 送入模型的历史消息 token 上限
+    HISTORY_KEEP_TURNS: int = 6  # 原文保留的最近对话轮数
+    HISTORY_SUMMARY_MAX_TOKENS: int = 800  # 滚动摘要的 token 上限
+
+    # SSE 流式输出
+    SSE_COALESCE_MS: int = 30  # 文本片段合并窗口（毫秒），0 表示逐片段发送
+    SSE_COALESCE_MAX_BYTES: int = 1024  # 合并帧的字节上限，达到即发送
+    SSE_REPLAY_BUFFER_SIZE: int = 2048  # 每次生成保留的可重放帧数
+    SSE_REPLAY_TTL: int = 300  # 生成结束后重放缓冲的保留秒数
+    SSE_DISCONNECT_GRACE: float = 15  # 连接全部断开后等待重连的秒数，超时取消生成
+    SSE_DISCONNECT_POLL: float = 1.0  # 检测连接断开的轮询间隔秒数
+
+    # 消息持久化
+    MESSAGE_WRITE_BEHIND: bool = False  # 流式回复的助手消息交给后台批量写入，done 事件不等待落库
+    MESSAGE_WRITE_QUEUE_SIZE: int = 1000  # 后台写入队列长度上限，队列满时入队等待
+    MESSAGE_WRITE_BATCH_SIZE: int = 100  # 每个事务最多插入的消息数
+
+    # 待确认操作
+    # 存储后端：redis（原生 TTL，多进程共享）、memory（进程内 LRU，单实例部署）、sql（数据库表）
+    # auto 时配置了 REDIS_URL 用 redis，否则用 sql
+    PENDING_ACTION_STORE: str = "auto"
+    PENDING_ACTION_TTL: int = 1800  # 待确认操作的有效秒数，过期后无法确认
+    PENDING_ACTION_MEMORY_CAPACITY: int = 10000  # memory 后端保留的操作数上限，超出淘汰最久未访问的
+    PENDING_ACTION_SWEEP_INTERVAL: float = 60  # sql 后端清理过期操作的间隔秒数
+    PENDING_ACTION_SWEEP_BATCH: int = 500  # sql 后端每个事务最多删除的过期操作数
+
+    # 模型调用准入控制
+    LLM_MAX_CONCURRENCY: int = 8  # 全局同时进行的模型调用数上限
+    LLM_QUEUE_SIZE: int = 32  # 等待队列长度上限，超出直接拒绝
+    LLM_QUEUE_TIMEOUT: float = 30  # 排队超过该秒数放弃
+
+    # 意图快速通道
+    INTENT_FAST_PATH: bool = True  # 意图明确的短消息直接执行工具，不调用模型
+
+    # 模型档位：fast 用于寒暄、简单查询，max 用于定价、反馈等需要推理的轮次
+    # model 缺省为 DASHSCOPE_MODEL；可通过环境变量以 JSON 覆盖
+    MODEL_PROFILES: dict[str, dict] = {
+        "fast": {"model": "qwen-plus", "enable_thinking": False},
+        "max": {"enable_thinking": True},
+    }
+    MODEL_DEFAULT_PROFILE: str = "max"  # 关闭路由或无法判断时使用的档位
+    MODEL_ROUTING: bool = True  # 是否按消息内容选择档位
+    MODEL_FAST_MAX_CHARS: int = 12  # 不含定价/写入意图且不超过该长度的消息使用 fast 档
+
+    # 模型来源：dashscope 调用通义千问；fake 使用本地模拟模型（压测、联调，不发起网络请求）
+    LLM_PROVIDER: str = "dashscope"
+    # 模拟模型脚本：reasoning 思考内容，tool_calls 本轮调用的工具（[{"name", "args"}]），reply 最终回复
+    FAKE_LLM_SCRIPT: dict = {
+        "reasoning": "用户想了解房源情况，我先查询房源列表，再根据结果给出建议。",
+        "tool_calls": [{"name": "property_query", "args": {"limit": 5}}],
+        "reply": "根据查询结果，您目前的房源整体定价处于同类房源的中等水平。"
+        "建议周末和节假日适当上调价格，工作日保持现有价格以维持入住率。如需具体日期的定价建议，请告诉我房源和日期。",
+    }
+    FAKE_LLM_FIRST_TOKEN_MS: float = 300  # 首个片段前的等待（毫秒），模拟模型排队与预填充
+    FAKE_LLM_TOKEN_DELAY_MS: float = 20  # 片段间隔（毫秒）
+    FAKE_LLM_CHUNK_CHARS: int = 2  # 每个片段的字符数
 
     # Dashscope
     DASHSCOPE_API_KEY: str = os.getenv("DASHSCOPE_API_KEY")
@@ -1,5 +1,7 @@
+from prometheus_client import Gauge
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.pool import QueuePool
 
 from app.core.config import settings
 
@@ -12,6 +14,23 @@ engine = create_async_engine(
 async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
 
+def _pool_checked_out() -> int:
+    pool = engine.pool
+    return pool.checkedout() if isinstance(pool, QueuePool) else 0
+
+
+def _pool_capacity() -> int:
+    pool = engine.pool
+    return pool.size() + pool._max_overflow if isinstance(pool, QueuePool) else 0
+
+
+# 连接池占用情况，抓取时读取；饱和度 = checked_out / capacity（非 QueuePool 时均为 0）
+POOL_CHECKED_OUT = Gauge("db_pool_checked_out", "数据库连接池已借出的连接数")
+POOL_CHECKED_OUT.set_function(_pool_checked_out)
+POOL_CAPACITY = Gauge("db_pool_capacity", "数据库连接池最多可借出的连接数（pool_size + max_overflow）")
+POOL_CAPACITY.set_function(_pool_capacity)
+
+
 class Base(DeclarativeBase):
     pass
 
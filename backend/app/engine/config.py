@@ -1,3 +1,5 @@
+from pathlib import Path
+
 # 因素权重配置
 WEIGHTS = {
     "owner_preference": 0.35,
@@ -21,12 +23,9 @@ PRICE_TIERS = {
     "aggressive_offset": 0.10,        # 激进价上浮10%
 }
 
-# 中国法定节假日 (2026年示例，后续可配置化)
-HOLIDAYS_2026 = {
-    "元旦": ["2026-01-01", "2026-01-02", "2026-01-03"],
-    "春节": ["2026-02-17", "2026-02-18", "2026-02-19", "2026-02-20", "2026-02-21", "2026-02-22", "2026-02-23"],
-    "清明": ["2026-04-04", "2026-04-05", "2026-04-06"],
-    "劳动节": ["2026-05-01", "2026-05-02", "2026-05-03", "2026-05-04", "2026-05-05"],
-    "端午": ["2026-06-19", "2026-06-20", "2026-06-21"],
-    "中秋+国庆": ["2026-10-01", "2026-10-02", "2026-10-03", "2026-10-04", "2026-10-05", "2026-10-06", "2026-10-07", "2026-10-08"],
-}
+# 中国法定节假日数据文件（按年份组织，新增年份只需追加数据）
+# 2027 年为按农历推算的预估安排，待官方通知发布后更新
+HOLIDAY_DATA_FILE = Path(__file__).parent / "data" / "holidays.json"
+
+# 节假日邻近效应的最大天数
+HOLIDAY_PROXIMITY_DAYS = 3
@@ -0,0 +1,115 @@
+import json
+from dataclasses import dataclass
+from datetime import date, timedelta
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+
+from app.engine.config import HOLIDAY_DATA_FILE
+
+# 距离上限：索引范围外或附近没有节假日时返回该值
+NO_HOLIDAY_DISTANCE = np.iinfo(np.int16).max
+
+# 索引首尾各预留的天数，保证跨年的邻近查询仍落在数组内
+_PADDING_DAYS = 31
+
+
+@dataclass(frozen=True)
+class HolidayInfo:
+    is_holiday: bool
+    name: str | None  # 当天所属节假日，非节假日时为最近节假日
+    distance_days: int  # 距最近节假日的天数，节假日当天为 0
+
+
+class HolidayCalendar:
+    """节假日日历索引。
+
+    加载时按天预计算稠密数组（是否节假日、最近节假日名称 id、距最近节假日天数），
+    查询时以 (日期 - 起始日) 为下标直接取值，单日与批量查询均为 O(1)。
+    """
+
+    def __init__(self, holidays: dict[str, list[dict]]):
+        spans: list[tuple[str, date, date]] = []
+        for entries in holidays.values():
+            for entry in entries:
+                spans.append((
+                    entry["name"],
+                    date.fromisoformat(entry["start"]),
+                    date.fromisoformat(entry["end"]),
+                ))
+        spans.sort(key=lambda span: span[1])
+
+        self.names: list[str] = list(dict.fromkeys(name for name, _, _ in spans))
+        name_ids = {name: i for i, name in enumerate(self.names)}
+
+        if spans:
+            first = spans[0][1] - timedelta(days=_PADDING_DAYS)
+            last = max(end for _, _, end in spans) + timedelta(days=_PADDING_DAYS)
+        else:
+            first = last = date.today()
+        self.origin = np.datetime64(first, "D")
+        size = (last - first).days + 1
+
+        self.is_holiday = np.zeros(size, dtype=bool)
+        holiday_name = np.full(size, -1, dtype=np.int16)
+        for name, start, end in spans:
+            lo, hi = (start - first).days, (end - first).days + 1
+            self.is_holiday[lo:hi] = True
+            holiday_name[lo:hi] = name_ids[name]
+
+        # 每天到最近节假日的距离及其名称，距离相同时取较早的节假日
+        self.distance = np.full(size, NO_HOLIDAY_DISTANCE, dtype=np.int16)
+        self.name_id = np.full(size, -1, dtype=np.int16)
+        holiday_idx = np.flatnonzero(self.is_holiday)
+        if len(holiday_idx):
+            days = np.arange(size)
+            pos = np.searchsorted(holiday_idx, days)
+            prev_idx = holiday_idx[np.clip(pos - 1, 0, len(holiday_idx) - 1)]
+            next_idx = holiday_idx[np.clip(pos, 0, len(holiday_idx) - 1)]
+            prev_dist = np.where(prev_idx <= days, days - prev_idx, NO_HOLIDAY_DISTANCE)
+            next_dist = np.abs(next_idx - days)
+            nearest = np.where(prev_dist <= next_dist, prev_idx, next_idx)
+            self.distance[:] = np.minimum(np.minimum(prev_dist, next_dist), NO_HOLIDAY_DISTANCE)
+            self.name_id[:] = holiday_name[nearest]
+
+    @classmethod
+    def from_file(cls, path: str | Path) -> "HolidayCalendar":
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def _index(self, target_date: date) -> int | None:
+        idx = int((np.datetime64(target_date, "D") - self.origin).astype("int64"))
+        if 0 <= idx < len(self.is_holiday):
+            return idx
+        return None
+
+    def lookup(self, target_date: date) -> HolidayInfo:
+        """单日查询"""
+        idx = self._index(target_date)
+        if idx is None or self.name_id[idx] < 0:
+            return HolidayInfo(is_holiday=False, name=None, distance_days=int(NO_HOLIDAY_DISTANCE))
+        return HolidayInfo(
+            is_holiday=bool(self.is_holiday[idx]),
+            name=self.names[self.name_id[idx]],
+            distance_days=int(self.distance[idx]),
+        )
+
+    def is_holiday_on(self, target_date: date) -> bool:
+        idx = self._index(target_date)
+        return idx is not None and bool(self.is_holiday[idx])
+
+    def lookup_array(self, days: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """批量查询，返回 (是否节假日, 距最近节假日天数) 两个与 days 同形的数组"""
+        idx = (np.asarray(days, dtype="datetime64[D]") - self.origin).astype("int64")
+        in_range = (idx >= 0) & (idx < len(self.is_holiday))
+        safe_idx = np.where(in_range, idx, 0)
+        is_holiday = np.where(in_range, self.is_holiday[safe_idx], False)
+        distance = np.where(in_range, self.distance[safe_idx], NO_HOLIDAY_DISTANCE)
+        return is_holiday, distance
+
+
+@lru_cache(maxsize=1)
+def get_holiday_calendar() -> HolidayCalendar:
+    """进程内共享的节假日日历，首次调用时从数据文件构建"""
+    return HolidayCalendar.from_file(HOLIDAY_DATA_FILE)
@@ -1,15 +1,27 @@
 from datetime import date
-from app.engine.config import WEIGHTS, TIME_FACTORS, PRICE_TIERS, HOLIDAYS_2026
+import numpy as np
+from app.engine.config import WEIGHTS, TIME_FACTORS, PRICE_TIERS, HOLIDAY_PROXIMITY_DAYS
+from app.engine.holiday_calendar import HolidayCalendar, get_holiday_calendar
+
+# 历史表现因素的汇总统计量（批量定价时按房源排列成数组）
+HISTORICAL_STATS_KEYS = (
+    "tx_count",
+    "tx_older_avg",
+    "tx_recent_avg",
+    "fb_total",
+    "fb_accepted",
+    "fb_rejected",
+    "fb_adjusted_up",
+    "fb_adjusted_down",
+)
 
 
 class PricingEngine:
     """定价规则引擎 - MVP简化版，支持房东偏好+时间因素+基础属性"""
 
-    def __init__(self):
+    def __init__(self, calendar: HolidayCalendar | None = None):
         self.weights = WEIGHTS.copy()
-        self._holiday_dates: set[str] = set()
-        for dates in HOLIDAYS_2026.values():
-            self._holiday_dates.update(dates)
+        self.calendar = calendar or get_holiday_calendar()
 
     def calculate(
         self,
@@ -82,6 +94,191 @@ class PricingEngine:
             "calculation_details": details,
         }
 
+    def calculate_range(
+        self,
+        base_price: float,
+        owner_preference: dict,
+        property_info: dict,
+        start_date: date,
+        end_date: date,
+        historical_data: dict | None = None,
+        market_data: dict | None = None,
+        avg_advance_days: float | None = None,
+        today: date | None = None,
+    ) -> dict:
+        """按日期区间批量定价（含首尾两天），返回列式结果。
+
+        与日期无关的因素（房东偏好、历史表现、市场、基础属性）只计算一次；
+        时间因素与外部事件（节假日邻近、预订紧迫度）以 NumPy 数组整体计算。
+        逐日结果与 calculate() 在相同输入下保持一致。
+        """
+        if end_date < start_date:
+            raise ValueError("end_date must not be earlier than start_date")
+
+        min_price = owner_preference.get("min_price", 0)
+        max_price = owner_preference.get("max_price", float("inf"))
+
+        days = np.arange(
+            np.datetime64(start_date, "D"), np.datetime64(end_date, "D") + 1
+        )
+
+        # 与日期无关的因素只计算一次
+        pref_adj = self._calc_owner_preference(base_price, owner_preference)
+        hist_adj = self._calc_historical(historical_data) if historical_data else 0.0
+        market_adj = self._calc_market(market_data) if market_data else 0.0
+        base_adj = self._calc_property_base(property_info)
+        static = (
+            pref_adj * self.weights["owner_preference"]
+            + hist_adj * self.weights["historical_performance"]
+            + market_adj * self.weights["market_factor"]
+            + base_adj * self.weights["property_base"]
+        )
+
+        # 与日期相关的因素按数组计算
+        time_adj = self._time_factor_array(days)
+        ext_adj = self._external_array(days, avg_advance_days, today or date.today())
+
+        composite = (
+            static
+            + time_adj * self.weights["time_factor"]
+            + ext_adj * self.weights["external_event"]
+        )
+
+        suggested = base_price * (1 + composite)
+        conservative = suggested * (1 + PRICE_TIERS["conservative_offset"])
+        aggressive = suggested * (1 + PRICE_TIERS["aggressive_offset"])
+
+        # 边界约束
+        conservative = np.clip(conservative, min_price, max_price)
+        suggested = np.clip(suggested, min_price, max_price)
+        aggressive = np.clip(aggressive, min_price, max_price)
+
+        # 保持三档排序
+        conservative = np.minimum(conservative, suggested)
+        aggressive = np.maximum(aggressive, suggested)
+
+        return {
+            "dates": days,
+            "conservative_price": np.round(conservative, 2),
+            "suggested_price": np.round(suggested, 2),
+            "aggressive_price": np.round(aggressive, 2),
+            "base_price": base_price,
+            "composite_adjustment": np.round(composite, 4),
+            "calculation_details": {
+                "owner_preference": {"adjustment": pref_adj, "weight": self.weights["owner_preference"]},
+                "historical_performance": {"adjustment": hist_adj, "weight": self.weights["historical_performance"]},
+                "time_factor": {"adjustment": time_adj, "weight": self.weights["time_factor"]},
+                "market_factor": {"adjustment": market_adj, "weight": self.weights["market_factor"]},
+                "property_base": {"adjustment": base_adj, "weight": self.weights["property_base"]},
+                "external_event": {"adjustment": ext_adj, "weight": self.weights["external_event"]},
+            },
+        }
+
+    def calculate_matrix(
+        self,
+        table: dict,
+        dates,
+        today: date | None = None,
+    ) -> dict:
+        """房源 × 日期 批量定价，一次向量化计算得到完整价格矩阵。
+
+        table 为列式房源表，每列长度相同（缺失值用 None/NaN）：
+        - 必需: base_price, room_type, area
+        - 房东偏好: min_price, max_price, expected_return_rate, vacancy_tolerance
+        - 历史表现: HISTORICAL_STATS_KEYS 中各项统计量
+        - 市场: similar_avg, own_avg
+        - 外部事件: avg_advance_days
+        - 可选 property_id，原样返回便于对齐
+
+        返回的价格均为 (房源数, 日期数) 的数组；calculation_details 中各因素的
+        adjustment 形状为 (房源数, 1)、(1, 日期数) 或 (房源数, 日期数)，可直接与价格矩阵广播。
+        """
+        days = np.asarray(dates, dtype="datetime64[D]")
+        base_price = np.asarray(table["base_price"], dtype=float)
+        n = len(base_price)
+
+        def column(key: str, default: float) -> np.ndarray:
+            values = table.get(key)
+            if values is None:
+                return np.full(n, default)
+            return np.nan_to_num(np.asarray(values, dtype=float), nan=default)
+
+        min_price = column("min_price", 0.0)
+        max_price = column("max_price", np.inf)
+
+        # 1. 房东偏好
+        expected_rate = column("expected_return_rate", 0.0)
+        pref_adj = np.where(expected_rate > 0, expected_rate * 0.5, 0.0)
+        pref_adj = pref_adj + (column("vacancy_tolerance", 0.5) - 0.5) * 0.2
+
+        # 2. 历史表现
+        hist_adj = self._historical_signal_array(
+            {key: column(key, 0.0) for key in HISTORICAL_STATS_KEYS}
+        )
+
+        # 3. 市场
+        market_adj = self._market_signal_array(
+            column("similar_avg", np.nan), column("own_avg", np.nan)
+        )
+
+        # 4. 基础属性
+        area = column("area", 50.0)
+        base_adj = (
+            np.where(np.asarray(table["room_type"]) == "整套", 0.05, 0.0)
+            + np.where(area > 100, 0.03, 0.0)
+            - np.where(area < 30, 0.03, 0.0)
+        )
+
+        # 5. 时间因素 / 外部事件
+        time_adj = self._time_factor_array(days)
+        ext_adj = self._external_array(
+            days, column("avg_advance_days", np.nan), today or date.today()
+        )
+
+        static = (
+            pref_adj * self.weights["owner_preference"]
+            + hist_adj * self.weights["historical_performance"]
+            + market_adj * self.weights["market_factor"]
+            + base_adj * self.weights["property_base"]
+        )
+        composite = (
+            static[:, None]
+            + time_adj * self.weights["time_factor"]
+            + ext_adj * self.weights["external_event"]
+        )
+
+        suggested = base_price[:, None] * (1 + composite)
+        conservative = suggested * (1 + PRICE_TIERS["conservative_offset"])
+        aggressive = suggested * (1 + PRICE_TIERS["aggressive_offset"])
+
+        # 边界约束
+        lower, upper = min_price[:, None], max_price[:, None]
+        conservative = np.clip(conservative, lower, upper)
+        suggested = np.clip(suggested, lower, upper)
+        aggressive = np.clip(aggressive, lower, upper)
+
+        # 保持三档排序
+        conservative = np.minimum(conservative, suggested)
+        aggressive = np.maximum(aggressive, suggested)
+
+        return {
+            "dates": days,
+            "property_ids": np.asarray(table["property_id"]) if "property_id" in table else None,
+            "conservative_price": np.round(conservative, 2),
+            "suggested_price": np.round(suggested, 2),
+            "aggressive_price": np.round(aggressive, 2),
+            "base_price": base_price,
+            "composite_adjustment": np.round(composite, 4),
+            "calculation_details": {
+                "owner_preference": {"adjustment": pref_adj[:, None], "weight": self.weights["owner_preference"]},
+                "historical_performance": {"adjustment": hist_adj[:, None], "weight": self.weights["historical_performance"]},
+                "time_factor": {"adjustment": time_adj[None, :], "weight": self.weights["time_factor"]},
+                "market_factor": {"adjustment": market_adj[:, None], "weight": self.weights["market_factor"]},
+                "property_base": {"adjustment": base_adj[:, None], "weight": self.weights["property_base"]},
+                "external_event": {"adjustment": ext_adj, "weight": self.weights["external_event"]},
+            },
+        }
+
     def _calc_owner_preference(self, base_price: float, pref: dict) -> float:
         """根据房东偏好计算调整系数"""
         adj = 0.0
@@ -97,56 +294,85 @@ class PricingEngine:
         return adj
 
     def _calc_historical(self, data: dict) -> float:
-        """根据历史交易和反馈计算调整系数"""
+        """根据历史交易和反馈计算调整系数。
+
+        data 可以是交易/反馈明细（transactions, feedbacks），
+        也可以是已在数据库中汇总好的 HISTORICAL_STATS_KEYS 统计量。
+        """
+        stats = data if "tx_count" in data else self._summarize_historical(data)
+        return float(self._historical_signal_array(stats))
+
+    @staticmethod
+    def _summarize_historical(data: dict) -> dict:
+        """将交易/反馈明细汇总为 HISTORICAL_STATS_KEYS 对应的统计量"""
         transactions = data.get("transactions", [])
         feedbacks = data.get("feedbacks", [])
 
-        # Transaction trend signal: compare recent half vs older half avg price
-        tx_signal = 0.0
-        if len(transactions) >= 2:
-            mid = len(transactions) // 2
+        # Transaction trend: older half vs recent half (ordered by check_in_date)
+        tx_count = len(transactions)
+        older_avg = recent_avg = 0.0
+        if tx_count >= 2:
+            mid = tx_count // 2
             older_avg = sum(t["actual_price"] for t in transactions[:mid]) / mid
-            recent_avg = sum(t["actual_price"] for t in transactions[mid:]) / (len(transactions) - mid)
-            if older_avg > 0:
-                tx_signal = (recent_avg - older_avg) / older_avg
-                tx_signal = max(-0.3, min(0.3, tx_signal))
-
-        # Feedback signal
-        fb_signal = 0.0
-        if feedbacks:
-            accepted = sum(1 for f in feedbacks if f["feedback_type"] == "采纳")
-            rejected = sum(1 for f in feedbacks if f["feedback_type"] == "拒绝")
-            adjusted = [f for f in feedbacks if f["feedback_type"] == "调整"]
-            total = len(feedbacks)
-
-            accept_rate = accepted / total
-            reject_rate = rejected / total
-
-            # Acceptance → slight upward; rejection → downward
-            fb_signal += accept_rate * 0.1
-            fb_signal -= reject_rate * 0.15
-
-            # Adjustments: if actual_price > suggested → user wanted higher
-            for f in adjusted:
-                if f.get("actual_price") and f.get("suggested_price"):
-                    if f["actual_price"] > f["suggested_price"]:
-                        fb_signal += 0.05 / total
-                    else:
-                        fb_signal -= 0.05 / total
-
-        signals = []
-        if transactions:
-            signals.append(tx_signal)
-        if feedbacks:
-            signals.append(fb_signal)
-        return sum(signals) / len(signals) if signals else 0.0
+            recent_avg = sum(t["actual_price"] for t in transactions[mid:]) / (tx_count - mid)
+
+        # Feedback counts; adjustments only count when both prices are present
+        adjusted = [
+            f for f in feedbacks
+            if f["feedback_type"] == "调整" and f.get("actual_price") and f.get("suggested_price")
+        ]
+        return {
+            "tx_count": tx_count,
+            "tx_older_avg": older_avg,
+            "tx_recent_avg": recent_avg,
+            "fb_total": len(feedbacks),
+            "fb_accepted": sum(1 for f in feedbacks if f["feedback_type"] == "采纳"),
+            "fb_rejected": sum(1 for f in feedbacks if f["feedback_type"] == "拒绝"),
+            "fb_adjusted_up": sum(1 for f in adjusted if f["actual_price"] > f["suggested_price"]),
+            "fb_adjusted_down": sum(1 for f in adjusted if f["actual_price"] <= f["suggested_price"]),
+        }
+
+    @staticmethod
+    def _historical_signal_array(stats: dict) -> np.ndarray:
+        """历史表现调整系数（数组版本），stats 各项可为标量或按房源排列的数组"""
+        tx_count = np.asarray(stats["tx_count"], dtype=float)
+        older_avg = np.asarray(stats["tx_older_avg"], dtype=float)
+        recent_avg = np.asarray(stats["tx_recent_avg"], dtype=float)
+        fb_total = np.asarray(stats["fb_total"], dtype=float)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            # Transaction trend signal: compare recent half vs older half avg price
+            tx_signal = np.where(
+                (tx_count >= 2) & (older_avg > 0),
+                np.clip((recent_avg - older_avg) / older_avg, -0.3, 0.3),
+                0.0,
+            )
+
+            # Feedback signal: acceptance → slight upward; rejection → downward;
+            # adjustments above the suggested price → user wanted higher
+            fb_signal = np.where(
+                fb_total > 0,
+                (
+                    np.asarray(stats["fb_accepted"], dtype=float) * 0.1
+                    - np.asarray(stats["fb_rejected"], dtype=float) * 0.15
+                    + (
+                        np.asarray(stats["fb_adjusted_up"], dtype=float)
+                        - np.asarray(stats["fb_adjusted_down"], dtype=float)
+                    ) * 0.05
+                ) / fb_total,
+                0.0,
+            )
+
+        has_tx = tx_count > 0
+        has_fb = fb_total > 0
+        signal_count = has_tx.astype(float) + has_fb.astype(float)
+        total = np.where(has_tx, tx_signal, 0.0) + np.where(has_fb, fb_signal, 0.0)
+        return np.where(signal_count > 0, total / np.maximum(signal_count, 1.0), 0.0)
 
     def _calc_time_factor(self, target_date: date) -> float:
         """根据日期计算时间因素调整系数"""
-        date_str = target_date.isoformat()
-
         # 节假日
-        if date_str in self._holiday_dates:
+        if self.calendar.is_holiday_on(target_date):
             return TIME_FACTORS["holiday_multiplier"] - 1.0
 
         # 周末 (5=Saturday, 6=Sunday)
@@ -156,19 +382,36 @@ class PricingEngine:
         # 工作日
         return TIME_FACTORS["weekday_multiplier"] - 1.0
 
+    def _time_factor_array(self, days: np.ndarray) -> np.ndarray:
+        """_calc_time_factor 的数组版本"""
+        # 1970-01-01 为周四，偏移 3 天后 0=周一 … 6=周日
+        weekday = (days.astype("int64") + 3) % 7
+        adj = np.where(
+            weekday >= 5,
+            TIME_FACTORS["weekend_multiplier"] - 1.0,
+            TIME_FACTORS["weekday_multiplier"] - 1.0,
+        )
+        is_holiday, _ = self.calendar.lookup_array(days)
+        return np.where(is_holiday, TIME_FACTORS["holiday_multiplier"] - 1.0, adj)
+
     def _calc_market(self, data: dict) -> float:
         """根据同类房源市场数据计算调整系数"""
-        similar_avg = data.get("similar_avg", 0)
-        own_avg = data.get("own_avg", 0)
+        return float(
+            self._market_signal_array(data.get("similar_avg", 0), data.get("own_avg", 0))
+        )
 
-        if similar_avg <= 0 or own_avg <= 0:
-            return 0.0
+    @staticmethod
+    def _market_signal_array(similar_avg, own_avg) -> np.ndarray:
+        """市场调整系数（数组版本），缺失数据以 0 或 NaN 表示"""
+        similar_avg = np.asarray(similar_avg, dtype=float)
+        own_avg = np.asarray(own_avg, dtype=float)
+        valid = (similar_avg > 0) & (own_avg > 0)
 
-        # Positive deviation means similar properties price higher → we're underpriced
-        deviation = (similar_avg - own_avg) / similar_avg
+        with np.errstate(divide="ignore", invalid="ignore"):
+            # Positive deviation means similar properties price higher → we're underpriced
+            deviation = (similar_avg - own_avg) / similar_avg
         # Apply 0.5 damping factor
-        adjustment = deviation * 0.5
-        return max(-0.2, min(0.2, adjustment))
+        return np.where(valid, np.clip(deviation * 0.5, -0.2, 0.2), 0.0)
 
     def _calc_property_base(self, info: dict) -> float:
         """根据房源基础属性计算调整系数"""
@@ -209,3 +452,29 @@ class PricingEngine:
                     adj -= 0.03
 
         return max(-0.15, min(0.15, adj))
+
+    def _external_array(self, days: np.ndarray, avg_advance_days, today: date) -> np.ndarray:
+        """_calc_external 的数组版本，事件构造规则与 pricing_service 保持一致。
+
+        avg_advance_days 为标量时返回 (日期,) 数组；为按房源排列的数组时
+        返回 (房源, 日期) 矩阵。None/NaN 表示无预订数据。
+        """
+        is_holiday, distance = self.calendar.lookup_array(days)
+
+        # 节假日当天 +0.10；邻近（1-3 天）按最近节假日的距离衰减
+        adjacent = ~is_holiday & (distance <= HOLIDAY_PROXIMITY_DAYS)
+        adj = np.where(is_holiday, 0.10, 0.0)
+        adj = adj + np.where(adjacent, 0.06 * (1.0 - (distance - 1) / 3.0), 0.0)
+
+        if avg_advance_days is not None:
+            avg_advance = np.asarray(avg_advance_days, dtype=float)
+            if avg_advance.ndim:
+                avg_advance = avg_advance[:, None]
+            days_until = np.maximum(
+                (days - np.datetime64(today, "D")).astype("int64"), 0
+            )
+            urgent = (avg_advance > 0) & (days_until < avg_advance * 0.5)
+            relaxed = ~urgent & (days_until > avg_advance * 2)
+            adj = adj + np.where(urgent, 0.05, np.where(relaxed, -0.03, 0.0))
+
+        return np.clip(adj, -0.15, 0.15)
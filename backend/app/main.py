@@ -1,11 +1,35 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
+from app.agent.checkpointer import configure_checkpointer, open_checkpointer
+from app.core.database import async_session
 from app.api.router import api_router
+from app.engine.holiday_calendar import get_holiday_calendar
+from app.services.action_store import open_action_sweeper
+from app.services.message_writer import configure_message_writer, open_message_writer
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 会话状态持久化：应用运行期间保持 checkpointer 连接池
+    # 消息后台写入：关闭时先停止接收，再写完队列中剩余的消息
+    # 待确认操作：定期清理过期未确认的操作
+    async with open_checkpointer() as checkpointer, open_message_writer(async_session) as writer, \
+            open_action_sweeper(async_session):
+        configure_checkpointer(checkpointer)
+        configure_message_writer(writer)
+        yield
+        configure_message_writer(None)
+        configure_checkpointer(None)
 
 
 def create_app() -> FastAPI:
-    app = FastAPI(title=settings.APP_NAME, debug=settings.DEBUG)
+    app = FastAPI(title=settings.APP_NAME, debug=settings.DEBUG, lifespan=lifespan)
+
+    # 启动时预计算节假日日历索引
+    get_holiday_calendar()
 
     app.add_middleware(
         CORSMiddleware,
@@ -1,7 +1,7 @@
 import uuid
 from datetime import datetime
 
-from sqlalchemy import JSON, DateTime, ForeignKey, Integer, String, Text
+from sqlalchemy import JSON, DateTime, ForeignKey, Index, Integer, String, Text
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.core.database import Base
@@ -9,6 +9,9 @@ from app.core.database import Base
 
 class Conversation(Base):
     __tablename__ = "conversation"
+    __table_args__ = (
+        Index("ix_conversation_status_last_active_at", "status", "last_active_at"),
+    )
 
     id: Mapped[str] = mapped_column(
         String(36), primary_key=True, default=lambda: str(uuid.uuid4())
@@ -23,10 +26,25 @@ class Conversation(Base):
     last_active_at: Mapped[datetime] = mapped_column(
         DateTime, default=datetime.utcnow, onupdate=datetime.utcnow
     )
+    summary: Mapped[str | None] = mapped_column(
+        Text, nullable=True, comment="早期对话的滚动摘要"
+    )
+    summary_until_id: Mapped[int | None] = mapped_column(
+        Integer, nullable=True, comment="摘要已覆盖的最后一条消息 id"
+    )
+    message_count: Mapped[int] = mapped_column(
+        Integer, default=0, server_default="0", comment="消息数"
+    )
+    user_message_count: Mapped[int] = mapped_column(
+        Integer, default=0, server_default="0", comment="用户消息数"
+    )
 
 
 class Message(Base):
     __tablename__ = "message"
+    __table_args__ = (
+        Index("ix_message_conversation_id_created_at", "conversation_id", "created_at"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     conversation_id: Mapped[str] = mapped_column(
@@ -39,4 +57,7 @@ class Message(Base):
     tool_calls: Mapped[dict | None] = mapped_column(
         JSON, nullable=True, comment="工具调用记录"
     )
+    model_profile: Mapped[str | None] = mapped_column(
+        String(20), nullable=True, comment="生成该回复的模型档位"
+    )
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
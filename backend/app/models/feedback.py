@@ -1,4 +1,4 @@
-from sqlalchemy import Integer, Float, String, Text, DateTime, ForeignKey
+from sqlalchemy import Integer, Float, String, Text, DateTime, ForeignKey, Index
 from sqlalchemy.orm import Mapped, mapped_column
 from datetime import datetime
 from app.core.database import Base
@@ -6,6 +6,9 @@ from app.core.database import Base
 
 class Feedback(Base):
     __tablename__ = "feedback"
+    __table_args__ = (
+        Index("ix_feedback_pricing_record_id_created_at", "pricing_record_id", "created_at"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     pricing_record_id: Mapped[int] = mapped_column(Integer, ForeignKey("pricing_record.id"), nullable=False)
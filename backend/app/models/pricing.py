@@ -1,4 +1,4 @@
-from sqlalchemy import Integer, Float, DateTime, JSON, ForeignKey, Date
+from sqlalchemy import Integer, Float, DateTime, JSON, ForeignKey, Date, Index
 from sqlalchemy.orm import Mapped, mapped_column
 from datetime import datetime, date
 from app.core.database import Base
@@ -6,6 +6,15 @@ from app.core.database import Base
 
 class PricingRecord(Base):
     __tablename__ = "pricing_record"
+    __table_args__ = (
+        Index(
+            "ix_pricing_record_property_id_created_at",
+            "property_id",
+            "created_at",
+            postgresql_include=["suggested_price"],
+        ),
+        Index("ix_pricing_record_created_at", "created_at"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     property_id: Mapped[int] = mapped_column(Integer, ForeignKey("property.id"), nullable=False)
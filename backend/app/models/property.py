@@ -1,4 +1,4 @@
-from sqlalchemy import String, Float, Integer, Text, DateTime, JSON
+from sqlalchemy import String, Float, Integer, Text, DateTime, JSON, Index
 from sqlalchemy.orm import Mapped, mapped_column
 from datetime import datetime
 from app.core.database import Base
@@ -6,6 +6,9 @@ from app.core.database import Base
 
 class Property(Base):
     __tablename__ = "property"
+    __table_args__ = (
+        Index("ix_property_room_type_area", "room_type", "area"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     name: Mapped[str] = mapped_column(String(200), nullable=False, comment="房源名称")
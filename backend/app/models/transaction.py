@@ -1,4 +1,4 @@
-from sqlalchemy import Integer, Float, String, DateTime, Date, ForeignKey
+from sqlalchemy import Integer, Float, String, DateTime, Date, ForeignKey, Index
 from sqlalchemy.orm import Mapped, mapped_column
 from datetime import datetime, date
 from app.core.database import Base
@@ -6,6 +6,14 @@ from app.core.database import Base
 
 class Transaction(Base):
     __tablename__ = "transaction"
+    __table_args__ = (
+        Index(
+            "ix_transaction_property_id_created_at",
+            "property_id",
+            "created_at",
+            postgresql_include=["check_in_date", "actual_price", "advance_days"],
+        ),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     property_id: Mapped[int] = mapped_column(Integer, ForeignKey("property.id"), nullable=False)
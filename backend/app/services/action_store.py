@@ -1,62 +1,341 @@
 """
-待确认操作的数据库持久化存储。
+待确认操作存储（ActionStore）。
 
-生命周期：工具返回 pending_confirmation → 存入 → 用户确认 → 弹出执行 → 删除
+生命周期：工具返回 pending_confirmation → 存入（有效期 PENDING_ACTION_TTL）→ 用户确认 → 弹出执行（同时删除）
+
+待确认操作一次写入、至多读取一次，按 PENDING_ACTION_STORE 选择后端：
+- RedisActionStore：原生 TTL 过期，GETDEL 原子弹出，多进程共享
+- MemoryActionStore：进程内 LRU + TTL，适用于单实例部署与测试
+- SqlActionStore：pending_action 表，DELETE ... RETURNING 弹出，过期行由后台任务按批清理
+
+模块级函数带 db 参数以兼容 SQL 后端，其他后端忽略该参数。
 """
-from typing import Any
+import asyncio
+import json
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Protocol
 
-from sqlalchemy import select
-from sqlalchemy.ext.asyncio import AsyncSession
+from prometheus_client import Counter
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
+from app.core.config import settings
 from app.models.pending_action import PendingAction
 
+logger = logging.getLogger(__name__)
+
+EXPIRED = Counter("pending_action_expired_total", "过期后被清理的待确认操作数")
+
+
+class ActionStore(Protocol):
+    async def save(
+        self, db: AsyncSession, conversation_id: str, action_type: str, data: dict
+    ) -> str: ...
+
+    async def get(self, db: AsyncSession, action_id: str) -> dict[str, Any] | None: ...
+
+    async def pop(self, db: AsyncSession, action_id: str) -> dict[str, Any] | None: ...
+
+    async def list_by_conversation(
+        self, db: AsyncSession, conversation_id: str
+    ) -> list[dict[str, Any]]: ...
+
+
+def _action(conversation_id: str, action_type: str, data: dict) -> dict[str, Any]:
+    return {"conversation_id": conversation_id, "action_type": action_type, "data": data}
+
+
+class SqlActionStore:
+    """数据库表存储，读写使用调用方的 Session"""
+
+    async def save(
+        self, db: AsyncSession, conversation_id: str, action_type: str, data: dict
+    ) -> str:
+        """立即提交：action 事件发出后用户随时可能确认，不能等到回复保存时才落库"""
+        now = datetime.utcnow()
+        action = PendingAction(
+            conversation_id=conversation_id,
+            action_type=action_type,
+            data=data,
+            created_at=now,
+            expires_at=now + timedelta(seconds=settings.PENDING_ACTION_TTL),
+        )
+        db.add(action)
+        await db.commit()
+        return action.id
+
+    async def get(self, db: AsyncSession, action_id: str) -> dict[str, Any] | None:
+        result = await db.execute(
+            select(PendingAction).where(
+                PendingAction.id == action_id,
+                PendingAction.expires_at > datetime.utcnow(),
+            )
+        )
+        action = result.scalar_one_or_none()
+        if not action:
+            return None
+        return _action(action.conversation_id, action.action_type, action.data)
+
+    async def pop(self, db: AsyncSession, action_id: str) -> dict[str, Any] | None:
+        """DELETE ... RETURNING 一条语句完成读取与删除：并发确认同一操作时只有一个请求拿到数据"""
+        result = await db.execute(
+            delete(PendingAction)
+            .where(
+                PendingAction.id == action_id,
+                PendingAction.expires_at > datetime.utcnow(),
+            )
+            .returning(PendingAction.conversation_id, PendingAction.action_type, PendingAction.data)
+            .execution_options(synchronize_session=False)
+        )
+        row = result.one_or_none()
+        await db.commit()
+        if row is None:
+            return None
+        return _action(row.conversation_id, row.action_type, row.data)
+
+    async def list_by_conversation(
+        self, db: AsyncSession, conversation_id: str
+    ) -> list[dict[str, Any]]:
+        result = await db.execute(
+            select(PendingAction.conversation_id, PendingAction.action_type, PendingAction.data)
+            .where(
+                PendingAction.conversation_id == conversation_id,
+                PendingAction.expires_at > datetime.utcnow(),
+            )
+            .order_by(PendingAction.created_at.asc())
+        )
+        return [_action(*row) for row in result.all()]
+
+
+class MemoryActionStore:
+    """进程内 LRU + TTL 存储：过期的操作在访问时丢弃，超出容量时淘汰最久未访问的"""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._data: OrderedDict[str, tuple[float, dict[str, Any]]] = OrderedDict()
+
+    def _live(self, action_id: str) -> dict[str, Any] | None:
+        entry = self._data.get(action_id)
+        if entry is None:
+            return None
+        expires_at, action = entry
+        if expires_at <= time.monotonic():
+            del self._data[action_id]
+            return None
+        return action
+
+    async def save(
+        self, db: AsyncSession, conversation_id: str, action_type: str, data: dict
+    ) -> str:
+        action_id = str(uuid.uuid4())
+        expires_at = time.monotonic() + settings.PENDING_ACTION_TTL
+        self._data[action_id] = (expires_at, _action(conversation_id, action_type, data))
+        while len(self._data) > self.capacity:
+            self._data.popitem(last=False)
+        return action_id
+
+    async def get(self, db: AsyncSession, action_id: str) -> dict[str, Any] | None:
+        action = self._live(action_id)
+        if action is not None:
+            self._data.move_to_end(action_id)
+        return action
+
+    async def pop(self, db: AsyncSession, action_id: str) -> dict[str, Any] | None:
+        action = self._live(action_id)
+        if action is not None:
+            del self._data[action_id]
+        return action
+
+    async def list_by_conversation(
+        self, db: AsyncSession, conversation_id: str
+    ) -> list[dict[str, Any]]:
+        # 按写入时间排序（访问会改变 LRU 顺序，过期时间与写入时间同序）
+        now = time.monotonic()
+        entries = sorted(
+            (
+                (expires_at, action)
+                for expires_at, action in self._data.values()
+                if action["conversation_id"] == conversation_id and expires_at > now
+            ),
+            key=lambda entry: entry[0],
+        )
+        return [action for _, action in entries]
+
+
+class RedisActionStore:
+    """Redis 存储：操作以 JSON 存于带 TTL 的键，会话索引为按过期时间排序的有序集合"""
+
+    def __init__(self, client):
+        self._client = client
+
+    @classmethod
+    def from_url(cls, url: str) -> "RedisActionStore":
+        from redis.asyncio import from_url
+
+        return cls(from_url(url, decode_responses=True))
+
+    @staticmethod
+    def _key(action_id: str) -> str:
+        return f"pending_action:{action_id}"
+
+    @staticmethod
+    def _index(conversation_id: str) -> str:
+        return f"pending_action:conversation:{conversation_id}"
+
+    async def save(
+        self, db: AsyncSession, conversation_id: str, action_type: str, data: dict
+    ) -> str:
+        """操作键、会话索引与索引过期时间在一个事务管道中写入（一次往返）"""
+        action_id = str(uuid.uuid4())
+        ttl = settings.PENDING_ACTION_TTL
+        index = self._index(conversation_id)
+        value = json.dumps(_action(conversation_id, action_type, data), ensure_ascii=False)
+        async with self._client.pipeline(transaction=True) as pipe:
+            pipe.set(self._key(action_id), value, ex=ttl)
+            pipe.zadd(index, {action_id: time.time() + ttl})
+            pipe.expire(index, ttl)
+            await pipe.execute()
+        return action_id
+
+    async def get(self, db: AsyncSession, action_id: str) -> dict[str, Any] | None:
+        raw = await self._client.get(self._key(action_id))
+        return json.loads(raw) if raw is not None else None
+
+    async def pop(self, db: AsyncSession, action_id: str) -> dict[str, Any] | None:
+        """GETDEL 原子弹出；会话索引中的残留 id 在列出时跳过，随索引过期清除"""
+        raw = await self._client.getdel(self._key(action_id))
+        return json.loads(raw) if raw is not None else None
+
+    async def list_by_conversation(
+        self, db: AsyncSession, conversation_id: str
+    ) -> list[dict[str, Any]]:
+        action_ids = await self._client.zrangebyscore(
+            self._index(conversation_id), time.time(), "+inf"
+        )
+        if not action_ids:
+            return []
+        raws = await self._client.mget([self._key(action_id) for action_id in action_ids])
+        return [json.loads(raw) for raw in raws if raw is not None]
+
+
+_store: ActionStore | None = None
+
+
+def _create_store() -> ActionStore:
+    backend = settings.PENDING_ACTION_STORE
+    if backend == "auto":
+        backend = "redis" if settings.REDIS_URL else "sql"
+    if backend == "redis":
+        return RedisActionStore.from_url(settings.REDIS_URL)
+    if backend == "memory":
+        return MemoryActionStore(settings.PENDING_ACTION_MEMORY_CAPACITY)
+    if backend == "sql":
+        return SqlActionStore()
+    raise ValueError(f"unknown PENDING_ACTION_STORE: {settings.PENDING_ACTION_STORE}")
+
+
+def get_action_store() -> ActionStore:
+    """进程内共享的待确认操作存储，首次调用时按配置创建"""
+    global _store
+    if _store is None:
+        _store = _create_store()
+    return _store
+
+
+def configure_action_store(store: ActionStore | None) -> None:
+    """替换待确认操作存储（测试使用）；传 None 则下次按配置重新创建"""
+    global _store
+    _store = store
+
 
 async def save_pending_action(
     db: AsyncSession, conversation_id: str, action_type: str, data: dict
 ) -> str:
-    """暂存一个待确认操作，返回 action_id。使用 flush 以便调用方管理事务。"""
-    action = PendingAction(
-        conversation_id=conversation_id,
-        action_type=action_type,
-        data=data,
-    )
-    db.add(action)
-    await db.flush()
-    return action.id
+    """暂存一个待确认操作，返回 action_id；返回时操作已可被确认"""
+    return await get_action_store().save(db, conversation_id, action_type, data)
 
 
 async def get_pending_action(
     db: AsyncSession, action_id: str
 ) -> dict[str, Any] | None:
-    """获取待确认操作"""
-    result = await db.execute(
-        select(PendingAction).where(PendingAction.id == action_id)
-    )
-    action = result.scalar_one_or_none()
-    if not action:
-        return None
-    return {
-        "conversation_id": action.conversation_id,
-        "action_type": action.action_type,
-        "data": action.data,
-    }
+    """获取未过期的待确认操作"""
+    return await get_action_store().get(db, action_id)
 
 
 async def pop_pending_action(
     db: AsyncSession, action_id: str
 ) -> dict[str, Any] | None:
-    """获取并删除待确认操作"""
+    """获取并删除未过期的待确认操作；并发确认同一操作时只有一个请求拿到数据"""
+    return await get_action_store().pop(db, action_id)
+
+
+async def list_pending_actions(
+    db: AsyncSession, conversation_id: str
+) -> list[dict[str, Any]]:
+    """会话中未过期的待确认操作，按创建时间排序"""
+    return await get_action_store().list_by_conversation(db, conversation_id)
+
+
+async def purge_expired_actions(db: AsyncSession, limit: int) -> int:
+    """SQL 后端：删除至多 limit 条已过期的操作并提交，返回删除条数"""
+    expired = (
+        select(PendingAction.id)
+        .where(PendingAction.expires_at <= datetime.utcnow())
+        .order_by(PendingAction.expires_at)
+        .limit(limit)
+    )
     result = await db.execute(
-        select(PendingAction).where(PendingAction.id == action_id)
+        delete(PendingAction)
+        .where(PendingAction.id.in_(expired))
+        .execution_options(synchronize_session=False)
     )
-    action = result.scalar_one_or_none()
-    if not action:
-        return None
-    data = {
-        "conversation_id": action.conversation_id,
-        "action_type": action.action_type,
-        "data": action.data,
-    }
-    await db.delete(action)
     await db.commit()
-    return data
+    return result.rowcount
+
+
+async def sweep_expired_actions(
+    session_factory: async_sessionmaker[AsyncSession], batch_size: int
+) -> int:
+    """SQL 后端：按批清理全部过期操作，每批一个短事务，避免长时间持有锁；返回删除总数"""
+    total = 0
+    while True:
+        async with session_factory() as db:
+            deleted = await purge_expired_actions(db, batch_size)
+        total += deleted
+        EXPIRED.inc(deleted)
+        if deleted < batch_size:
+            return total
+
+
+async def _sweep_periodically(session_factory: async_sessionmaker[AsyncSession]) -> None:
+    while True:
+        await asyncio.sleep(settings.PENDING_ACTION_SWEEP_INTERVAL)
+        try:
+            await sweep_expired_actions(session_factory, settings.PENDING_ACTION_SWEEP_BATCH)
+        except Exception:
+            logger.exception("pending action sweep failed")
+
+
+@asynccontextmanager
+async def open_action_sweeper(
+    session_factory: async_sessionmaker[AsyncSession],
+) -> AsyncIterator[None]:
+    """SQL 后端时启动定期清理过期操作的后台任务，退出时停止（供应用 lifespan 使用）；
+    Redis 与内存后端自行过期，不启动任务"""
+    if not isinstance(get_action_store(), SqlActionStore):
+        yield
+        return
+    task = asyncio.create_task(_sweep_periodically(session_factory))
+    try:
+        yield
+    finally:
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
@@ -0,0 +1,182 @@
+"""
+模型调用准入控制。
+
+- 全局并发上限：同时进行的生成数不超过 LLM_MAX_CONCURRENCY
+- 会话互斥：同一会话同时只能有一个生成（含排队中与意图快速通道）
+- 有界等待队列：超过 LLM_QUEUE_SIZE 直接拒绝，排队超过 LLM_QUEUE_TIMEOUT 秒放弃
+"""
+import asyncio
+import time
+from collections import deque
+from typing import AsyncIterator
+
+from prometheus_client import Counter, Gauge, Histogram
+
+from app.core.config import settings
+
+QUEUE_DEPTH = Gauge("chat_admission_queue_depth", "排队等待模型调用的请求数")
+ACTIVE = Gauge("chat_admission_active", "正在进行的模型调用数")
+WAIT_SECONDS = Histogram(
+    "chat_admission_wait_seconds",
+    "请求从进入到获准调用模型的等待时间",
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60),
+)
+REJECTED = Counter(
+    "chat_admission_rejected_total", "被拒绝的模型调用请求数", ["reason"]
+)
+
+
+class AdmissionRejected(Exception):
+    """请求未获准调用模型"""
+
+    status_code = 503
+    reason = "rejected"
+
+    def __init__(self, message: str):
+        super().__init__(message)
+        self.message = message
+
+
+class ConversationBusy(AdmissionRejected):
+    status_code = 409
+    reason = "busy"
+
+
+class QueueFull(AdmissionRejected):
+    reason = "queue_full"
+
+
+class AdmissionTimeout(AdmissionRejected):
+    reason = "timeout"
+
+
+class Ticket:
+    """一个请求的准入凭证：排队中或已获准，结束后必须 release"""
+
+    def __init__(self, controller: "AdmissionController", conversation_id: str):
+        self._controller = controller
+        self.conversation_id = conversation_id
+        self.admitted = False
+        self.released = False
+        self.entered_at = time.monotonic()
+        self._changed = asyncio.Event()
+
+    def _admit(self) -> None:
+        self.admitted = True
+        WAIT_SECONDS.observe(time.monotonic() - self.entered_at)
+        self._changed.set()
+
+    async def wait(self) -> AsyncIterator[int]:
+        """排队期间在位置变化时产出当前位置（从 1 开始），获准后返回；超时抛出 AdmissionTimeout"""
+        deadline = self.entered_at + self._controller.queue_timeout
+        last_position = None
+        while not self.admitted:
+            position = self._controller.position(self)
+            if position != last_position:
+                last_position = position
+                yield position
+                continue
+            self._changed.clear()
+            try:
+                await asyncio.wait_for(self._changed.wait(), deadline - time.monotonic())
+            except asyncio.TimeoutError:
+                if not self.admitted:
+                    self.release()
+                    REJECTED.labels(AdmissionTimeout.reason).inc()
+                    raise AdmissionTimeout("当前咨询人数较多，请稍后重试。")
+
+    async def acquire(self) -> None:
+        """等待获准，不关心排队位置"""
+        async for _ in self.wait():
+            pass
+
+    def release(self) -> None:
+        """释放占用的并发名额或退出队列，可重复调用"""
+        if not self.released:
+            self.released = True
+            self._controller._release(self)
+
+
+class AdmissionController:
+    def __init__(self, max_active: int, max_queue: int, queue_timeout: float):
+        self.max_active = max_active
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self._waiting: deque[Ticket] = deque()
+        self._conversations: set[str] = set()
+
+    def check(self, conversation_id: str) -> None:
+        """预检能否受理（不占位），不能受理时抛出 AdmissionRejected"""
+        error = None
+        if conversation_id in self._conversations:
+            error = ConversationBusy("该会话正在生成回复，请稍候。")
+        elif self.active >= self.max_active and len(self._waiting) >= self.max_queue:
+            error = QueueFull("当前咨询人数较多，请稍后重试。")
+        if error is not None:
+            REJECTED.labels(error.reason).inc()
+            raise error
+
+    def enter(self, conversation_id: str) -> Ticket:
+        """受理请求：有空闲名额直接获准，否则进入等待队列"""
+        self.check(conversation_id)
+        ticket = Ticket(self, conversation_id)
+        self._conversations.add(conversation_id)
+        if self.active < self.max_active and not self._waiting:
+            self.active += 1
+            ticket._admit()
+        else:
+            self._waiting.append(ticket)
+        self._update_gauges()
+        return ticket
+
+    def claim_conversation(self, conversation_id: str) -> None:
+        """只占会话互斥、不占模型并发名额（意图快速通道不调用模型）；会话正在生成时抛出 ConversationBusy"""
+        if conversation_id in self._conversations:
+            REJECTED.labels(ConversationBusy.reason).inc()
+            raise ConversationBusy("该会话正在生成回复，请稍候。")
+        self._conversations.add(conversation_id)
+
+    def release_conversation(self, conversation_id: str) -> None:
+        self._conversations.discard(conversation_id)
+
+    def position(self, ticket: Ticket) -> int:
+        return self._waiting.index(ticket) + 1
+
+    def _release(self, ticket: Ticket) -> None:
+        self._conversations.discard(ticket.conversation_id)
+        if ticket.admitted:
+            self.active -= 1
+        else:
+            self._waiting.remove(ticket)
+
+        while self._waiting and self.active < self.max_active:
+            self.active += 1
+            self._waiting.popleft()._admit()
+        # 队列前移，通知其余等待者更新位置
+        for waiting in self._waiting:
+            waiting._changed.set()
+        self._update_gauges()
+
+    def _update_gauges(self) -> None:
+        QUEUE_DEPTH.set(len(self._waiting))
+        ACTIVE.set(self.active)
+
+
+_controller: AdmissionController | None = None
+
+
+def get_admission_controller() -> AdmissionController:
+    """进程内共享的准入控制器，首次调用时按配置创建"""
+    global _controller
+    if _controller is None:
+        _controller = AdmissionController(
+            settings.LLM_MAX_CONCURRENCY, settings.LLM_QUEUE_SIZE, settings.LLM_QUEUE_TIMEOUT
+        )
+    return _controller
+
+
+def configure_admission(controller: AdmissionController | None) -> None:
+    """替换准入控制器（测试使用）；传 None 则下次按配置重新创建"""
+    global _controller
+    _controller = controller
@@ -1,45 +1,144 @@
+import asyncio
 import json
-from typing import AsyncGenerator
+import time
+from typing import AsyncGenerator, Awaitable, Callable
 
+from langchain_core.messages import AIMessage, HumanMessage
+from starlette.requests import Request
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.agent.model_router import model_profile_var, select_profile
+from app.core.config import settings
 from app.services.action_store import save_pending_action
+from app.services.admission import AdmissionRejected, get_admission_controller
+from app.services.history_service import build_context, needs_compaction
+from app.services.intent_router import (
+    AGENT_ROUTE,
+    ROUTED,
+    TURN_SECONDS,
+    IntentResult,
+    IntentRule,
+    get_intent_router,
+)
+from app.services.replay_buffer import Generation, ReplayExpired, start_generation
+from app.services.sse import coalesce_events, format_event
 from app.services.conversation_service import (
-    count_messages,
     delete_messages_from_id,
-    get_messages,
     save_message,
-    update_conversation_title,
+    save_user_message,
 )
 from app.tools.context import db_session_var
 from app.tools.property_tool import PROPERTY_FORM_DEFINITION
 
 
-async def _invoke_agent_stream(
-    db: AsyncSession, conversation_id: str, messages: list[dict]
-) -> AsyncGenerator[str, None]:
-    """核心 agent 调用逻辑 — 接受已构建好的消息历史列表，流式 yield SSE 事件。
+def _thread_config(conversation_id: str) -> dict:
+    return {"configurable": {"thread_id": str(conversation_id)}}
+
+
+async def _turn_messages(
+    db: AsyncSession, conversation_id: str, user_content: str
+) -> list[dict]:
+    """本轮送入 Agent 的消息。
+
+    线程已有 checkpoint 且未超出历史预算时只追加新的用户消息；
+    否则（新会话、checkpoint 丢失、历史过长）重建线程：滚动摘要 + 置顶上下文 + 最近若干轮原文。
+    """
+    from app.agent.betastay_agent import get_betastay_agent
+
+    state = await get_betastay_agent().aget_state(_thread_config(conversation_id))
+    thread_messages = state.values.get("messages")
+    if thread_messages and not needs_compaction(thread_messages):
+        return [{"role": "user", "content": user_content}]
+
+    if thread_messages:
+        await reset_thread(conversation_id)
+    return await build_context(db, conversation_id)
+
+
+async def reset_thread(conversation_id: str) -> None:
+    """丢弃会话的 checkpoint 线程，下一轮从数据库历史重建（编辑、重新生成、删除会话时使用）"""
+    from app.agent.checkpointer import get_checkpointer
+
+    await get_checkpointer().adelete_thread(str(conversation_id))
+
+
+async def append_to_thread(conversation_id: str, content: str) -> None:
+    """把 Agent 之外产生的助手消息（如确认操作的结果）追加到线程状态"""
+    await _append_messages(conversation_id, [AIMessage(content=content)])
+
+
+async def _append_messages(conversation_id: str, messages: list) -> None:
+    """线程已存在时追加消息；线程不存在时下一轮会从数据库历史重建，无需追加"""
+    from app.agent.betastay_agent import get_betastay_agent
+
+    agent = get_betastay_agent()
+    config = _thread_config(conversation_id)
+    state = await agent.aget_state(config)
+    if state.values.get("messages"):
+        await agent.aupdate_state(config, {"messages": messages})
+
+
+async def _save_reply(
+    db: AsyncSession,
+    conversation_id: str,
+    content: str,
+    pending_actions: list[dict],
+    pricing_results: list[dict],
+    truncated: bool = False,
+    model_profile: str | None = None,
+):
+    """保存助手回复，待确认操作与定价结果记入 tool_calls，生成被中断时标记 truncated，并记录所用模型档位。
+    开启 write-behind 时交给后台写入，返回的消息 id 为空"""
+    tool_calls_meta = {}
+    if pending_actions:
+        tool_calls_meta["pending_actions"] = pending_actions
+    if pricing_results:
+        tool_calls_meta["pricing"] = pricing_results
+    if truncated:
+        tool_calls_meta["truncated"] = True
+
+    return await save_message(
+        db, conversation_id, "assistant", content,
+        tool_calls=tool_calls_meta or None, model_profile=model_profile, defer=True,
+    )
+
+
+def _turn_profile(messages: list[dict]) -> str:
+    """按本轮最后一条用户消息选择模型档位"""
+    for message in reversed(messages):
+        if message["role"] == "user":
+            return select_profile(message["content"])
+    return select_profile("")
+
+
+async def _agent_events(
+    db: AsyncSession, conversation_id: str, messages: list[dict], profile: str
+) -> AsyncGenerator[tuple[str, dict], None]:
+    """核心 agent 调用逻辑 — 接受本轮送入的消息列表（追加到会话线程），流式 yield (事件类型, 数据)。
 
     SSE 事件类型:
     - thinking: AI思考过程片段
     - content: AI回复正文片段
     - action: 待确认操作（前端应显示确认弹窗）
-    - pricing: 定价计算结果（前端应显示PriceCard）
+    - pricing: 定价计算结果（前端应显示PriceCard）；区间定价为一个事件，data.prices 为逐日价格（前端显示价格日历）
     - form: 表单字段定义（前端应渲染内联表单，始终在 content 之后发送）
     - done: 流结束，附带完整消息信息
     """
+    started = time.perf_counter()
     full_content = ""
     full_thinking = ""
     pending_actions = []
+    pricing_results = []
     form_triggered = False  # show_property_form 被调用的标记
 
     try:
-        from app.agent.betastay_agent import create_betastay_agent
+        from app.agent.betastay_agent import get_betastay_agent
 
         token = db_session_var.set(db)
+        profile_token = model_profile_var.set(profile)
         try:
-            agent = create_betastay_agent()
-            config = {"configurable": {"thread_id": str(conversation_id)}}
+            agent = get_betastay_agent()
+            config = _thread_config(conversation_id)
 
             async for event in agent.astream_events(
                 {"messages": messages},
@@ -58,13 +157,13 @@ async def _invoke_agent_stream(
                         reasoning = chunk.additional_kwargs.get("reasoning_content", "")
                     if reasoning:
                         full_thinking += reasoning
-                        yield f"event: thinking\ndata: {json.dumps({'content': reasoning}, ensure_ascii=False)}\n\n"
+                        yield "thinking", {"content": reasoning}
 
                     # 正文内容
                     text = chunk.content if hasattr(chunk, "content") else ""
                     if text:
                         full_content += text
-                        yield f"event: content\ndata: {json.dumps({'content': text}, ensure_ascii=False)}\n\n"
+                        yield "content", {"content": text}
 
                 # --- 工具执行完成 ---
                 elif kind == "on_tool_end":
@@ -86,9 +185,11 @@ async def _invoke_agent_stream(
                         form_triggered = True
                         continue
 
-                    # 正常工具输出处理
+                    # 正常工具输出处理：优先取完整结果（artifact），模型看到的 content 是紧凑视图
                     tool_output = None
-                    if hasattr(raw_output, "content"):
+                    if isinstance(getattr(raw_output, "artifact", None), dict):
+                        tool_output = raw_output.artifact
+                    elif hasattr(raw_output, "content"):
                         try:
                             tool_output = json.loads(raw_output.content)
                         except (json.JSONDecodeError, TypeError):
@@ -112,7 +213,7 @@ async def _invoke_agent_stream(
                                 "data": tool_output["data"],
                             }
                             pending_actions.append(action_event)
-                            yield f"event: action\ndata: {json.dumps(action_event, ensure_ascii=False)}\n\n"
+                            yield "action", action_event
 
                         # 定价结果 → 发送 pricing 事件
                         elif tool_output.get("success") and tool_output.get(
@@ -126,31 +227,55 @@ async def _invoke_agent_stream(
                                 "suggested_price": tool_output["suggested_price"],
                                 "aggressive_price": tool_output["aggressive_price"],
                             }
-                            yield f"event: pricing\ndata: {json.dumps(pricing_event, ensure_ascii=False)}\n\n"
+                            pricing_results.append(pricing_event)
+                            yield "pricing", pricing_event
+
+                        # 区间定价结果 → 整个区间合并为一个 pricing 事件（前端渲染价格日历）
+                        elif tool_output.get("success") and tool_output.get("prices"):
+                            property_id = tool_output["property_id"]
+                            pricing_event = {
+                                "property_id": property_id,
+                                "prices": tool_output["prices"],
+                            }
+                            pricing_results.extend(
+                                {"property_id": property_id, **price}
+                                for price in tool_output["prices"]
+                            )
+                            yield "pricing", pricing_event
 
         finally:
+            model_profile_var.reset(profile_token)
             db_session_var.reset(token)
 
+    except asyncio.CancelledError:
+        # 客户端断开后生成被取消：保存已生成的部分并标记 truncated
+        await reset_thread(conversation_id)
+        if full_content:
+            await _save_reply(
+                db, conversation_id, full_content, pending_actions, pricing_results,
+                truncated=True, model_profile=profile,
+            )
+        raise
+
     except Exception as e:
+        # 线程状态可能停在本轮中途，丢弃后下一轮从数据库历史重建
+        await reset_thread(conversation_id)
         full_content = f"系统处理中遇到问题，请稍后重试。（错误：{str(e)}）"
-        yield f"event: content\ndata: {json.dumps({'content': full_content}, ensure_ascii=False)}\n\n"
+        yield "content", {"content": full_content}
 
     if not full_content:
         full_content = "抱歉，我暂时无法处理您的请求。"
-        yield f"event: content\ndata: {json.dumps({'content': full_content}, ensure_ascii=False)}\n\n"
+        yield "content", {"content": full_content}
 
     # ★ 关键：form 事件在所有 content 之后、done 之前发送
     # 这样前端表单卡片一定渲染在 AI 文字内容的下方
     if form_triggered:
-        yield f"event: form\ndata: {json.dumps(PROPERTY_FORM_DEFINITION, ensure_ascii=False)}\n\n"
+        yield "form", PROPERTY_FORM_DEFINITION
 
     # 保存完整回复
-    tool_calls_meta = None
-    if pending_actions:
-        tool_calls_meta = {"pending_actions": pending_actions}
-
-    reply = await save_message(
-        db, conversation_id, "assistant", full_content, tool_calls=tool_calls_meta
+    reply = await _save_reply(
+        db, conversation_id, full_content, pending_actions, pricing_results,
+        model_profile=profile,
     )
 
     done_data = {
@@ -159,37 +284,206 @@ async def _invoke_agent_stream(
         "thinking": full_thinking,
         "created_at": reply.created_at.isoformat(),
         "pending_actions": pending_actions,
+        "model_profile": profile,
     }
-    yield f"event: done\ndata: {json.dumps(done_data, ensure_ascii=False)}\n\n"
+    TURN_SECONDS.labels(AGENT_ROUTE).observe(time.perf_counter() - started)
+    yield "done", done_data
+
+
+async def _fast_path_stream(
+    db: AsyncSession,
+    conversation_id: str,
+    user_content: str,
+    rule: IntentRule,
+    params: dict,
+) -> AsyncGenerator[str, None]:
+    """意图快速通道：与 Agent 路径共用会话互斥（不占模型并发名额），会话正在生成时发出 error 事件"""
+    controller = get_admission_controller()
+    try:
+        controller.claim_conversation(conversation_id)
+    except AdmissionRejected as e:
+        yield format_event("error", {"message": e.message})
+        return
+    try:
+        async for event in _fast_path_events(db, conversation_id, user_content, rule, params):
+            yield event
+    finally:
+        controller.release_conversation(conversation_id)
+
+
+async def _fast_path_events(
+    db: AsyncSession,
+    conversation_id: str,
+    user_content: str,
+    rule: IntentRule,
+    params: dict,
+) -> AsyncGenerator[str, None]:
+    """直接执行规则对应的工具，按 Agent 路径相同的事件顺序发出模板回复。
+    规则执行失败时与 Agent 路径一样回复错误提示，用户消息仍有对应的回复并以 done 结束"""
+    started = time.perf_counter()
+    await save_user_message(db, conversation_id, user_content)
+
+    token = db_session_var.set(db)
+    try:
+        result = await rule.handle(db, params)
+    except Exception as e:
+        # 丢弃失败的事务，以便保存错误回复
+        await db.rollback()
+        result = IntentResult(content=f"系统处理中遇到问题，请稍后重试。（错误：{str(e)}）")
+    finally:
+        db_session_var.reset(token)
+
+    for pricing in result.pricing:
+        yield format_event("pricing", pricing)
+    yield format_event("content", {"content": result.content})
+    if result.form:
+        yield format_event("form", result.form)
+
+    reply = await _save_reply(db, conversation_id, result.content, [], result.pricing)
+    await _append_messages(
+        conversation_id,
+        [HumanMessage(content=user_content), AIMessage(content=result.content)],
+    )
+
+    TURN_SECONDS.labels(rule.name).observe(time.perf_counter() - started)
+    yield format_event("done", {
+        "id": reply.id,
+        "content": result.content,
+        "thinking": "",
+        "created_at": reply.created_at.isoformat(),
+        "pending_actions": [],
+        "model_profile": None,
+    })
+
+
+async def _follow(
+    generation: Generation, after: int, request: Request | None
+) -> AsyncGenerator[str, None]:
+    """作为订阅者转发生成的帧。
+
+    连接断开（Starlette 关闭响应，或轮询 request.is_disconnected() 发现）时退订；
+    生成无人订阅超过 SSE_DISCONNECT_GRACE 秒即被取消，期间重连可继续接收。
+    订阅者落后超过重放缓冲容量（错过的帧已被移出）时发送 error 事件后结束。
+    """
+    subscription = generation.subscribe()
+
+    async def watch():
+        while not await request.is_disconnected():
+            await asyncio.sleep(settings.SSE_DISCONNECT_POLL)
+        subscription.close()
+
+    watcher = asyncio.create_task(watch()) if request is not None else None
+    try:
+        async for frame in generation.frames(after):
+            if subscription.closed:
+                break
+            yield frame
+    except ReplayExpired:
+        yield format_event("error", {"message": "错过的事件已过期，请重新生成"})
+    finally:
+        if watcher is not None:
+            watcher.cancel()
+        subscription.close()
+
+
+def check_admission(conversation_id: str) -> None:
+    """预检能否受理本会话的新一轮生成，不能时抛出 AdmissionRejected（接口据此返回 409/503）"""
+    get_admission_controller().check(conversation_id)
+
+
+async def _invoke_agent_stream(
+    db: AsyncSession,
+    conversation_id: str,
+    prepare: Callable[[], Awaitable[list[dict]]],
+    request: Request | None = None,
+) -> AsyncGenerator[str, None]:
+    """流式 yield SSE 帧，连续的 thinking/content 片段按配置合并后发出。
+
+    先经准入控制：排队期间发送 queued 事件（position 从 1 开始），被拒绝或排队超时发送 error 事件并结束。
+    获准后才执行 prepare（保存/删除消息、准备本轮送入的消息），拒绝时不会留下没有回复的用户消息。
+    生成在后台任务中运行并使用独立的 DB Session，帧带编号写入重放缓冲；
+    客户端可凭 Last-Event-ID 经 resume_stream 续接，长时间无人订阅则取消生成。
+    生成结束（含取消）时释放准入名额。
+    """
+    try:
+        ticket = get_admission_controller().enter(conversation_id)
+    except AdmissionRejected as e:
+        yield format_event("error", {"message": e.message})
+        return
+
+    async def frames(messages: list[dict]):
+        profile = _turn_profile(messages)
+        async with AsyncSession(db.bind, expire_on_commit=False) as run_db:
+            async for frame in coalesce_events(
+                _agent_events(run_db, conversation_id, messages, profile),
+                window_ms=settings.SSE_COALESCE_MS,
+                max_bytes=settings.SSE_COALESCE_MAX_BYTES,
+            ):
+                yield frame
+
+    handed_off = False
+    try:
+        async for position in ticket.wait():
+            yield format_event("queued", {"position": position})
+        messages = await prepare()
+        generation = start_generation(
+            conversation_id, frames(messages), on_finish=ticket.release
+        )
+        handed_off = True
+    except AdmissionRejected as e:
+        yield format_event("error", {"message": e.message})
+        return
+    finally:
+        # 排队中断开、超时或 prepare 失败时名额未交给生成任务，在此释放
+        if not handed_off:
+            ticket.release()
+
+    async for frame in _follow(generation, 0, request):
+        yield frame
+
+
+def resume_stream(
+    generation: Generation, after: int, request: Request | None = None
+) -> AsyncGenerator[str, None]:
+    """重放 after 之后错过的帧，再跟随生成的实时输出"""
+    return _follow(generation, after, request)
 
 
 async def process_message(
     db: AsyncSession, conversation_id: str, user_content: str
 ) -> dict:
-    """处理用户消息（非流式）：保存消息 → 构建历史 → 调用Agent → 保存回复"""
-    await save_message(db, conversation_id, "user", user_content)
+    """处理用户消息（非流式）：准入排队 → 保存消息 → 追加到会话线程 → 调用Agent → 保存回复。
+
+    被拒绝或排队超时抛出 AdmissionRejected。
+    """
+    ticket = get_admission_controller().enter(conversation_id)
+    try:
+        await ticket.acquire()
+        return await _process_admitted(db, conversation_id, user_content)
+    finally:
+        ticket.release()
 
-    # 首条用户消息时，自动设置会话标题为消息前10个字
-    user_msg_count = await count_messages(db, conversation_id, role="user")
-    if user_msg_count == 1:
-        title = user_content[:10]
-        await update_conversation_title(db, conversation_id, title)
 
-    history = await get_messages(db, conversation_id)
-    messages = [{"role": msg.role, "content": msg.content} for msg in history]
+async def _process_admitted(
+    db: AsyncSession, conversation_id: str, user_content: str
+) -> dict:
+    await save_user_message(db, conversation_id, user_content)
+    messages = await _turn_messages(db, conversation_id, user_content)
+    profile = _turn_profile(messages)
 
     try:
-        from app.agent.betastay_agent import create_betastay_agent
+        from app.agent.betastay_agent import get_betastay_agent
 
-        # 注入 DB Session 到 context
+        # 注入 DB Session 与本轮模型档位到 context
         token = db_session_var.set(db)
+        profile_token = model_profile_var.set(profile)
         try:
-            agent = create_betastay_agent()
-            result = agent.invoke(
-                {"messages": messages},
-                config={"configurable": {"thread_id": str(conversation_id)}},
+            agent = get_betastay_agent()
+            result = await agent.ainvoke(
+                {"messages": messages}, config=_thread_config(conversation_id)
             )
         finally:
+            model_profile_var.reset(profile_token)
             db_session_var.reset(token)
 
         assistant_content = ""
@@ -203,58 +497,77 @@ async def process_message(
             assistant_content = "抱歉，我暂时无法处理您的请求。"
 
     except Exception as e:
+        await reset_thread(conversation_id)
         assistant_content = f"系统处理中遇到问题，请稍后重试。（错误：{str(e)}）"
 
-    reply = await save_message(db, conversation_id, "assistant", assistant_content)
+    reply = await save_message(
+        db, conversation_id, "assistant", assistant_content, model_profile=profile
+    )
     return {
         "id": reply.id,
         "role": reply.role,
         "content": reply.content,
         "created_at": reply.created_at.isoformat(),
+        "model_profile": reply.model_profile,
     }
 
 
 async def stream_message(
-    db: AsyncSession, conversation_id: str, user_content: str
+    db: AsyncSession,
+    conversation_id: str,
+    user_content: str,
+    request: Request | None = None,
 ) -> AsyncGenerator[str, None]:
-    """流式处理用户消息：保存用户消息 → 自动标题 → 构建历史 → 委托 _invoke_agent_stream()"""
-    await save_message(db, conversation_id, "user", user_content)
-
-    # 首条用户消息时，自动设置会话标题为消息前10个字
-    user_msg_count = await count_messages(db, conversation_id, role="user")
-    if user_msg_count == 1:
-        title = user_content[:10]
-        await update_conversation_title(db, conversation_id, title)
-
-    history = await get_messages(db, conversation_id)
-    messages = [{"role": msg.role, "content": msg.content} for msg in history]
-
-    async for event in _invoke_agent_stream(db, conversation_id, messages):
+    """流式处理用户消息：意图明确时走快速通道；否则准入后保存用户消息 → 自动标题 → 追加到会话线程 → 委托 _invoke_agent_stream()"""
+    router = get_intent_router()
+    route = router.route(user_content) if router is not None else None
+    if route is not None:
+        rule, params = route
+        ROUTED.labels(rule.name).inc()
+        async for event in _fast_path_stream(db, conversation_id, user_content, rule, params):
+            yield event
+        return
+    ROUTED.labels(AGENT_ROUTE).inc()
+
+    async def prepare():
+        await save_user_message(db, conversation_id, user_content)
+        return await _turn_messages(db, conversation_id, user_content)
+
+    async for event in _invoke_agent_stream(db, conversation_id, prepare, request):
         yield event
 
 
 async def stream_edit(
-    db: AsyncSession, conversation_id: str, message_id: int, new_content: str
+    db: AsyncSession,
+    conversation_id: str,
+    message_id: int,
+    new_content: str,
+    request: Request | None = None,
 ) -> AsyncGenerator[str, None]:
-    """编辑消息后重新生成：删除旧消息 → 保存新用户消息 → 构建历史 → 委托 _invoke_agent_stream()"""
-    await delete_messages_from_id(db, conversation_id, message_id)
-    await save_message(db, conversation_id, "user", new_content)
+    """编辑消息后重新生成：准入后删除旧消息 → 保存新用户消息 → 重建会话线程 → 委托 _invoke_agent_stream()"""
 
-    history = await get_messages(db, conversation_id)
-    messages = [{"role": msg.role, "content": msg.content} for msg in history]
+    async def prepare():
+        await delete_messages_from_id(db, conversation_id, message_id)
+        await save_user_message(db, conversation_id, new_content)
+        await reset_thread(conversation_id)
+        return await build_context(db, conversation_id)
 
-    async for event in _invoke_agent_stream(db, conversation_id, messages):
+    async for event in _invoke_agent_stream(db, conversation_id, prepare, request):
         yield event
 
 
 async def stream_regenerate(
-    db: AsyncSession, conversation_id: str, message_id: int
+    db: AsyncSession,
+    conversation_id: str,
+    message_id: int,
+    request: Request | None = None,
 ) -> AsyncGenerator[str, None]:
-    """重新生成 AI 回复：删除该消息及后续 → 构建历史（以 user 消息结尾）→ 委托 _invoke_agent_stream()"""
-    await delete_messages_from_id(db, conversation_id, message_id)
+    """重新生成 AI 回复：准入后删除该消息及后续 → 重建会话线程（以 user 消息结尾）→ 委托 _invoke_agent_stream()"""
 
-    history = await get_messages(db, conversation_id)
-    messages = [{"role": msg.role, "content": msg.content} for msg in history]
+    async def prepare():
+        await delete_messages_from_id(db, conversation_id, message_id)
+        await reset_thread(conversation_id)
+        return await build_context(db, conversation_id)
 
-    async for event in _invoke_agent_stream(db, conversation_id, messages):
+    async for event in _invoke_agent_stream(db, conversation_id, prepare, request):
         yield event
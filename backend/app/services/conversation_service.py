@@ -1,8 +1,11 @@
+from datetime import datetime
+
 from sqlalchemy import delete as sa_delete
-from sqlalchemy import func, select
+from sqlalchemy import case, func, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.conversation import Conversation, Message
+from app.services.message_writer import get_message_writer, wait_for_pending
 
 
 async def create_conversation(
@@ -33,26 +36,81 @@ async def get_conversation(
     return result.scalar_one_or_none()
 
 
+def _counted(role: str, messages: int = 1) -> dict:
+    """会话消息计数的原子增量（UPDATE 的 SET 子句）"""
+    values = {"message_count": Conversation.message_count + messages}
+    if role == "user":
+        values["user_message_count"] = Conversation.user_message_count + messages
+    return values
+
+
 async def save_message(
     db: AsyncSession,
     conversation_id: str,
     role: str,
     content: str,
     tool_calls: dict | None = None,
+    model_profile: str | None = None,
+    defer: bool = False,
 ) -> Message:
-    msg = Message(
-        conversation_id=conversation_id,
-        role=role,
-        content=content,
-        tool_calls=tool_calls,
+    """保存一条消息并累加会话的消息计数（INSERT + UPDATE + COMMIT）。
+    defer=True 且开启了 write-behind 时交给后台写入器，返回的消息尚未落库（id 为空）"""
+    values = {
+        "conversation_id": conversation_id,
+        "role": role,
+        "content": content,
+        "tool_calls": tool_calls,
+        "model_profile": model_profile,
+        "created_at": datetime.utcnow(),
+    }
+    writer = get_message_writer()
+    if defer and writer is not None:
+        await writer.submit(values)
+        return Message(**values)
+
+    await wait_for_pending(conversation_id)
+    msg = Message(**values)
+    db.add(msg)
+    # 执行 UPDATE 前会先自动 flush 插入本条消息
+    await db.execute(
+        update(Conversation)
+        .where(Conversation.id == conversation_id)
+        .values(**_counted(role))
+        .execution_options(synchronize_session=False)
     )
+    await db.commit()
+    return msg
+
+
+async def save_user_message(
+    db: AsyncSession, conversation_id: str, content: str
+) -> Message:
+    """保存用户消息；会话的第一条用户消息同时把标题设为消息前10个字。
+
+    计数累加与标题更新合并为一条 UPDATE，和插入在同一个事务中提交（INSERT + UPDATE + COMMIT）。
+    标题条件按更新前的 user_message_count 判断，并发发送时也只有第一条生效。
+    """
+    await wait_for_pending(conversation_id)
+    msg = Message(conversation_id=conversation_id, role="user", content=content)
     db.add(msg)
+    await db.execute(
+        update(Conversation)
+        .where(Conversation.id == conversation_id)
+        .values(
+            **_counted("user"),
+            title=case(
+                (Conversation.user_message_count == 0, content[:10]),
+                else_=Conversation.title,
+            ),
+        )
+        .execution_options(synchronize_session=False)
+    )
     await db.commit()
-    await db.refresh(msg)
     return msg
 
 
 async def get_messages(db: AsyncSession, conversation_id: str) -> list[Message]:
+    await wait_for_pending(conversation_id)
     result = await db.execute(
         select(Message)
         .where(Message.conversation_id == conversation_id)
@@ -61,31 +119,9 @@ async def get_messages(db: AsyncSession, conversation_id: str) -> list[Message]:
     return list(result.scalars().all())
 
 
-async def count_messages(
-    db: AsyncSession, conversation_id: str, role: str | None = None
-) -> int:
-    """统计会话中的消息数量，可选按角色筛选"""
-    stmt = select(func.count(Message.id)).where(
-        Message.conversation_id == conversation_id
-    )
-    if role:
-        stmt = stmt.where(Message.role == role)
-    result = await db.execute(stmt)
-    return result.scalar() or 0
-
-
-async def update_conversation_title(
-    db: AsyncSession, conversation_id: str, title: str
-) -> None:
-    """更新会话标题"""
-    conv = await get_conversation(db, conversation_id)
-    if conv:
-        conv.title = title
-        await db.commit()
-
-
 async def delete_conversation(db: AsyncSession, conversation_id: str) -> bool:
     """删除会话及其所有消息"""
+    await wait_for_pending(conversation_id)
     conv = await get_conversation(db, conversation_id)
     if not conv:
         return False
@@ -100,11 +136,31 @@ async def delete_conversation(db: AsyncSession, conversation_id: str) -> bool:
 async def delete_messages_from_id(
     db: AsyncSession, conversation_id: str, from_message_id: int
 ) -> None:
-    """删除 id >= from_message_id 的所有消息（供 edit/regenerate 使用）"""
+    """删除 id >= from_message_id 的所有消息（供 edit/regenerate 使用）
+
+    会话的消息计数按剩余消息重新统计；被删消息已并入滚动摘要时，摘要一并作废，下次重建线程时重新生成。
+    两者合并为一条 UPDATE（SET 中的 summary_until_id 均取更新前的值）。
+    """
+    await wait_for_pending(conversation_id)
     await db.execute(
         sa_delete(Message).where(
             Message.conversation_id == conversation_id,
             Message.id >= from_message_id,
         )
     )
+    remaining = select(func.count(Message.id)).where(
+        Message.conversation_id == conversation_id
+    )
+    summary_dropped = Conversation.summary_until_id >= from_message_id
+    await db.execute(
+        update(Conversation)
+        .where(Conversation.id == conversation_id)
+        .values(
+            message_count=remaining.scalar_subquery(),
+            user_message_count=remaining.where(Message.role == "user").scalar_subquery(),
+            summary=case((summary_dropped, None), else_=Conversation.summary),
+            summary_until_id=case((summary_dropped, None), else_=Conversation.summary_until_id),
+        )
+        .execution_options(synchronize_session="fetch")
+    )
     await db.commit()
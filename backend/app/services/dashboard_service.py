@@ -0,0 +1,121 @@
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select, true
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import get_cache
+from app.core.config import settings
+from app.models.feedback import Feedback
+from app.models.pricing import PricingRecord
+from app.models.property import Property
+
+SUMMARY_CACHE_KEY = "dashboard:summary"
+# 概览缓存的版本号存于缓存本身（多 worker 共享 Redis 时同样生效），每次失效换新版本。
+# 概览与计算开始时的版本一起存于同一个键；版本不符视为未命中，因此计算期间发生写入时，
+# 旧结果即使回填也不会被读取。只占两个键，进程内缓存不会因失效次数而增长
+SUMMARY_VERSION_KEY = "dashboard:summary:version"
+SUMMARY_VERSION_TTL = 86400  # 远长于 DASHBOARD_CACHE_TTL
+
+# 首页展示的房源数量
+RECENT_PROPERTY_LIMIT = 10
+
+
+async def get_summary(db: AsyncSession) -> dict:
+    """首页概览，优先读缓存；房源/定价/反馈写入时由对应 service 失效"""
+    cache = get_cache()
+    version = await cache.get(SUMMARY_VERSION_KEY) or "0"
+    cached = await cache.get(SUMMARY_CACHE_KEY)
+    if cached is not None and cached["version"] == version:
+        return cached["summary"]
+
+    summary = await compute_summary(db)
+    await cache.set(
+        SUMMARY_CACHE_KEY, {"version": version, "summary": summary}, settings.DASHBOARD_CACHE_TTL
+    )
+    return summary
+
+
+async def invalidate_summary() -> None:
+    """写入房源/定价/反馈后调用，换新缓存版本使首页概览失效"""
+    await get_cache().set(SUMMARY_VERSION_KEY, uuid.uuid4().hex, SUMMARY_VERSION_TTL)
+
+
+async def compute_summary(db: AsyncSession) -> dict:
+    """全局计数 + 最近更新房源及其最新定价，单条 SQL 完成。
+
+    每个房源的最新定价通过关联子查询 ORDER BY created_at DESC LIMIT 1 取得
+    （等价于 LATERAL JOIN），走 (property_id, created_at) 索引，
+    耗时不随 pricing_record 总量增长。
+    """
+    thirty_days_ago = datetime.utcnow() - timedelta(days=30)
+
+    counts = select(
+        select(func.count(Property.id)).scalar_subquery().label("property_count"),
+        select(func.count(PricingRecord.id))
+        .where(PricingRecord.created_at >= thirty_days_ago)
+        .scalar_subquery()
+        .label("recent_pricing_count"),
+        select(func.count(Feedback.id)).scalar_subquery().label("feedback_count"),
+    ).cte("counts")
+
+    recent_props = (
+        select(Property)
+        .order_by(Property.updated_at.desc())
+        .limit(RECENT_PROPERTY_LIMIT)
+        .subquery("recent_props")
+    )
+    latest_pricing_id = (
+        select(PricingRecord.id)
+        .where(PricingRecord.property_id == recent_props.c.id)
+        .order_by(PricingRecord.created_at.desc())
+        .limit(1)
+        .correlate(recent_props)
+        .scalar_subquery()
+    )
+
+    # counts 作为驱动行，保证没有房源时也能返回计数
+    result = await db.execute(
+        select(
+            counts.c.property_count,
+            counts.c.recent_pricing_count,
+            counts.c.feedback_count,
+            recent_props.c.id,
+            recent_props.c.name,
+            recent_props.c.address,
+            recent_props.c.room_type,
+            recent_props.c.area,
+            recent_props.c.min_price,
+            recent_props.c.max_price,
+            PricingRecord.suggested_price,
+            PricingRecord.target_date,
+        )
+        .select_from(counts)
+        .outerjoin(recent_props, true())
+        .outerjoin(PricingRecord, PricingRecord.id == latest_pricing_id)
+        .order_by(recent_props.c.updated_at.desc())
+    )
+    rows = result.all()
+
+    properties = [
+        {
+            "id": row.id,
+            "name": row.name,
+            "address": row.address,
+            "room_type": row.room_type,
+            "area": row.area,
+            "min_price": row.min_price,
+            "max_price": row.max_price,
+            "latest_suggested_price": row.suggested_price,
+            "latest_pricing_date": row.target_date.isoformat() if row.target_date else None,
+        }
+        for row in rows
+        if row.id is not None
+    ]
+
+    return {
+        "property_count": rows[0].property_count or 0,
+        "recent_pricing_count": rows[0].recent_pricing_count or 0,
+        "feedback_count": rows[0].feedback_count or 0,
+        "properties": properties,
+    }
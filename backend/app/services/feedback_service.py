@@ -2,6 +2,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from app.models.feedback import Feedback
 from app.models.pricing import PricingRecord
+from app.services.dashboard_service import invalidate_summary
 
 
 async def create_feedback(db: AsyncSession, data: dict) -> Feedback:
@@ -9,6 +10,7 @@ async def create_feedback(db: AsyncSession, data: dict) -> Feedback:
     db.add(fb)
     await db.commit()
     await db.refresh(fb)
+    await invalidate_summary()
     return fb
 
 
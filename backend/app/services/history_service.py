@@ -0,0 +1,166 @@
+"""
+对话历史压缩：重建会话线程时决定送入模型的上下文。
+
+上下文 = 滚动摘要 + 置顶上下文（未确认的待执行操作、最近的定价结果）+ 最近若干轮原文。
+超出窗口的早期消息并入 Conversation.summary，每次只摘要新移出窗口的部分。
+"""
+import json
+
+from langchain_core.messages import HumanMessage, SystemMessage
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.agent.tokens import estimate_messages_tokens, estimate_tokens
+from app.core.config import settings
+from app.models.conversation import Conversation, Message
+from app.services.action_store import list_pending_actions
+from app.services.message_writer import wait_for_pending
+
+# 置顶的定价结果条数
+PINNED_PRICING_LIMIT = 3
+
+# 置顶的待执行操作数据最大字符数
+PINNED_DATA_CHARS = 500
+
+# 摘要调用失败时，摘录每条消息的最大字符数
+EXCERPT_CHARS = 100
+
+ROLE_LABELS = {"user": "房东", "assistant": "助手"}
+
+
+def needs_compaction(thread_messages: list) -> bool:
+    """线程中的历史超出 token 预算或轮数过多时需要重建"""
+    turns = sum(1 for m in thread_messages if getattr(m, "type", None) == "human")
+    return (
+        turns > settings.HISTORY_KEEP_TURNS * 2
+        or estimate_messages_tokens(thread_messages) > settings.HISTORY_TOKEN_BUDGET
+    )
+
+
+def _split_turns(messages: list[Message]) -> list[list[Message]]:
+    """按用户消息切分对话轮次，每轮以一条用户消息开头"""
+    turns: list[list[Message]] = []
+    for msg in messages:
+        if msg.role == "user" or not turns:
+            turns.append([msg])
+        else:
+            turns[-1].append(msg)
+    return turns
+
+
+def _recent_window(turns: list[list[Message]], budget: int) -> int:
+    """原文保留的起始轮次下标：最多 HISTORY_KEEP_TURNS 轮且不超出预算，至少保留最后一轮"""
+    start = len(turns)
+    used = 0
+    while start > 0 and len(turns) - start < settings.HISTORY_KEEP_TURNS:
+        cost = estimate_messages_tokens([_as_dict(m) for m in turns[start - 1]])
+        if start < len(turns) and used + cost > budget:
+            break
+        used += cost
+        start -= 1
+    return start
+
+
+def _as_dict(msg: Message) -> dict:
+    return {"role": msg.role, "content": msg.content}
+
+
+def _transcript(messages: list[Message], max_chars: int | None = None) -> str:
+    lines = []
+    for msg in messages:
+        content = msg.content if max_chars is None else msg.content[:max_chars]
+        lines.append(f"{ROLE_LABELS.get(msg.role, msg.role)}：{content}")
+    return "\n".join(lines)
+
+
+def _truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """保留文本末尾不超过 max_tokens 的部分"""
+    while text and estimate_tokens(text) > max_tokens:
+        text = text[len(text) // 4 or 1:]
+    return text
+
+
+async def _summarize(previous: str | None, messages: list[Message]) -> str:
+    """把新移出窗口的消息并入已有摘要；模型调用失败时退回逐条摘录"""
+    from app.agent.betastay_agent import get_summary_model
+    from app.agent.prompts import SUMMARY_PROMPT
+
+    max_tokens = settings.HISTORY_SUMMARY_MAX_TOKENS
+    body = f"已有摘要：\n{previous or '无'}\n\n新增对话：\n{_transcript(messages)}"
+    try:
+        result = await get_summary_model().ainvoke([
+            SystemMessage(content=SUMMARY_PROMPT.format(max_tokens=max_tokens)),
+            HumanMessage(content=body),
+        ])
+        summary = result.content.strip()
+    except Exception:
+        summary = ""
+    if not summary:
+        excerpt = _transcript(messages, max_chars=EXCERPT_CHARS)
+        summary = f"{previous}\n{excerpt}" if previous else excerpt
+    return _truncate_to_tokens(summary, max_tokens)
+
+
+async def _pinned_context(db: AsyncSession, conversation_id: str) -> str | None:
+    """消息原文之外模型仍需知道的上下文：未确认的待执行操作、最近的定价结果"""
+    lines = []
+
+    for action in await list_pending_actions(db, conversation_id):
+        data = json.dumps(action["data"], ensure_ascii=False)[:PINNED_DATA_CHARS]
+        lines.append(f"- 待用户确认的操作 {action['action_type']}：{data}")
+
+    result = await db.execute(
+        select(Message.tool_calls)
+        .where(
+            Message.conversation_id == conversation_id,
+            Message.tool_calls.is_not(None),
+        )
+        .order_by(Message.id.desc())
+        .limit(20)
+    )
+    pricing = []
+    for tool_calls in result.scalars().all():
+        pricing.extend(reversed((tool_calls or {}).get("pricing", [])))
+        if len(pricing) >= PINNED_PRICING_LIMIT:
+            break
+    for item in reversed(pricing[:PINNED_PRICING_LIMIT]):
+        lines.append(
+            f"- 定价结果：房源{item['property_id']} {item['target_date']} "
+            f"保守{item['conservative_price']} 建议{item['suggested_price']} "
+            f"激进{item['aggressive_price']}"
+        )
+
+    if not lines:
+        return None
+    return "【置顶上下文】\n" + "\n".join(lines)
+
+
+async def build_context(db: AsyncSession, conversation_id: str) -> list[dict]:
+    """重建会话线程的初始消息，必要时先增量更新滚动摘要"""
+    await wait_for_pending(conversation_id)
+    conv = await db.get(Conversation, conversation_id)
+    stmt = select(Message).where(Message.conversation_id == conversation_id)
+    if conv.summary_until_id is not None:
+        stmt = stmt.where(Message.id > conv.summary_until_id)
+    result = await db.execute(stmt.order_by(Message.created_at.asc(), Message.id.asc()))
+    messages = list(result.scalars().all())
+
+    turns = _split_turns(messages)
+    budget = settings.HISTORY_TOKEN_BUDGET - settings.HISTORY_SUMMARY_MAX_TOKENS
+    start = _recent_window(turns, budget)
+    older = [msg for turn in turns[:start] for msg in turn]
+    recent = [msg for turn in turns[start:] for msg in turn]
+
+    if older:
+        conv.summary = await _summarize(conv.summary, older)
+        conv.summary_until_id = older[-1].id
+        await db.commit()
+
+    context: list[dict] = []
+    if conv.summary:
+        context.append({"role": "system", "content": f"【早期对话摘要】\n{conv.summary}"})
+    pinned = await _pinned_context(db, conversation_id)
+    if pinned:
+        context.append({"role": "system", "content": pinned})
+    context.extend(_as_dict(msg) for msg in recent)
+    return context
@@ -0,0 +1,177 @@
+"""
+意图快速通道：在调用 Agent 之前用规则识别意图明确的短消息，直接执行对应工具并套用模板回复。
+
+例如"录入房源"只会调用 show_property_form，"给房源3算一下5月1日的价格"只会调用 pricing_calculate，
+无需一次带深度思考的模型往返。规则可插拔：继承 IntentRule 实现 match/handle 后注册到 IntentRouter。
+只有恰好一条规则命中时才走快速通道，未命中或多条命中（意图不明确）都交给 Agent。
+
+指标：chat_intent_routed_total{route} 记录每条新消息的路由（"agent" 或规则名），命中率 = 非 agent 路由数 / 总数；
+chat_turn_seconds{route} 记录一轮回复的耗时，节省的延迟 ≈ (agent 平均耗时 - 规则平均耗时) × 命中次数。
+"""
+import re
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+
+from prometheus_client import Counter, Histogram
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.services.pricing_service import calculate_and_save
+from app.tools.property_tool import PROPERTY_FORM_DEFINITION
+
+AGENT_ROUTE = "agent"
+
+ROUTED = Counter("chat_intent_routed_total", "每轮消息的路由结果", ["route"])
+TURN_SECONDS = Histogram(
+    "chat_turn_seconds",
+    "一轮回复从开始处理到完成的耗时",
+    ["route"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60),
+)
+
+
+@dataclass
+class IntentResult:
+    """快速通道的回复，按 Agent 路径相同的事件发给前端"""
+
+    content: str
+    pricing: list[dict] = field(default_factory=list)
+    form: dict | None = None
+
+
+class IntentRule(ABC):
+    """一条意图规则：match 判断是否命中并提取参数，handle 执行工具并生成回复"""
+
+    name: str = ""
+
+    @abstractmethod
+    def match(self, text: str) -> dict | None: ...
+
+    @abstractmethod
+    async def handle(self, db: AsyncSession, params: dict) -> IntentResult: ...
+
+
+class PropertyFormRule(IntentRule):
+    """"录入房源""新建一个房源"等：展示房源录入表单"""
+
+    name = "property_form"
+    pattern = re.compile(
+        r"(?:请|帮我|我想|我要|我想要)?(?:录入|新建|添加|新增|登记|创建)(?:一[个套间处])?(?:新的?)?(?:房源|民宿)"
+        r"(?:信息)?[。！!]?"
+    )
+
+    def match(self, text: str) -> dict | None:
+        return {} if self.pattern.fullmatch(text) else None
+
+    async def handle(self, db: AsyncSession, params: dict) -> IntentResult:
+        return IntentResult(
+            content="请在下方表单中填写房源信息，完成后点击提交。",
+            form=PROPERTY_FORM_DEFINITION,
+        )
+
+
+RELATIVE_DAYS = {"今天": 0, "明天": 1, "后天": 2}
+
+
+class PricingRule(IntentRule):
+    """"给房源3算一下5月1日的价格""房源3 2026-05-01定价"等：计算单日定价"""
+
+    name = "pricing"
+    pattern = re.compile(
+        r"(?:请|帮我|麻烦)?(?:给|帮|算一下|算算)?房源\s*(?:ID|id)?\s*(?P<property_id>\d+)\s*"
+        r"(?:算一下|算算|计算一下|计算|定一下价?|定个价|定价)?\s*"
+        r"(?P<date>\d{4}-\d{1,2}-\d{1,2}|(?:(?P<year>\d{4})年)?(?P<month>\d{1,2})月(?P<day>\d{1,2})[日号]"
+        r"|今天|明天|后天)\s*"
+        r"(?:的)?(?:价格|定价|房价|建议价)?(?:是多少|多少钱|定多少)?[。？?！!]?"
+    )
+
+    def match(self, text: str) -> dict | None:
+        m = self.pattern.fullmatch(text)
+        # 必须带有定价意图的字眼，"房源3 5月1日"这类不明确的交给 Agent
+        if not m or not re.search(r"价|算", text):
+            return None
+        target = self._parse_date(m)
+        if target is None:
+            return None
+        return {"property_id": int(m["property_id"]), "target_date": target}
+
+    @staticmethod
+    def _parse_date(m: re.Match) -> date | None:
+        today = date.today()
+        raw = m["date"]
+        if raw in RELATIVE_DAYS:
+            return today + timedelta(days=RELATIVE_DAYS[raw])
+        try:
+            if "-" in raw:
+                return date.fromisoformat("-".join(part.zfill(2) for part in raw.split("-")))
+            if m["year"]:
+                return date(int(m["year"]), int(m["month"]), int(m["day"]))
+            # 未写年份时取今天起最近的该日期
+            target = date(today.year, int(m["month"]), int(m["day"]))
+            if target < today:
+                target = target.replace(year=today.year + 1)
+            return target
+        except ValueError:
+            return None
+
+    async def handle(self, db: AsyncSession, params: dict) -> IntentResult:
+        property_id = params["property_id"]
+        target = params["target_date"]
+        record = await calculate_and_save(db, property_id, target)
+        if not record:
+            return IntentResult(content=f"未找到ID为{property_id}的房源，请确认房源编号。")
+
+        pricing = {
+            "pricing_record_id": record.id,
+            "property_id": record.property_id,
+            "target_date": record.target_date.isoformat(),
+            "conservative_price": float(record.conservative_price),
+            "suggested_price": float(record.suggested_price),
+            "aggressive_price": float(record.aggressive_price),
+        }
+        content = (
+            f"房源{property_id}在{pricing['target_date']}的定价建议：\n"
+            f"- 保守价：¥{pricing['conservative_price']:.0f}\n"
+            f"- 建议价：¥{pricing['suggested_price']:.0f}\n"
+            f"- 激进价：¥{pricing['aggressive_price']:.0f}\n\n"
+            "价格综合了季节、节假日、历史入住与同类房源行情。如需了解计算依据或调整，请继续告诉我。"
+        )
+        return IntentResult(content=content, pricing=[pricing])
+
+
+class IntentRouter:
+    def __init__(self, rules: list[IntentRule]):
+        self.rules = list(rules)
+
+    def register(self, rule: IntentRule) -> None:
+        self.rules.append(rule)
+
+    def route(self, text: str) -> tuple[IntentRule, dict] | None:
+        """恰好一条规则命中时返回 (规则, 参数)，否则返回 None 交给 Agent"""
+        text = text.strip()
+        matches = []
+        for rule in self.rules:
+            params = rule.match(text)
+            if params is not None:
+                matches.append((rule, params))
+        return matches[0] if len(matches) == 1 else None
+
+
+_router: IntentRouter | None = None
+
+
+def get_intent_router() -> IntentRouter | None:
+    """进程内共享的意图路由；INTENT_FAST_PATH 关闭时返回 None"""
+    global _router
+    if not settings.INTENT_FAST_PATH:
+        return None
+    if _router is None:
+        _router = IntentRouter([PropertyFormRule(), PricingRule()])
+    return _router
+
+
+def configure_intent_router(router: IntentRouter | None) -> None:
+    """替换意图路由（测试或扩展规则时使用）；传 None 则下次按默认规则重新创建"""
+    global _router
+    _router = router
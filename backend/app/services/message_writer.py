@@ -0,0 +1,184 @@
+"""
+助手消息的后台批量写入（write-behind）。
+
+MESSAGE_WRITE_BEHIND 开启时，流式回复结束后助手消息放入有界队列即可发送 done 事件，
+由后台写入任务把队列中的消息按批合并为一个事务插入；队列满时入队等待（背压），不丢消息。
+done 事件中的 id 为空（created_at 在入队时确定），前端重新加载会话后获得 id。
+
+读写一致：同一会话的消息读写（历史、编辑、重新生成、删除）前先调用 wait_for_pending 等待该会话的待写消息落库。
+应用关闭时（lifespan 退出）写完队列中剩余的消息。
+"""
+import asyncio
+import collections
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from prometheus_client import Counter, Gauge, Histogram
+from sqlalchemy import bindparam, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.config import settings
+from app.models.conversation import Conversation, Message
+
+logger = logging.getLogger(__name__)
+
+QUEUE_DEPTH = Gauge("message_write_queue_depth", "等待后台写入的消息数")
+BATCH_SIZE = Histogram(
+    "message_write_batch_size",
+    "后台写入每个事务插入的消息数",
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500),
+)
+FAILED = Counter("message_write_failed_total", "后台写入失败的消息数")
+
+
+_conversation = Conversation.__table__
+# 按会话累加消息计数，与插入在同一事务中执行（executemany）
+_COUNT_MESSAGES = (
+    update(_conversation)
+    .where(_conversation.c.id == bindparam("cid"))
+    .values(
+        message_count=_conversation.c.message_count + bindparam("messages"),
+        user_message_count=_conversation.c.user_message_count + bindparam("user_messages"),
+    )
+)
+
+
+def _count_params(rows: list[dict]) -> list[dict]:
+    messages = collections.Counter(row["conversation_id"] for row in rows)
+    user_messages = collections.Counter(row["conversation_id"] for row in rows if row["role"] == "user")
+    return [
+        {"cid": cid, "messages": count, "user_messages": user_messages[cid]}
+        for cid, count in messages.items()
+    ]
+
+
+class MessageWriter:
+    def __init__(self, session_factory: async_sessionmaker[AsyncSession], max_queue: int, max_batch: int):
+        self._session_factory = session_factory
+        self._queue: asyncio.Queue[tuple[dict, asyncio.Future]] = asyncio.Queue(max_queue)
+        self.max_batch = max_batch
+        self._pending: dict[str, set[asyncio.Future]] = {}
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def submit(self, values: dict) -> asyncio.Future:
+        """把一条消息（Message 的列值，需含 created_at）放入写入队列，队列满时等待；返回落库后得到消息 id 的 Future"""
+        conversation_id = values["conversation_id"]
+        future = asyncio.get_running_loop().create_future()
+        self._pending.setdefault(conversation_id, set()).add(future)
+        future.add_done_callback(lambda f: self._forget(conversation_id, f))
+        try:
+            await self._queue.put((values, future))
+        except BaseException:
+            # 排队等待中被取消（如生成被取消、应用关闭）：消息未入队，取消 Future 以免 wait_for 永远等待
+            future.cancel()
+            raise
+        QUEUE_DEPTH.set(self._queue.qsize())
+        return future
+
+    def _forget(self, conversation_id: str, future: asyncio.Future) -> None:
+        pending = self._pending.get(conversation_id)
+        if pending is not None:
+            pending.discard(future)
+            if not pending:
+                del self._pending[conversation_id]
+
+    async def wait_for(self, conversation_id: str) -> None:
+        """等待该会话已入队的消息全部写入（写入失败也返回）"""
+        pending = self._pending.get(conversation_id)
+        if pending:
+            # asyncio.wait 不会在调用方被取消时取消这些 Future
+            await asyncio.wait(set(pending))
+
+    async def close(self) -> None:
+        """写完队列中剩余的消息后停止后台任务"""
+        await self._queue.join()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.max_batch and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            QUEUE_DEPTH.set(self._queue.qsize())
+            try:
+                await self._write(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _write(self, batch: list[tuple[dict, asyncio.Future]]) -> None:
+        """整批一个事务插入；失败时逐条重试，避免一条坏数据拖累整批"""
+        try:
+            ids = await self._insert([values for values, _ in batch])
+            BATCH_SIZE.observe(len(batch))
+            for (_, future), message_id in zip(batch, ids):
+                future.set_result(message_id)
+            return
+        except Exception:
+            logger.exception("batch write of %d messages failed, retrying one by one", len(batch))
+        for values, future in batch:
+            try:
+                [message_id] = await self._insert([values])
+                future.set_result(message_id)
+            except Exception as e:
+                logger.exception("message write failed for conversation %s", values["conversation_id"])
+                FAILED.inc()
+                future.set_exception(e)
+
+    async def _insert(self, rows: list[dict]) -> list[int]:
+        async with self._session_factory() as db:
+            messages = [Message(**values) for values in rows]
+            db.add_all(messages)
+            await db.flush()
+            ids = [message.id for message in messages]
+            await db.execute(_COUNT_MESSAGES, _count_params(rows))
+            await db.commit()
+        return ids
+
+
+_writer: MessageWriter | None = None
+
+
+def get_message_writer() -> MessageWriter | None:
+    """已启动的后台写入器；未开启 write-behind 时为 None（消息同步写入）"""
+    return _writer
+
+
+def configure_message_writer(writer: MessageWriter | None) -> None:
+    """替换后台写入器（lifespan 与测试使用）；传 None 则恢复同步写入"""
+    global _writer
+    _writer = writer
+
+
+async def wait_for_pending(conversation_id: str) -> None:
+    """等待该会话交给后台写入的消息落库；未开启 write-behind 时立即返回"""
+    if _writer is not None:
+        await _writer.wait_for(conversation_id)
+
+
+@asynccontextmanager
+async def open_message_writer(
+    session_factory: async_sessionmaker[AsyncSession],
+) -> AsyncIterator[MessageWriter | None]:
+    """按配置启动后台写入器，退出时写完剩余消息（供应用 lifespan 使用）"""
+    if not settings.MESSAGE_WRITE_BEHIND:
+        yield None
+        return
+    writer = MessageWriter(
+        session_factory, settings.MESSAGE_WRITE_QUEUE_SIZE, settings.MESSAGE_WRITE_BATCH_SIZE
+    )
+    writer.start()
+    try:
+        yield writer
+    finally:
+        await writer.close()
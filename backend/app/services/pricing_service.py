@@ -1,11 +1,20 @@
 from datetime import date, datetime, timedelta
+import numpy as np
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+from sqlalchemy import Select, and_, case, func, insert, select, true
+from sqlalchemy.orm import aliased
 from app.models.pricing import PricingRecord
 from app.models.property import Property
 from app.models.transaction import Transaction
 from app.models.feedback import Feedback
-from app.engine.pricing_engine import PricingEngine
+from app.engine.config import HOLIDAY_PROXIMITY_DAYS
+from app.engine.holiday_calendar import get_holiday_calendar
+from app.engine.pricing_engine import HISTORICAL_STATS_KEYS, PricingEngine
+from app.services.dashboard_service import invalidate_summary
+
+# 因素数据的统计窗口
+HISTORY_WINDOW_DAYS = 180
+MARKET_WINDOW_DAYS = 90
 
 
 async def calculate_and_save(
@@ -14,38 +23,36 @@ async def calculate_and_save(
     target_date: date,
     base_price: float | None = None,
 ) -> PricingRecord | None:
-    # Fetch property
-    result = await db.execute(select(Property).where(Property.id == property_id))
-    prop = result.scalar_one_or_none()
-    if not prop:
+    # Property + every factor input in a single round trip
+    row = await _fetch_factor_inputs(db, property_id)
+    if not row:
         return None
 
     # Use min_price as base if not provided
-    effective_base = base_price or prop.min_price or 300.0
+    effective_base = base_price or row.min_price or 300.0
 
-    # Fetch factor data
-    historical_data = await _fetch_historical_data(db, property_id)
-    market_data = await _fetch_market_data(db, property_id, prop.room_type, prop.area)
-    external_events = await _fetch_external_events(db, property_id, target_date)
+    market_data = None
+    if row.similar_avg is not None and row.own_avg is not None:
+        market_data = {"similar_avg": float(row.similar_avg), "own_avg": float(row.own_avg)}
 
     engine = PricingEngine()
     pricing = engine.calculate(
         base_price=effective_base,
         owner_preference={
-            "min_price": prop.min_price or 0,
-            "max_price": prop.max_price or float("inf"),
-            "expected_return_rate": prop.expected_return_rate or 0,
-            "vacancy_tolerance": prop.vacancy_tolerance or 0.5,
+            "min_price": row.min_price or 0,
+            "max_price": row.max_price or float("inf"),
+            "expected_return_rate": row.expected_return_rate or 0,
+            "vacancy_tolerance": row.vacancy_tolerance or 0.5,
         },
         property_info={
-            "room_type": prop.room_type,
-            "area": prop.area,
-            "facilities": prop.facilities or {},
+            "room_type": row.room_type,
+            "area": row.area,
+            "facilities": row.facilities or {},
         },
         target_date=target_date,
-        historical_data=historical_data,
+        historical_data=_historical_stats(row),
         market_data=market_data,
-        external_events=external_events,
+        external_events=_external_events(target_date, row.avg_advance_days),
     )
 
     record = PricingRecord(
@@ -58,10 +65,81 @@ async def calculate_and_save(
     )
     db.add(record)
     await db.commit()
-    await db.refresh(record)
+    await invalidate_summary()
     return record
 
 
+async def calculate_batch(
+    db: AsyncSession,
+    dates: list[date],
+    property_ids: list[int] | None = None,
+    save: bool = False,
+) -> dict:
+    """组合批量定价：房源 × 日期 一次向量化计算。
+
+    不传 property_ids 时对全部房源定价。日期去重并升序，房源及历史因素、市场因素各一次查询，
+    save=True 时将整个价格矩阵批量写入 pricing_record（每个房源每个日期一条）。
+    """
+    dates = sorted(set(dates))
+    table = await _fetch_property_table(db, property_ids)
+    ids = table["property_id"]
+    if not ids:
+        return {
+            "dates": np.asarray(dates, dtype="datetime64[D]"),
+            "property_ids": np.asarray([], dtype=int),
+            "saved_count": 0,
+        }
+
+    table.update(await _fetch_market_stats(db, table))
+
+    engine = PricingEngine()
+    matrix = engine.calculate_matrix(table, dates)
+
+    saved_count = 0
+    if save:
+        saved_count = len(await _save_matrix(db, matrix))
+    matrix["saved_count"] = saved_count
+    return matrix
+
+
+async def calculate_dates_and_save(
+    db: AsyncSession,
+    property_id: int,
+    dates: list[date],
+    base_price: float | None = None,
+) -> list[dict] | None:
+    """单个房源多日定价：因素输入一次查询，全部日期一次向量化计算，一条批量 INSERT 写入。
+
+    结果按日期升序，每项含 pricing_record_id 与三档价格；房源不存在时返回 None。
+    """
+    row = await _fetch_factor_inputs(db, property_id)
+    if not row:
+        return None
+
+    table = _property_table([row])
+    if base_price:
+        table["base_price"] = [base_price]
+    if row.similar_avg is not None and row.own_avg is not None:
+        table["similar_avg"] = [float(row.similar_avg)]
+        table["own_avg"] = [float(row.own_avg)]
+
+    dates = sorted(set(dates))
+    engine = PricingEngine()
+    matrix = engine.calculate_matrix(table, dates)
+    record_ids = await _save_matrix(db, matrix)
+
+    return [
+        {
+            "pricing_record_id": record_id,
+            "target_date": target.isoformat(),
+            "conservative_price": float(matrix["conservative_price"][0, j]),
+            "suggested_price": float(matrix["suggested_price"][0, j]),
+            "aggressive_price": float(matrix["aggressive_price"][0, j]),
+        }
+        for j, (target, record_id) in enumerate(zip(dates, record_ids))
+    ]
+
+
 async def list_by_property(db: AsyncSession, property_id: int) -> list[PricingRecord]:
     result = await db.execute(
         select(PricingRecord)
@@ -71,133 +149,294 @@ async def list_by_property(db: AsyncSession, property_id: int) -> list[PricingRe
     return list(result.scalars().all())
 
 
-async def _fetch_historical_data(
-    db: AsyncSession, property_id: int
-) -> dict | None:
-    """Fetch 180-day transaction + feedback data for the historical performance factor."""
-    cutoff = datetime.utcnow() - timedelta(days=180)
+def _factor_inputs_select(property_ids: list[int] | None) -> Select:
+    """Property columns LEFT JOINed with per-property 180-day transaction/feedback aggregates."""
+    cutoff = datetime.utcnow() - timedelta(days=HISTORY_WINDOW_DAYS)
 
-    # Transactions in last 180 days
-    tx_result = await db.execute(
-        select(Transaction.actual_price, Transaction.check_in_date)
-        .where(Transaction.property_id == property_id)
-        .where(Transaction.created_at >= cutoff)
-        .order_by(Transaction.check_in_date)
+    tx_filter = [Transaction.created_at >= cutoff]
+    fb_filter = [Feedback.created_at >= cutoff]
+    if property_ids is not None:
+        tx_filter.append(Transaction.property_id.in_(property_ids))
+        fb_filter.append(PricingRecord.property_id.in_(property_ids))
+
+    # Transactions ranked by check_in_date so older/recent halves can be averaged in SQL
+    tx_ranked = (
+        select(
+            Transaction.property_id,
+            Transaction.actual_price,
+            Transaction.advance_days,
+            func.row_number()
+            .over(partition_by=Transaction.property_id, order_by=Transaction.check_in_date)
+            .label("rn"),
+            func.count().over(partition_by=Transaction.property_id).label("cnt"),
+        )
+        .where(*tx_filter)
+        .cte("tx_ranked")
+    )
+    tx_stats = (
+        select(
+            tx_ranked.c.property_id,
+            func.count().label("tx_count"),
+            func.avg(case((tx_ranked.c.rn * 2 <= tx_ranked.c.cnt, tx_ranked.c.actual_price))).label("tx_older_avg"),
+            func.avg(case((tx_ranked.c.rn * 2 > tx_ranked.c.cnt, tx_ranked.c.actual_price))).label("tx_recent_avg"),
+            func.avg(tx_ranked.c.advance_days).label("avg_advance_days"),
+        )
+        .group_by(tx_ranked.c.property_id)
+        .cte("tx_stats")
     )
-    transactions = [
-        {"actual_price": row.actual_price, "check_in_date": row.check_in_date}
-        for row in tx_result.all()
-    ]
 
-    # Feedback in last 180 days, joined with PricingRecord for suggested_price
-    fb_result = await db.execute(
+    # Feedback counts joined with PricingRecord for suggested_price
+    adjusted = and_(
+        Feedback.feedback_type == "调整",
+        Feedback.actual_price.is_not(None),
+        Feedback.actual_price != 0,
+        PricingRecord.suggested_price != 0,
+    )
+    fb_stats = (
         select(
-            Feedback.feedback_type,
-            Feedback.actual_price,
-            PricingRecord.suggested_price,
+            PricingRecord.property_id,
+            func.count(Feedback.id).label("fb_total"),
+            func.sum(case((Feedback.feedback_type == "采纳", 1), else_=0)).label("fb_accepted"),
+            func.sum(case((Feedback.feedback_type == "拒绝", 1), else_=0)).label("fb_rejected"),
+            func.sum(
+                case((and_(adjusted, Feedback.actual_price > PricingRecord.suggested_price), 1), else_=0)
+            ).label("fb_adjusted_up"),
+            func.sum(
+                case((and_(adjusted, Feedback.actual_price <= PricingRecord.suggested_price), 1), else_=0)
+            ).label("fb_adjusted_down"),
         )
         .join(PricingRecord, Feedback.pricing_record_id == PricingRecord.id)
-        .where(PricingRecord.property_id == property_id)
-        .where(Feedback.created_at >= cutoff)
+        .where(*fb_filter)
+        .group_by(PricingRecord.property_id)
+        .cte("fb_stats")
     )
-    feedbacks = [
-        {
-            "feedback_type": row.feedback_type,
-            "actual_price": row.actual_price,
-            "suggested_price": row.suggested_price,
-        }
-        for row in fb_result.all()
-    ]
 
-    if not transactions and not feedbacks:
-        return None
+    stmt = (
+        select(
+            Property.id,
+            Property.room_type,
+            Property.area,
+            Property.facilities,
+            Property.min_price,
+            Property.max_price,
+            Property.expected_return_rate,
+            Property.vacancy_tolerance,
+            func.coalesce(tx_stats.c.tx_count, 0).label("tx_count"),
+            tx_stats.c.tx_older_avg,
+            tx_stats.c.tx_recent_avg,
+            tx_stats.c.avg_advance_days,
+            func.coalesce(fb_stats.c.fb_total, 0).label("fb_total"),
+            fb_stats.c.fb_accepted,
+            fb_stats.c.fb_rejected,
+            fb_stats.c.fb_adjusted_up,
+            fb_stats.c.fb_adjusted_down,
+        )
+        .select_from(Property)
+        .outerjoin(tx_stats, tx_stats.c.property_id == Property.id)
+        .outerjoin(fb_stats, fb_stats.c.property_id == Property.id)
+    )
+    if property_ids is not None:
+        stmt = stmt.where(Property.id.in_(property_ids))
+    return stmt
+
 
-    return {"transactions": transactions, "feedbacks": feedbacks}
+async def _fetch_factor_inputs(db: AsyncSession, property_id: int):
+    """Fetch the property and every pricing factor input in one CTE-based query.
 
+    Returns None when the property does not exist.
+    """
+    cutoff = datetime.utcnow() - timedelta(days=MARKET_WINDOW_DAYS)
 
-async def _fetch_market_data(
-    db: AsyncSession, property_id: int, room_type: str, area: float
-) -> dict | None:
-    """Fetch 90-day comparable property pricing for the market factor."""
-    cutoff = datetime.utcnow() - timedelta(days=90)
-    area_low = area * 0.7
-    area_high = area * 1.3
+    # Own average in last 90 days
+    own_stats = (
+        select(func.avg(PricingRecord.suggested_price).label("own_avg"))
+        .where(PricingRecord.property_id == property_id)
+        .where(PricingRecord.created_at >= cutoff)
+        .cte("own_stats")
+    )
 
     # Similar properties: same room_type, area ±30%, exclude self
-    similar_stats = await db.execute(
-        select(
-            func.avg(PricingRecord.suggested_price).label("avg_price"),
-            func.min(PricingRecord.suggested_price).label("min_price"),
-            func.max(PricingRecord.suggested_price).label("max_price"),
+    target = aliased(Property)
+    similar = aliased(Property)
+    similar_stats = (
+        select(func.avg(PricingRecord.suggested_price).label("similar_avg"))
+        .join(similar, PricingRecord.property_id == similar.id)
+        .join(
+            target,
+            and_(
+                target.id == property_id,
+                similar.room_type == target.room_type,
+                similar.area >= target.area * 0.7,
+                similar.area <= target.area * 1.3,
+                similar.id != target.id,
+            ),
         )
-        .join(Property, PricingRecord.property_id == Property.id)
-        .where(Property.room_type == room_type)
-        .where(Property.area >= area_low)
-        .where(Property.area <= area_high)
-        .where(Property.id != property_id)
         .where(PricingRecord.created_at >= cutoff)
+        .cte("similar_stats")
     )
-    sim_row = similar_stats.one()
 
-    # Own average in last 90 days
-    own_stats = await db.execute(
-        select(func.avg(PricingRecord.suggested_price).label("avg_price"))
-        .where(PricingRecord.property_id == property_id)
-        .where(PricingRecord.created_at >= cutoff)
+    stmt = (
+        _factor_inputs_select([property_id])
+        .add_columns(own_stats.c.own_avg, similar_stats.c.similar_avg)
+        .outerjoin(own_stats, true())
+        .outerjoin(similar_stats, true())
     )
-    own_avg = own_stats.scalar()
+    result = await db.execute(stmt)
+    return result.one_or_none()
 
-    if sim_row.avg_price is None or own_avg is None:
+
+def _historical_stats(row) -> dict | None:
+    """Historical factor input from an aggregate row; None when there is no history."""
+    if not row.tx_count and not row.fb_total:
         return None
+    return {key: getattr(row, key) or 0 for key in HISTORICAL_STATS_KEYS}
 
-    return {
-        "similar_avg": float(sim_row.avg_price),
-        "similar_min": float(sim_row.min_price),
-        "similar_max": float(sim_row.max_price),
-        "own_avg": float(own_avg),
-    }
 
-
-async def _fetch_external_events(
-    db: AsyncSession, property_id: int, target_date: date
-) -> list[dict] | None:
-    """Fetch external event signals: holiday proximity + booking urgency."""
-    from app.engine.config import HOLIDAYS_2026
-
-    events: list[dict] = []
-
-    # Holiday proximity check (within 3 days of any holiday date)
-    all_holiday_dates: list[tuple[str, date]] = []
-    for name, dates in HOLIDAYS_2026.items():
-        for d in dates:
-            all_holiday_dates.append(
-                (name, date.fromisoformat(d))
-            )
-
-    for name, hdate in all_holiday_dates:
-        delta = abs((target_date - hdate).days)
-        if delta == 0:
-            events.append({"type": "holiday", "name": name, "distance_days": 0})
-            break
-        elif delta <= 3:
-            events.append({"type": "holiday_adjacent", "name": name, "distance_days": delta})
+def _external_events(target_date: date, avg_advance_days: float | None) -> list[dict] | None:
+    """External event signals: holiday proximity + booking urgency."""
+    events = _holiday_events(target_date)
 
     # Booking urgency: average advance_days for this property vs days until target
-    cutoff = datetime.utcnow() - timedelta(days=180)
-    adv_result = await db.execute(
-        select(func.avg(Transaction.advance_days))
-        .where(Transaction.property_id == property_id)
-        .where(Transaction.advance_days.is_not(None))
-        .where(Transaction.created_at >= cutoff)
-    )
-    avg_advance = adv_result.scalar()
-
-    if avg_advance is not None:
+    if avg_advance_days is not None:
         days_until = (target_date - date.today()).days
         events.append({
             "type": "booking_urgency",
-            "avg_advance_days": float(avg_advance),
+            "avg_advance_days": float(avg_advance_days),
             "days_until_target": max(days_until, 0),
         })
 
     return events if events else None
+
+
+def _holiday_events(target_date: date) -> list[dict]:
+    """Holiday proximity event for the nearest holiday within HOLIDAY_PROXIMITY_DAYS."""
+    info = get_holiday_calendar().lookup(target_date)
+    if info.is_holiday:
+        return [{"type": "holiday", "name": info.name, "distance_days": 0}]
+    if info.distance_days <= HOLIDAY_PROXIMITY_DAYS:
+        return [{"type": "holiday_adjacent", "name": info.name, "distance_days": info.distance_days}]
+    return []
+
+
+async def _fetch_property_table(
+    db: AsyncSession, property_ids: list[int] | None
+) -> dict[str, list]:
+    """Load properties and their historical aggregates as a columnar table.
+
+    Applies the same defaults as calculate_and_save.
+    """
+    result = await db.execute(
+        _factor_inputs_select(property_ids).order_by(Property.id)
+    )
+    return _property_table(result.all())
+
+
+def _property_table(rows) -> dict[str, list]:
+    """Columnar property table from factor-input rows, with calculate_and_save defaults."""
+    table = {
+        "property_id": [row.id for row in rows],
+        "base_price": [row.min_price or 300.0 for row in rows],
+        "room_type": [row.room_type for row in rows],
+        "area": [row.area for row in rows],
+        "min_price": [row.min_price or 0 for row in rows],
+        "max_price": [row.max_price or float("inf") for row in rows],
+        "expected_return_rate": [row.expected_return_rate or 0 for row in rows],
+        "vacancy_tolerance": [row.vacancy_tolerance or 0.5 for row in rows],
+        "avg_advance_days": [row.avg_advance_days for row in rows],
+    }
+    for key in HISTORICAL_STATS_KEYS:
+        table[key] = [getattr(row, key) for row in rows]
+    return table
+
+
+async def _fetch_market_stats(db: AsyncSession, table: dict[str, list]) -> dict[str, np.ndarray]:
+    """Per-property 90-day own/comparable average suggested price.
+
+    Comparable properties (same room_type, area ±30%, excluding self) are matched
+    with a vectorized comparison over every property priced in the window.
+    """
+    cutoff = datetime.utcnow() - timedelta(days=MARKET_WINDOW_DAYS)
+    result = await db.execute(
+        select(
+            Property.id,
+            Property.room_type,
+            Property.area,
+            func.count(PricingRecord.id).label("cnt"),
+            func.sum(PricingRecord.suggested_price).label("total"),
+        )
+        .join(PricingRecord, PricingRecord.property_id == Property.id)
+        .where(PricingRecord.created_at >= cutoff)
+        .group_by(Property.id, Property.room_type, Property.area)
+    )
+    rows = result.all()
+
+    n = len(table["property_id"])
+    if not rows:
+        return {"similar_avg": np.full(n, np.nan), "own_avg": np.full(n, np.nan)}
+
+    priced_ids = np.array([row.id for row in rows])
+    priced_room = np.array([row.room_type for row in rows])
+    priced_area = np.array([row.area for row in rows], dtype=float)
+    priced_cnt = np.array([row.cnt for row in rows], dtype=float)
+    priced_total = np.array([row.total for row in rows], dtype=float)
+
+    ids = np.asarray(table["property_id"])
+    area = np.asarray(table["area"], dtype=float)[:, None]
+    comparable = (
+        (priced_room[None, :] == np.asarray(table["room_type"])[:, None])
+        & (priced_area[None, :] >= area * 0.7)
+        & (priced_area[None, :] <= area * 1.3)
+        & (priced_ids[None, :] != ids[:, None])
+    )
+    similar_cnt = comparable @ priced_cnt
+    similar_total = comparable @ priced_total
+
+    own = priced_ids[None, :] == ids[:, None]
+    own_cnt = own @ priced_cnt
+    own_total = own @ priced_total
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return {
+            "similar_avg": np.where(similar_cnt > 0, similar_total / similar_cnt, np.nan),
+            "own_avg": np.where(own_cnt > 0, own_total / own_cnt, np.nan),
+        }
+
+
+async def _save_matrix(db: AsyncSession, matrix: dict) -> list[int]:
+    """Bulk insert every (property, date) cell of a batch pricing matrix.
+
+    Returns the new record ids in row-major (property, date) order.
+    """
+    shape = matrix["suggested_price"].shape
+    adjustments = {
+        factor: (np.broadcast_to(values["adjustment"], shape), values["weight"])
+        for factor, values in matrix["calculation_details"].items()
+    }
+    dates = matrix["dates"].astype(object)
+    rows = []
+    for i, pid in enumerate(matrix["property_ids"].tolist()):
+        for j, target in enumerate(dates):
+            rows.append({
+                "property_id": pid,
+                "target_date": target,
+                "conservative_price": float(matrix["conservative_price"][i, j]),
+                "suggested_price": float(matrix["suggested_price"][i, j]),
+                "aggressive_price": float(matrix["aggressive_price"][i, j]),
+                "calculation_details": {
+                    factor: {"adjustment": float(adj[i, j]), "weight": weight}
+                    for factor, (adj, weight) in adjustments.items()
+                },
+            })
+    if not rows:
+        return []
+    # RETURNING 不保证顺序（要求保序时 SQLite 会退化为逐行 INSERT），按 (房源, 日期) 对齐
+    result = await db.execute(
+        insert(PricingRecord).returning(
+            PricingRecord.id, PricingRecord.property_id, PricingRecord.target_date
+        ),
+        rows,
+    )
+    ids = {(pid, target): record_id for record_id, pid, target in result.all()}
+    await db.commit()
+    await invalidate_summary()
+    return [ids[(row["property_id"], row["target_date"])] for row in rows]
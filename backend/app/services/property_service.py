@@ -1,6 +1,41 @@
+from dataclasses import dataclass
+
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import func, or_, select
 from app.models.property import Property
+from app.services.dashboard_service import invalidate_summary
+
+
+@dataclass(frozen=True)
+class PropertyFilter:
+    """房源列表的服务端筛选条件，未设置的条件不参与筛选"""
+
+    keyword: str | None = None  # 名称或地址包含（不区分大小写）
+    room_type: str | None = None
+    min_area: float | None = None
+    max_area: float | None = None
+    # 房东可接受价格区间与 [price_from, price_to] 有交集；未设置最低/最高价的一端视为不限
+    price_from: float | None = None
+    price_to: float | None = None
+
+    def conditions(self) -> list:
+        conds = []
+        if self.keyword:
+            conds.append(or_(
+                Property.name.icontains(self.keyword, autoescape=True),
+                Property.address.icontains(self.keyword, autoescape=True),
+            ))
+        if self.room_type:
+            conds.append(Property.room_type == self.room_type)
+        if self.min_area is not None:
+            conds.append(Property.area >= self.min_area)
+        if self.max_area is not None:
+            conds.append(Property.area <= self.max_area)
+        if self.price_from is not None:
+            conds.append(or_(Property.max_price.is_(None), Property.max_price >= self.price_from))
+        if self.price_to is not None:
+            conds.append(or_(Property.min_price.is_(None), Property.min_price <= self.price_to))
+        return conds
 
 
 async def create_property(db: AsyncSession, data: dict) -> Property:
@@ -8,6 +43,7 @@ async def create_property(db: AsyncSession, data: dict) -> Property:
     db.add(prop)
     await db.commit()
     await db.refresh(prop)
+    await invalidate_summary()
     return prop
 
 
@@ -16,11 +52,32 @@ async def get_property(db: AsyncSession, property_id: int) -> Property | None:
     return result.scalar_one_or_none()
 
 
-async def list_properties(db: AsyncSession) -> list[Property]:
-    result = await db.execute(select(Property).order_by(Property.created_at.desc()))
+async def list_properties(
+    db: AsyncSession,
+    filters: PropertyFilter | None = None,
+    after_id: int | None = None,
+    limit: int | None = None,
+) -> list[Property]:
+    """按 id 倒序（新录入的在前）列出房源。
+
+    键集分页：after_id 传上一页最后一条的 id，只取 id 更小的房源，翻页开销与页码无关。
+    """
+    stmt = select(Property).where(*(filters or PropertyFilter()).conditions())
+    if after_id is not None:
+        stmt = stmt.where(Property.id < after_id)
+    stmt = stmt.order_by(Property.id.desc())
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    result = await db.execute(stmt)
     return list(result.scalars().all())
 
 
+async def count_properties(db: AsyncSession, filters: PropertyFilter | None = None) -> int:
+    """符合筛选条件的房源总数（不受分页影响）"""
+    stmt = select(func.count()).select_from(Property).where(*(filters or PropertyFilter()).conditions())
+    return (await db.execute(stmt)).scalar_one()
+
+
 async def update_property(db: AsyncSession, property_id: int, data: dict) -> Property | None:
     prop = await get_property(db, property_id)
     if not prop:
@@ -30,6 +87,7 @@ async def update_property(db: AsyncSession, property_id: int, data: dict) -> Pro
             setattr(prop, key, value)
     await db.commit()
     await db.refresh(prop)
+    await invalidate_summary()
     return prop
 
 
@@ -39,4 +97,5 @@ async def delete_property(db: AsyncSession, property_id: int) -> bool:
         return False
     await db.delete(prop)
     await db.commit()
+    await invalidate_summary()
     return True
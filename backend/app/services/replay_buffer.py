@@ -0,0 +1,144 @@
+"""
+流式生成的事件编号与重放缓冲。
+
+每次流式生成在后台任务中运行，产出的 SSE 帧依次编号（id: <generation_id>:<seq>）并写入有界缓冲，
+HTTP 连接只是订阅者。连接中断后客户端携带 Last-Event-ID 重连，即可拿到错过的帧并继续接收后续帧，
+无需重新调用模型。缓冲保存在进程内存中，多 worker 部署时重连需路由到同一 worker。
+"""
+import asyncio
+import logging
+import uuid
+from collections import deque
+from typing import AsyncIterator, Callable
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ReplayExpired(Exception):
+    """请求的事件已被移出重放缓冲"""
+
+
+class Generation:
+    """一次流式生成：按序编号的 SSE 帧、有界重放缓冲与订阅"""
+
+    def __init__(self, conversation_id: str, buffer_size: int):
+        self.id = uuid.uuid4().hex
+        self.conversation_id = conversation_id
+        self.done = False
+        self._frames: deque[tuple[int, str]] = deque(maxlen=buffer_size)
+        self._seq = 0
+        self._changed = asyncio.Condition()
+        self.task: asyncio.Task | None = None
+        self._subscribers = 0
+        self._cancel_timer: asyncio.TimerHandle | None = None
+
+    async def publish(self, frame: str) -> None:
+        async with self._changed:
+            self._seq += 1
+            self._frames.append((self._seq, f"id: {self.id}:{self._seq}\n{frame}"))
+            self._changed.notify_all()
+
+    async def finish(self) -> None:
+        async with self._changed:
+            self.done = True
+            self._changed.notify_all()
+
+    def subscribe(self) -> "Subscription":
+        """登记一个订阅者（HTTP 连接），取消待执行的生成取消"""
+        self._subscribers += 1
+        if self._cancel_timer is not None:
+            self._cancel_timer.cancel()
+            self._cancel_timer = None
+        return Subscription(self)
+
+    def _unsubscribe(self) -> None:
+        self._subscribers -= 1
+        if self._subscribers == 0 and not self.done:
+            self._cancel_timer = asyncio.get_running_loop().call_later(
+                settings.SSE_DISCONNECT_GRACE, self.cancel
+            )
+
+    def cancel(self) -> None:
+        """取消仍在运行的生成"""
+        if self.task is not None and not self.task.done():
+            self.task.cancel()
+
+    def can_resume(self, after: int) -> bool:
+        """after 之后的帧是否都还在缓冲中"""
+        if not self._frames:
+            return True
+        return after >= self._frames[0][0] - 1
+
+    async def frames(self, after: int = 0) -> AsyncIterator[str]:
+        """依次产出 seq > after 的帧：先重放缓冲，再跟随实时产出，生成结束后返回"""
+        while True:
+            async with self._changed:
+                if not self.can_resume(after):
+                    raise ReplayExpired(self.id)
+                pending = [(seq, frame) for seq, frame in self._frames if seq > after]
+                if not pending:
+                    if self.done:
+                        return
+                    await self._changed.wait()
+                    continue
+            for seq, frame in pending:
+                yield frame
+                after = seq
+
+
+class Subscription:
+    def __init__(self, generation: Generation):
+        self._generation = generation
+        self.closed = False
+
+    def close(self) -> None:
+        """退订，可重复调用"""
+        if not self.closed:
+            self.closed = True
+            self._generation._unsubscribe()
+
+
+_generations: dict[str, Generation] = {}
+
+
+def start_generation(
+    conversation_id: str,
+    source: AsyncIterator[str],
+    on_finish: Callable[[], None] | None = None,
+) -> Generation:
+    """在后台任务中运行 source，产出的帧写入新生成的重放缓冲；任务结束（含取消）后调用 on_finish"""
+    generation = Generation(conversation_id, settings.SSE_REPLAY_BUFFER_SIZE)
+    _generations[generation.id] = generation
+
+    async def run():
+        try:
+            async for frame in source:
+                await generation.publish(frame)
+        except Exception:
+            logger.exception("generation %s failed", generation.id)
+        finally:
+            # 先于 finish 调用：订阅者收到结束时，会话已可开始下一轮
+            if on_finish is not None:
+                on_finish()
+            await generation.finish()
+            # 结束后保留一段时间供断线重连
+            asyncio.get_running_loop().call_later(
+                settings.SSE_REPLAY_TTL, _generations.pop, generation.id, None
+            )
+
+    generation.task = asyncio.create_task(run())
+    return generation
+
+
+def get_generation(generation_id: str) -> Generation | None:
+    return _generations.get(generation_id)
+
+
+def parse_event_id(event_id: str) -> tuple[str, int] | None:
+    """解析 Last-Event-ID（<generation_id>:<seq>），格式不正确时返回 None"""
+    generation_id, _, seq = event_id.strip().partition(":")
+    if not generation_id or not seq.isdigit():
+        return None
+    return generation_id, int(seq)
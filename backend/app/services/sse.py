@@ -0,0 +1,117 @@
+"""
+SSE 帧编码与合并写出。
+
+模型每个流式片段只有几个字，逐片段发帧会产生大量帧和系统调用。
+合并写出对 thinking/content 文本片段节流：距上一帧超过合并窗口的片段立即发出（首字不受影响），
+窗口内到达的片段累积到窗口结束或达到字节上限后合并为一帧。其余事件按原顺序立即发出。
+"""
+import asyncio
+import time
+from typing import AsyncIterator
+
+import orjson
+
+# 可合并的文本事件，data 形如 {"content": "..."}
+COALESCED_EVENTS = ("thinking", "content")
+
+_DONE = object()
+_FLUSH = object()
+
+
+def format_event(event: str, data: dict) -> str:
+    """编码一个 SSE 帧"""
+    return f"event: {event}\ndata: {orjson.dumps(data).decode()}\n\n"
+
+
+class _Failure:
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+async def coalesce_events(
+    source: AsyncIterator[tuple[str, dict]], window_ms: int, max_bytes: int
+) -> AsyncIterator[str]:
+    """把 (event, data) 事件流编码为 SSE 帧，合并窗口内连续的同类文本片段。
+
+    上游在独立任务中运行，上游停顿时窗口到期的缓冲也能及时发出；下游关闭时取消上游。
+    window_ms <= 0 时不合并。
+    """
+    if window_ms <= 0:
+        async for event, data in source:
+            yield format_event(event, data)
+        return
+
+    window = window_ms / 1000
+    loop = asyncio.get_running_loop()
+    # 不限长度：上游受模型生成速度约束，且窗口到期的 flush 标记需要能随时放入
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def pump():
+        try:
+            async for item in source:
+                queue.put_nowait(item)
+        except Exception as e:
+            queue.put_nowait(_Failure(e))
+        else:
+            queue.put_nowait(_DONE)
+
+    task = asyncio.create_task(pump())
+    buffer_event: str | None = None
+    buffer: list[str] = []
+    buffer_bytes = 0
+    last_emit = float("-inf")
+    timer: asyncio.TimerHandle | None = None
+
+    def flush() -> str | None:
+        nonlocal buffer_event, buffer, buffer_bytes, last_emit, timer
+        if timer is not None:
+            timer.cancel()
+            timer = None
+        if not buffer:
+            return None
+        frame = format_event(buffer_event, {"content": "".join(buffer)})
+        buffer_event, buffer, buffer_bytes = None, [], 0
+        last_emit = time.monotonic()
+        return frame
+
+    try:
+        while True:
+            item = await queue.get()
+
+            if item is _FLUSH:
+                frame = flush()
+                if frame:
+                    yield frame
+                continue
+
+            if item is _DONE or isinstance(item, _Failure):
+                frame = flush()
+                if frame:
+                    yield frame
+                if isinstance(item, _Failure):
+                    raise item.error
+                return
+
+            event, data = item
+            if event in COALESCED_EVENTS and data.keys() == {"content"}:
+                if buffer_event not in (None, event):
+                    yield flush()
+                buffer_event = event
+                buffer.append(data["content"])
+                buffer_bytes += len(data["content"].encode())
+                now = time.monotonic()
+                if buffer_bytes >= max_bytes or now - last_emit >= window:
+                    yield flush()
+                elif timer is None:
+                    # 窗口到期时即使上游停顿也发出缓冲
+                    timer = loop.call_later(last_emit + window - now, queue.put_nowait, _FLUSH)
+            else:
+                frame = flush()
+                if frame:
+                    yield frame
+                yield format_event(event, data)
+    finally:
+        if timer is not None:
+            timer.cancel()
+        task.cancel()
+        await asyncio.wait([task])
@@ -1,20 +1,22 @@
 from langchain_core.tools import tool
 
+from app.tools.serialization import pending_action_view, tool_result
 
-@tool
+
+@tool(response_format="content_and_artifact")
 async def feedback_record(
     pricing_record_id: int,
     feedback_type: str,
     actual_price: float | None = None,
     note: str | None = None,
-) -> dict:
+) -> tuple[str, dict]:
     """记录房东对定价建议的反馈。feedback_type为adopted(采纳)、rejected(拒绝)或adjusted(调整)。如果是调整，需要提供actual_price。返回的数据需要用户确认后才会入库。"""
     # 验证
     valid_types = {"adopted", "rejected", "adjusted"}
     if feedback_type not in valid_types:
-        return {"success": False, "error": f"feedback_type必须是 {valid_types} 之一"}
+        return tool_result({"success": False, "error": f"feedback_type必须是 {valid_types} 之一"})
     if feedback_type == "adjusted" and actual_price is None:
-        return {"success": False, "error": "调整反馈需要提供actual_price"}
+        return tool_result({"success": False, "error": "调整反馈需要提供actual_price"})
 
     data = {
         "pricing_record_id": pricing_record_id,
@@ -24,7 +26,7 @@ async def feedback_record(
     }
 
     type_labels = {"adopted": "采纳建议价", "rejected": "拒绝建议", "adjusted": "手动调整"}
-    return {
+    result = {
         "action": "record_feedback",
         "pending_confirmation": True,
         "data": data,
@@ -38,6 +40,7 @@ async def feedback_record(
             },
         },
     }
+    return tool_result(result, pending_action_view(result))
 
 
 feedback_record_tool = feedback_record
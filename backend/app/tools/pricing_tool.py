@@ -1,16 +1,27 @@
 from langchain_core.tools import tool
-from datetime import date
+from datetime import date, timedelta
 from app.tools.context import get_db_session
-from app.services.pricing_service import calculate_and_save
+from app.services.pricing_service import calculate_and_save, calculate_dates_and_save
+from app.tools.serialization import pricing_range_view, pricing_view, tool_result
 
+# 区间定价一次最多的天数
+MAX_RANGE_DAYS = 31
 
-@tool
+
+@tool(response_format="content_and_artifact")
 async def pricing_calculate(
     property_id: int,
     target_date: str,
     base_price: float | None = None,
-) -> dict:
-    """计算指定房源在目标日期的建议定价。返回保守价、建议价、激进价三档价格以及计算依据明细。target_date格式为YYYY-MM-DD。"""
+) -> tuple[str, dict]:
+    """计算指定房源在目标日期的建议定价。target_date格式为YYYY-MM-DD。
+    返回 prices 为 [保守价, 建议价, 激进价]；factors 为计算依据，各定价因素的 [调整幅度, 权重]，
+    键名：pref 房东偏好、hist 历史表现、time 时间、mkt 市场、base 基础属性、ext 外部事件，未列出的因素无调整。"""
+    result = await _calculate(property_id, target_date, base_price)
+    return tool_result(result, pricing_view(result))
+
+
+async def _calculate(property_id: int, target_date: str, base_price: float | None) -> dict:
     db = get_db_session()
 
     try:
@@ -35,3 +46,60 @@ async def pricing_calculate(
 
 
 pricing_calculate_tool = pricing_calculate
+
+
+@tool(response_format="content_and_artifact")
+async def pricing_calculate_range(
+    property_id: int,
+    start_date: str | None = None,
+    end_date: str | None = None,
+    dates: list[str] | None = None,
+    base_price: float | None = None,
+) -> tuple[str, dict]:
+    """一次计算指定房源在多个日期的建议定价，用于"下周每天""五一假期"等多日定价，不要逐日调用 pricing_calculate。
+    传入 start_date 和 end_date（含首尾两天）表示连续区间，或传入 dates 列表表示若干具体日期，日期格式均为YYYY-MM-DD。
+    一次最多31天。返回逐日价格表，columns 给出各列含义。"""
+    result = await _calculate_range(property_id, start_date, end_date, dates, base_price)
+    return tool_result(result, pricing_range_view(result))
+
+
+async def _calculate_range(
+    property_id: int,
+    start_date: str | None,
+    end_date: str | None,
+    dates: list[str] | None,
+    base_price: float | None,
+) -> dict:
+    db = get_db_session()
+    too_many = {"success": False, "error": f"一次最多计算{MAX_RANGE_DAYS}天，请缩小日期范围"}
+
+    # 先检查天数再生成日期：日期由模型给出，过大的区间不应在事件循环上展开
+    try:
+        if dates:
+            if len(dates) > MAX_RANGE_DAYS:
+                return too_many
+            targets = [date.fromisoformat(d) for d in dates]
+        elif start_date and end_date:
+            start, end = date.fromisoformat(start_date), date.fromisoformat(end_date)
+            if end < start:
+                return {"success": False, "error": "结束日期不能早于开始日期"}
+            if (end - start).days + 1 > MAX_RANGE_DAYS:
+                return too_many
+            targets = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+        else:
+            return {"success": False, "error": "请传入 start_date 和 end_date，或 dates 列表"}
+    except ValueError:
+        return {"success": False, "error": "日期格式错误，请使用YYYY-MM-DD格式"}
+
+    prices = await calculate_dates_and_save(db, property_id, targets, base_price)
+    if prices is None:
+        return {"success": False, "error": f"未找到ID为{property_id}的房源"}
+
+    return {
+        "success": True,
+        "property_id": property_id,
+        "prices": prices,
+    }
+
+
+pricing_calculate_range_tool = pricing_calculate_range
@@ -1,8 +1,12 @@
 from langchain_core.tools import tool
-from sqlalchemy import select
 
-from app.models.property import Property
+from app.services.property_service import PropertyFilter, count_properties, get_property, list_properties
 from app.tools.context import get_db_session
+from app.tools.serialization import LIST_TOP_K, pending_action_view, tool_result
+
+# 房源列表每页默认条数与上限
+PAGE_SIZE = LIST_TOP_K
+MAX_PAGE_SIZE = 50
 
 # 表单字段定义 — 由 _invoke_agent_stream 在检测到 __FORM_RENDERED__ 后发送给前端
 PROPERTY_FORM_DEFINITION = {
@@ -21,61 +25,96 @@ PROPERTY_FORM_DEFINITION = {
 }
 
 
-@tool
-async def property_query(property_id: int | None = None) -> dict:
-    """查询已有的民宿房源信息。可以传入property_id查询指定房源，不传则返回所有房源列表。"""
-    db = get_db_session()
-
+@tool(response_format="content_and_artifact")
+async def property_query(
+    property_id: int | None = None,
+    keyword: str | None = None,
+    room_type: str | None = None,
+    min_area: float | None = None,
+    max_area: float | None = None,
+    price_from: float | None = None,
+    price_to: float | None = None,
+    after_id: int | None = None,
+    limit: int = PAGE_SIZE,
+) -> tuple[str, dict]:
+    """查询已有的民宿房源信息。传入property_id查询指定房源的完整信息；不传则按条件分页返回房源列表（新录入的在前）。
+    筛选条件（均可选）：keyword 名称或地址包含的关键词，room_type 房型，min_area/max_area 面积范围(㎡)，
+    price_from/price_to 价格范围(元，与房东设置的最低~最高价有交集即命中)。
+    列表结果中 total 为符合条件的总数；如有 next_after_id，说明还有更多，把它作为 after_id 传入获取下一页。
+    limit 为每页条数，最多50。请尽量用筛选条件缩小范围，而不是逐页翻阅全部房源。"""
     if property_id:
-        result = await db.execute(select(Property).where(Property.id == property_id))
-        prop = result.scalar_one_or_none()
-        if not prop:
-            return {"success": False, "error": f"未找到ID为{property_id}的房源"}
-        return {
-            "success": True,
-            "property": {
-                "id": prop.id,
-                "name": prop.name,
-                "address": prop.address,
-                "room_type": prop.room_type,
-                "area": float(prop.area),
-                "facilities": prop.facilities or {},
-                "description": prop.description,
-                "min_price": float(prop.min_price) if prop.min_price else None,
-                "max_price": float(prop.max_price) if prop.max_price else None,
-                "expected_return_rate": float(prop.expected_return_rate)
-                if prop.expected_return_rate
-                else None,
-                "vacancy_tolerance": float(prop.vacancy_tolerance)
-                if prop.vacancy_tolerance
-                else None,
-            },
-        }
-    else:
-        result = await db.execute(select(Property).order_by(Property.created_at.desc()))
-        props = result.scalars().all()
-        return {
-            "success": True,
-            "total": len(list(props)),
-            "properties": [
-                {
-                    "id": p.id,
-                    "name": p.name,
-                    "address": p.address,
-                    "room_type": p.room_type,
-                    "area": float(p.area),
-                    "min_price": float(p.min_price) if p.min_price else None,
-                    "max_price": float(p.max_price) if p.max_price else None,
-                }
-                for p in props
-            ],
-        }
+        return tool_result(await _get(property_id))
+    filters = PropertyFilter(
+        keyword=keyword,
+        room_type=room_type,
+        min_area=min_area,
+        max_area=max_area,
+        price_from=price_from,
+        price_to=price_to,
+    )
+    return tool_result(await _list(filters, after_id, limit))
+
+
+async def _get(property_id: int) -> dict:
+    prop = await get_property(get_db_session(), property_id)
+    if not prop:
+        return {"success": False, "error": f"未找到ID为{property_id}的房源"}
+    return {
+        "success": True,
+        "property": {
+            "id": prop.id,
+            "name": prop.name,
+            "address": prop.address,
+            "room_type": prop.room_type,
+            "area": float(prop.area),
+            "facilities": prop.facilities or {},
+            "description": prop.description,
+            "min_price": float(prop.min_price) if prop.min_price else None,
+            "max_price": float(prop.max_price) if prop.max_price else None,
+            "expected_return_rate": float(prop.expected_return_rate)
+            if prop.expected_return_rate
+            else None,
+            "vacancy_tolerance": float(prop.vacancy_tolerance)
+            if prop.vacancy_tolerance
+            else None,
+        },
+    }
+
+
+async def _list(filters: PropertyFilter, after_id: int | None, limit: int) -> dict:
+    db = get_db_session()
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+    # 多取一条判断是否还有下一页
+    props = await list_properties(db, filters, after_id=after_id, limit=limit + 1)
+    has_more = len(props) > limit
+    props = props[:limit]
+
+    result = {
+        "success": True,
+        "total": await count_properties(db, filters),
+        "properties": [
+            {
+                "id": p.id,
+                "name": p.name,
+                "address": p.address,
+                "room_type": p.room_type,
+                "area": float(p.area),
+                "min_price": float(p.min_price) if p.min_price else None,
+                "max_price": float(p.max_price) if p.max_price else None,
+            }
+            for p in props
+        ],
+    }
+    if has_more:
+        result["next_after_id"] = props[-1].id
+    return result
 
 
 property_query_tool = property_query
 
 
-@tool
+@tool(response_format="content_and_artifact")
 async def property_create(
     name: str,
     address: str,
@@ -87,16 +126,16 @@ async def property_create(
     max_price: float | None = None,
     expected_return_rate: float | None = None,
     vacancy_tolerance: float | None = None,
-) -> dict:
+) -> tuple[str, dict]:
     """录入新的民宿房源信息。向用户收集信息时，请用（必填）和（选填）标注字段，不要使用 * 号标记。
     必填字段：name（房源名称）、address（地址）、room_type（房型）、area（面积）。
     选填字段：facilities（设施）、description（描述）、min_price（最低价）、max_price（最高价）、expected_return_rate（期望收益率）、vacancy_tolerance（空置容忍度）。
     返回的数据需要用户确认后才会入库。"""
     # 基础验证
     if area <= 0:
-        return {"success": False, "error": "面积必须大于0"}
+        return tool_result({"success": False, "error": "面积必须大于0"})
     if min_price is not None and max_price is not None and min_price > max_price:
-        return {"success": False, "error": "最低价不能大于最高价"}
+        return tool_result({"success": False, "error": "最低价不能大于最高价"})
 
     data = {
         "name": name,
@@ -111,7 +150,7 @@ async def property_create(
         "vacancy_tolerance": vacancy_tolerance,
     }
 
-    return {
+    result = {
         "action": "create_property",
         "pending_confirmation": True,
         "data": data,
@@ -127,6 +166,7 @@ async def property_create(
             },
         },
     }
+    return tool_result(result, pending_action_view(result))
 
 
 property_create_tool = property_create
@@ -0,0 +1,101 @@
+"""
+工具结果的两种视图。
+
+工具以 content_and_artifact 形式返回：完整结果作为 ToolMessage.artifact，只供 chat_service 生成
+SSE 事件（pricing/action）；送入模型的 content 是紧凑视图。紧凑视图会写入会话线程，之后每轮随历史
+送入模型，因此数字保留有限位数、省略空值、定价因素键名缩写，JSON 不带空白、不转义中文。
+列表类工具按 id 键集分页，每页默认 LIST_TOP_K 条并附符合条件的总数，还有更多时给出 next_after_id
+供模型作为 after_id 获取下一页。
+"""
+import json
+
+# 定价因素键名缩写，工具说明中给出对照
+FACTOR_KEYS = {
+    "owner_preference": "pref",
+    "historical_performance": "hist",
+    "time_factor": "time",
+    "market_factor": "mkt",
+    "property_base": "base",
+    "external_event": "ext",
+}
+
+# 列表类工具每页默认返回的条数
+LIST_TOP_K = 10
+
+# 价格保留整数，调整系数保留的小数位数
+ADJUSTMENT_DIGITS = 3
+
+
+def compact_json(data) -> str:
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+
+
+def compact(value, digits: int = 2):
+    """递归去掉 None 值、浮点数四舍五入（整数值去掉小数部分）"""
+    if isinstance(value, dict):
+        return {k: compact(v, digits) for k, v in value.items() if v is not None}
+    if isinstance(value, (list, tuple)):
+        return [compact(v, digits) for v in value]
+    if isinstance(value, float):
+        value = round(value, digits)
+        return int(value) if value.is_integer() else value
+    return value
+
+
+def compact_factors(details: dict) -> dict:
+    """定价因素 → {缩写: [调整幅度, 权重]}，省略无调整的因素"""
+    factors = {}
+    for name, value in details.items():
+        adjustment = round(float(value["adjustment"]), ADJUSTMENT_DIGITS)
+        if adjustment:
+            factors[FACTOR_KEYS.get(name, name)] = [adjustment, value["weight"]]
+    return factors
+
+
+def price_tiers(item: dict) -> list:
+    """[保守, 建议, 激进] 三档价格，四舍五入到元"""
+    return [
+        round(item["conservative_price"]),
+        round(item["suggested_price"]),
+        round(item["aggressive_price"]),
+    ]
+
+
+def pricing_view(result: dict) -> dict:
+    """单日定价的紧凑视图"""
+    if not result.get("success"):
+        return result
+    return {
+        "success": True,
+        "pricing_record_id": result["pricing_record_id"],
+        "property_id": result["property_id"],
+        "date": result["target_date"],
+        "prices": price_tiers(result),
+        "factors": compact_factors(result.get("calculation_details") or {}),
+    }
+
+
+def pricing_range_view(result: dict) -> dict:
+    """区间定价的紧凑视图：按列给出逐日价格表"""
+    if not result.get("success"):
+        return result
+    return {
+        "success": True,
+        "property_id": result["property_id"],
+        "columns": ["date", "pricing_record_id", "conservative", "suggested", "aggressive"],
+        "rows": [
+            [p["target_date"], p["pricing_record_id"], *price_tiers(p)]
+            for p in result["prices"]
+        ],
+    }
+
+
+def pending_action_view(result: dict) -> dict:
+    """待确认操作的紧凑视图：去掉给前端展示用的 display"""
+    view = {k: v for k, v in result.items() if k != "display"}
+    return compact(view)
+
+
+def tool_result(result: dict, view: dict | None = None) -> tuple[str, dict]:
+    """content_and_artifact 工具的返回值：(送入模型的紧凑 JSON, 完整结果)"""
+    return compact_json(compact(view if view is not None else result)), result
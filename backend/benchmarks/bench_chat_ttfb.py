@@ -0,0 +1,76 @@
+"""对话首字节基准：每条消息新建 Agent 与进程内共享 Agent 的首个 SSE 事件耗时。
+
+模型替换为不发起网络请求、立即返回固定片段的 ChatTongyi 子类，
+只衡量客户端构建、工具绑定与图编译等请求前开销。
+
+用法: python -m benchmarks.bench_chat_ttfb [--repeat 50]
+"""
+import argparse
+import asyncio
+import time
+from unittest.mock import patch
+
+from benchmarks.common import create_bench_db, format_stats, summarize
+
+from langchain_community.chat_models import ChatTongyi  # noqa: E402
+from langchain_core.messages import AIMessageChunk  # noqa: E402
+from langchain_core.outputs import ChatGenerationChunk  # noqa: E402
+
+from app.agent import betastay_agent  # noqa: E402
+from app.services.chat_service import _invoke_agent_stream  # noqa: E402
+
+
+class InstantTongyi(ChatTongyi):
+    """立即返回一个正文片段的 ChatTongyi"""
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        chunk = ChatGenerationChunk(message=AIMessageChunk(content="好的"))
+        if run_manager:
+            await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+        yield chunk
+
+
+async def prepare() -> list[dict]:
+    return [{"role": "user", "content": "你好"}]
+
+
+async def first_event_ms(db, conversation_id: str) -> float:
+    start = time.perf_counter()
+    stream = _invoke_agent_stream(db, conversation_id, prepare)
+    await stream.__anext__()
+    elapsed = (time.perf_counter() - start) * 1000
+    await stream.aclose()
+    return elapsed
+
+
+async def measure(session_factory, repeat: int) -> dict:
+    samples = []
+    async with session_factory() as db:
+        for i in range(repeat + 2):
+            # 每次使用新会话：上一次的生成仍在后台结束，同一会话会被准入控制拒绝
+            ms = await first_event_ms(db, f"bench-{time.perf_counter_ns()}")
+            if i >= 2:
+                samples.append(ms)
+    return summarize(samples)
+
+
+async def main(repeat: int) -> None:
+    engine, session_factory = await create_bench_db()
+    with patch.object(betastay_agent, "ChatTongyi", InstantTongyi):
+        with patch.object(
+            betastay_agent, "get_betastay_agent", betastay_agent.create_betastay_agent
+        ):
+            per_request = await measure(session_factory, repeat)
+        betastay_agent._shared_agent = None
+        shared = await measure(session_factory, repeat)
+    await engine.dispose()
+
+    print(f"per-request agent   {format_stats(per_request)}")
+    print(f"shared agent        {format_stats(shared)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main(args.repeat))
@@ -0,0 +1,93 @@
+"""首页概览接口基准：pricing_record 历史数据逐级增长时 dashboard_summary 的耗时。
+
+最近 30 天的定价量固定为 RECENT_ROWS，其余记录都是更早的历史数据，
+模拟表随时间累积；耗时应基本保持不变。
+
+用法: python -m benchmarks.bench_dashboard [--sizes 10000 100000 1000000]
+"""
+import argparse
+import asyncio
+import random
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import insert
+
+from benchmarks.common import create_bench_db, format_stats, timeit_async
+
+from app.core.cache import MemoryCache, configure_cache  # noqa: E402
+from app.models.feedback import Feedback  # noqa: E402
+from app.models.pricing import PricingRecord  # noqa: E402
+from app.models.property import Property  # noqa: E402
+from app.services import dashboard_service  # noqa: E402
+
+PROPERTY_COUNT = 200
+RECENT_ROWS = 5_000
+CHUNK = 50_000
+
+
+async def seed_pricing(session_factory, start: int, stop: int) -> None:
+    """追加第 [start, stop) 条定价记录；前 RECENT_ROWS 条落在最近 30 天，其余为更早的历史"""
+    now = datetime.utcnow()
+
+    def created_at(i: int) -> datetime:
+        if i < RECENT_ROWS:
+            return now - timedelta(minutes=random.randint(0, 29 * 1440))
+        return now - timedelta(minutes=random.randint(31 * 1440, 1000 * 1440))
+
+    for offset in range(start, stop, CHUNK):
+        rows = [
+            {
+                "property_id": random.randint(1, PROPERTY_COUNT),
+                "target_date": date(2026, 1, 1) + timedelta(days=i % 365),
+                "conservative_price": 300.0,
+                "suggested_price": 400.0 + i % 100,
+                "aggressive_price": 500.0,
+                "calculation_details": {},
+                "created_at": created_at(i),
+            }
+            for i in range(offset, min(offset + CHUNK, stop))
+        ]
+        async with session_factory() as db:
+            await db.execute(insert(PricingRecord), rows)
+            await db.commit()
+
+
+async def main(sizes: list[int], repeat: int) -> None:
+    engine, session_factory = await create_bench_db()
+    async with session_factory() as db:
+        await db.execute(insert(Property), [
+            {"name": f"房源{i}", "address": "基准", "room_type": "整套", "area": 80.0, "facilities": {}}
+            for i in range(PROPERTY_COUNT)
+        ])
+        await db.commit()
+
+    seeded = 0
+    for size in sorted(sizes):
+        await seed_pricing(session_factory, seeded, size)
+        seeded = size
+        async with session_factory() as db:
+            await db.execute(insert(Feedback), [{"pricing_record_id": 1, "feedback_type": "采纳"}])
+            await db.commit()
+
+        async def compute():
+            async with session_factory() as db:
+                await dashboard_service.compute_summary(db)
+
+        async def cached():
+            async with session_factory() as db:
+                await dashboard_service.get_summary(db)
+
+        print(f"pricing_record={size:>9,}  query   {format_stats(await timeit_async(compute, repeat=repeat))}")
+        configure_cache(MemoryCache())
+        await dashboard_service.invalidate_summary()
+        print(f"pricing_record={size:>9,}  cached  {format_stats(await timeit_async(cached, repeat=repeat))}")
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.sizes, args.repeat))
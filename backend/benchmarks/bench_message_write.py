@@ -0,0 +1,115 @@
+"""消息持久化基准：一轮对话在请求关键路径上写库的耗时。
+
+- before：原实现，用户消息 INSERT+COMMIT+刷新、统计用户消息数、查询会话后更新标题并提交，助手消息 INSERT+COMMIT+刷新
+- batched：用户消息、计数与标题更新一个事务，助手消息 INSERT+计数 UPDATE+COMMIT
+- write-behind：用户消息同 batched，助手消息进入后台写入队列（关键路径只含入队）
+
+每种方式以 --concurrency 个会话并发、共 --turns 轮；结束时等待后台写入完成并核对落库条数。
+
+用法: python -m benchmarks.bench_message_write [--turns 500] [--concurrency 1 16]
+"""
+import argparse
+import asyncio
+import time
+
+from sqlalchemy import func, select
+
+from benchmarks.common import create_bench_db, format_stats, summarize
+
+from app.models.conversation import Conversation, Message  # noqa: E402
+from app.services import conversation_service  # noqa: E402
+from app.services.message_writer import MessageWriter, configure_message_writer  # noqa: E402
+
+USER_CONTENT = "帮我看看西湖边那套房子五一期间怎么定价"
+REPLY_CONTENT = "根据节假日需求和同类房源行情，五一期间建议价格为每晚 680 元。" * 4
+
+
+async def turn_before(db, conversation_id: str) -> None:
+    """原实现的写库顺序"""
+    msg = Message(conversation_id=conversation_id, role="user", content=USER_CONTENT)
+    db.add(msg)
+    await db.commit()
+    await db.refresh(msg)
+    count = (await db.execute(
+        select(func.count(Message.id)).where(
+            Message.conversation_id == conversation_id, Message.role == "user"
+        )
+    )).scalar()
+    if count == 1:
+        conv = (await db.execute(
+            select(Conversation).where(Conversation.id == conversation_id)
+        )).scalar_one_or_none()
+        conv.title = USER_CONTENT[:10]
+        await db.commit()
+    reply = Message(conversation_id=conversation_id, role="assistant", content=REPLY_CONTENT)
+    db.add(reply)
+    await db.commit()
+    await db.refresh(reply)
+
+
+async def turn_after(db, conversation_id: str) -> None:
+    await conversation_service.save_user_message(db, conversation_id, USER_CONTENT)
+    await conversation_service.save_message(
+        db, conversation_id, "assistant", REPLY_CONTENT, defer=True
+    )
+
+
+async def run(session_factory, turn, turns: int, concurrency: int) -> dict:
+    async with session_factory() as db:
+        conversations = [
+            (await conversation_service.create_conversation(db)).id for _ in range(concurrency)
+        ]
+    samples = []
+
+    async def worker(conversation_id: str, count: int):
+        async with session_factory() as db:
+            for _ in range(count):
+                start = time.perf_counter()
+                await turn(db, conversation_id)
+                samples.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(c, turns // concurrency) for c in conversations))
+    elapsed = time.perf_counter() - start
+    return {"stats": summarize(samples), "turns_per_s": len(samples) / elapsed, "conversations": conversations}
+
+
+async def count_messages(session_factory, conversations: list[str]) -> int:
+    async with session_factory() as db:
+        return (await db.execute(
+            select(func.count(Message.id)).where(Message.conversation_id.in_(conversations))
+        )).scalar()
+
+
+async def main(turns: int, concurrency_levels: list[int]) -> None:
+    engine, session_factory = await create_bench_db()
+
+    for concurrency in concurrency_levels:
+        print(f"concurrency={concurrency}")
+        for name, turn in (("before", turn_before), ("batched", turn_after), ("write-behind", turn_after)):
+            writer = None
+            if name == "write-behind":
+                writer = MessageWriter(session_factory, max_queue=1000, max_batch=100)
+                writer.start()
+                configure_message_writer(writer)
+            try:
+                result = await run(session_factory, turn, turns, concurrency)
+            finally:
+                if writer is not None:
+                    configure_message_writer(None)
+                    await writer.close()
+            written = await count_messages(session_factory, result["conversations"])
+            print(
+                f"  {name:<13} {format_stats(result['stats'])}  "
+                f"turns/s={result['turns_per_s']:7.1f}  messages={written}"
+            )
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 16])
+    args = parser.parse_args()
+    asyncio.run(main(args.turns, args.concurrency))
@@ -0,0 +1,100 @@
+"""待确认操作基准：确认路径弹出操作的耗时，以及清理过期积压的耗时。
+
+- before：原实现，SELECT 取出操作 → ORM 删除 → COMMIT
+- after：DELETE ... RETURNING → COMMIT（SqlActionStore）
+- memory：进程内 LRU + TTL 存储（MemoryActionStore），不访问数据库
+- sweep：积压 --backlog 条过期操作时按批清理的总耗时
+
+用法: python -m benchmarks.bench_pending_action [--pops 500] [--backlog 20000]
+"""
+import argparse
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, insert, select
+
+from benchmarks.common import create_bench_db, format_stats, summarize
+
+from app.core.config import settings  # noqa: E402
+from app.models.pending_action import PendingAction  # noqa: E402
+from app.services.action_store import (  # noqa: E402
+    MemoryActionStore,
+    SqlActionStore,
+    configure_action_store,
+    pop_pending_action,
+    save_pending_action,
+    sweep_expired_actions,
+)
+
+ACTION_DATA = {"property_id": 3, "pricing_record_id": 7, "feedback_type": "调整", "actual_price": 455.0}
+
+
+async def pop_before(db, action_id: str) -> dict | None:
+    """原实现的弹出顺序"""
+    action = (await db.execute(
+        select(PendingAction).where(PendingAction.id == action_id)
+    )).scalar_one_or_none()
+    if not action:
+        return None
+    data = {"conversation_id": action.conversation_id, "action_type": action.action_type, "data": action.data}
+    await db.delete(action)
+    await db.commit()
+    return data
+
+
+async def time_pops(session_factory, pop, count: int) -> dict:
+    async with session_factory() as db:
+        ids = [await save_pending_action(db, "bench", "record_feedback", ACTION_DATA) for _ in range(count)]
+    samples = []
+    async with session_factory() as db:
+        for action_id in ids:
+            start = time.perf_counter()
+            assert await pop(db, action_id) is not None
+            samples.append((time.perf_counter() - start) * 1000)
+    return summarize(samples)
+
+
+async def main(pops: int, backlog: int) -> None:
+    engine, session_factory = await create_bench_db()
+
+    now = datetime.utcnow()
+    async with session_factory() as db:
+        await db.execute(insert(PendingAction), [
+            {
+                "conversation_id": "bench", "action_type": "record_feedback", "data": ACTION_DATA,
+                "created_at": now, "expires_at": now - timedelta(seconds=1),
+            }
+            for _ in range(backlog)
+        ])
+        await db.commit()
+
+    print(f"pop with {backlog} rows in table")
+    for name, store, pop in (
+        ("before", SqlActionStore(), pop_before),
+        ("after", SqlActionStore(), pop_pending_action),
+        ("memory", MemoryActionStore(settings.PENDING_ACTION_MEMORY_CAPACITY), pop_pending_action),
+    ):
+        configure_action_store(store)
+        print(f"  {name:<7} {format_stats(await time_pops(session_factory, pop, pops))}")
+    configure_action_store(SqlActionStore())
+
+    start = time.perf_counter()
+    deleted = await sweep_expired_actions(session_factory, settings.PENDING_ACTION_SWEEP_BATCH)
+    elapsed = (time.perf_counter() - start) * 1000
+    async with session_factory() as db:
+        remaining = (await db.execute(select(func.count(PendingAction.id)))).scalar()
+    print(
+        f"sweep   deleted={deleted} in {elapsed:.1f}ms "
+        f"(batch={settings.PENDING_ACTION_SWEEP_BATCH})  remaining={remaining}"
+    )
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pops", type=int, default=500)
+    parser.add_argument("--backlog", type=int, default=20000)
+    args = parser.parse_args()
+    asyncio.run(main(args.pops, args.backlog))
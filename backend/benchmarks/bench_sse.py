@@ -0,0 +1,156 @@
+"""SSE 输出基准：逐片段发帧与合并发帧的每条回复帧数、服务端 CPU 耗时与首字节耗时。
+
+端到端：模型替换为按固定间隔吐出思考与正文片段的 ChatTongyi 子类，不发起网络请求，
+每帧写入本地 socket；CPU 耗时包含 LangChain 事件流本身的开销。
+写出路径：同样的片段序列只经过编码与 socket 写出，单独衡量写出开销。
+
+用法: python -m benchmarks.bench_sse [--replies 10] [--chunks 600] [--interval-ms 2]
+"""
+import argparse
+import asyncio
+import json
+import socket
+import statistics
+import threading
+import time
+from unittest.mock import patch
+
+from benchmarks.common import create_bench_db, format_stats, summarize
+
+from langchain_community.chat_models import ChatTongyi  # noqa: E402
+from langchain_core.messages import AIMessageChunk  # noqa: E402
+from langchain_core.outputs import ChatGenerationChunk  # noqa: E402
+
+from app.agent import betastay_agent  # noqa: E402
+from app.core.config import settings  # noqa: E402
+from app.services.chat_service import _invoke_agent_stream  # noqa: E402
+from app.services.sse import coalesce_events  # noqa: E402
+
+
+class StreamingStubTongyi(ChatTongyi):
+    """先输出 chunks 个思考片段，再输出 chunks / 3 个正文片段"""
+
+    chunks: int = 600
+    interval: float = 0.002
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        for i in range(self.chunks + self.chunks // 3):
+            await asyncio.sleep(self.interval)
+            if i < self.chunks:
+                message = AIMessageChunk(content="", additional_kwargs={"reasoning_content": "思考"})
+            else:
+                message = AIMessageChunk(content="正文")
+            chunk = ChatGenerationChunk(message=message)
+            if run_manager:
+                await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+
+def open_sink() -> socket.socket:
+    """返回一端由后台线程持续读空的本地 socket，模拟向客户端写出"""
+    writer, reader = socket.socketpair()
+
+    def drain():
+        while reader.recv(65536):
+            pass
+
+    threading.Thread(target=drain, daemon=True).start()
+    return writer
+
+
+async def run_reply(db, thread: str, sink: socket.socket) -> tuple[int, float, float]:
+    """返回 (帧数, 首字节毫秒, CPU 毫秒)"""
+    frames = 0
+    ttfb = 0.0
+    cpu_start = time.process_time()
+    start = time.perf_counter()
+    async def prepare() -> list[dict]:
+        return [{"role": "user", "content": "你好"}]
+
+    async for frame in _invoke_agent_stream(db, thread, prepare):
+        sink.sendall(frame.encode())
+        if frames == 0:
+            ttfb = (time.perf_counter() - start) * 1000
+        frames += 1
+    return frames, ttfb, (time.process_time() - cpu_start) * 1000
+
+
+async def measure(session_factory, replies: int, window_ms: int, sink: socket.socket) -> dict:
+    frames, ttfb, cpu = [], [], []
+    with patch.object(settings, "SSE_COALESCE_MS", window_ms):
+        async with session_factory() as db:
+            for i in range(replies):
+                n, first, used = await run_reply(db, f"bench-{window_ms}-{i}", sink)
+                frames.append(n)
+                ttfb.append(first)
+                cpu.append(used)
+    return {"frames": statistics.fmean(frames), "ttfb": summarize(ttfb), "cpu": summarize(cpu)}
+
+
+async def chunk_events(chunks: int, interval: float):
+    for i in range(chunks + chunks // 3):
+        await asyncio.sleep(interval)
+        yield ("thinking" if i < chunks else "content"), {"content": "思考" if i < chunks else "正文"}
+
+
+async def measure_writer(replies: int, chunks: int, interval: float, window_ms: int, sink) -> dict:
+    """只衡量编码与写出：window_ms 为 0 时按原实现逐片段 json.dumps"""
+    frames, cpu = [], []
+    for _ in range(replies):
+        n = 0
+        cpu_start = time.process_time()
+        if window_ms:
+            async for frame in coalesce_events(chunk_events(chunks, interval), window_ms, 1024):
+                sink.sendall(frame.encode())
+                n += 1
+        else:
+            async for event, data in chunk_events(chunks, interval):
+                frame = f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+                sink.sendall(frame.encode())
+                n += 1
+        frames.append(n)
+        cpu.append((time.process_time() - cpu_start) * 1000)
+    return {"frames": statistics.fmean(frames), "cpu": summarize(cpu)}
+
+
+async def main(replies: int, chunks: int, interval_ms: float) -> None:
+    engine, session_factory = await create_bench_db()
+    StreamingStubTongyi.model_fields["chunks"].default = chunks
+    StreamingStubTongyi.model_fields["interval"].default = interval_ms / 1000
+    StreamingStubTongyi.model_rebuild(force=True)
+
+    sink = open_sink()
+    window = settings.SSE_COALESCE_MS
+
+    with patch.object(betastay_agent, "ChatTongyi", StreamingStubTongyi):
+        betastay_agent._shared_agent = None
+        results = {
+            "per-chunk": await measure(session_factory, replies, 0, sink),
+            f"coalesced {window}ms": await measure(session_factory, replies, window, sink),
+        }
+    await engine.dispose()
+
+    print("end-to-end")
+    for name, r in results.items():
+        print(f"  {name:<16} frames/reply={r['frames']:8.1f}")
+        print(f"  {'':<16} ttfb  {format_stats(r['ttfb'])}")
+        print(f"  {'':<16} cpu   {format_stats(r['cpu'])}")
+
+    interval = interval_ms / 1000
+    writer = {
+        "per-chunk": await measure_writer(replies, chunks, interval, 0, sink),
+        f"coalesced {window}ms": await measure_writer(replies, chunks, interval, window, sink),
+    }
+    print("writer only")
+    for name, r in writer.items():
+        print(f"  {name:<16} frames/reply={r['frames']:8.1f}  cpu {format_stats(r['cpu'])}")
+    sink.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--replies", type=int, default=10)
+    parser.add_argument("--chunks", type=int, default=600)
+    parser.add_argument("--interval-ms", type=float, default=2)
+    args = parser.parse_args()
+    asyncio.run(main(args.replies, args.chunks, args.interval_ms))
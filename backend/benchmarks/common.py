@@ -0,0 +1,63 @@
+"""基准测试公共工具：本地 SQLite 数据库与计时统计。
+
+基准脚本不依赖 .env，导入 app 前先填充必需的配置项。
+"""
+import os
+import statistics
+import time
+
+BENCH_DATABASE_URL = "sqlite+aiosqlite:///./bench.db"
+
+os.environ.setdefault("DATABASE_URL", BENCH_DATABASE_URL)
+os.environ.setdefault("DATABASE_URL_SYNC", "sqlite:///./bench.db")
+os.environ.setdefault("REDIS_URL", "")
+os.environ.setdefault("DASHSCOPE_API_KEY", "bench-key")
+os.environ.setdefault("SECRET_KEY", "bench-secret")
+os.environ.setdefault("DEBUG", "false")
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine  # noqa: E402
+
+from app.core.database import Base  # noqa: E402
+
+
+async def create_bench_db(url: str = BENCH_DATABASE_URL):
+    """重建基准数据库，返回 (engine, session_factory)"""
+    engine = create_async_engine(url)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    return engine, async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+
+async def timeit_async(fn, repeat: int = 20, warmup: int = 2) -> dict:
+    """多次执行异步函数，返回耗时分位数（毫秒）"""
+    for _ in range(warmup):
+        await fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return summarize(samples)
+
+
+def summarize(samples_ms: list[float]) -> dict:
+    ordered = sorted(samples_ms)
+
+    def pct(p: float) -> float:
+        return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+    return {
+        "n": len(ordered),
+        "mean": statistics.fmean(ordered),
+        "p50": pct(50),
+        "p95": pct(95),
+        "p99": pct(99),
+    }
+
+
+def format_stats(stats: dict) -> str:
+    return (
+        f"n={stats['n']:<4} mean={stats['mean']:8.2f}ms  p50={stats['p50']:8.2f}ms  "
+        f"p95={stats['p95']:8.2f}ms  p99={stats['p99']:8.2f}ms"
+    )
@@ -0,0 +1,212 @@
+"""对话压测：N 个会话并发调用 /chat/conversations/{id}/messages/stream，统计 SSE 吞吐与尾延迟。
+
+不传 --url 时在进程内启动 uvicorn，使用本地模拟模型（LLM_PROVIDER=fake）与基准 SQLite 数据库，
+并预置房源供模拟模型的 property_query 调用。该模式会删除并重建数据库中的所有表，
+因此 DATABASE_URL 必须是名为 bench.db 的 SQLite 文件（未设置时默认 ./bench.db），否则拒绝运行；传 --url 时压测已启动的服务（服务端应设置 LLM_PROVIDER=fake）。
+并发上限、排队长度、模拟模型延迟等均可通过环境变量覆盖，如 LLM_MAX_CONCURRENCY=64 FAKE_LLM_TOKEN_DELAY_MS=10。
+
+报告：
+- TTFB：发出请求到收到首个 SSE 帧；TTFT：到收到首个思考/正文片段
+- 完成耗时与每条回复的 tokens/s（首个片段到 done），以及整体 tokens/s
+- 压测期间按 --sample-ms 抓取 /metrics：数据库连接池借出数与饱和度、准入排队深度
+
+用法: python -m benchmarks.load_chat [--conversations 50] [--turns 3] [--url http://127.0.0.1:8000]
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import time
+
+os.environ.setdefault("LLM_PROVIDER", "fake")
+
+import httpx  # noqa: E402
+
+from benchmarks.common import create_bench_db, format_stats, summarize  # noqa: E402
+
+from app.agent.tokens import estimate_tokens  # noqa: E402
+
+API = "/api/v1"
+PROPERTY_COUNT = 200
+MESSAGE = "帮我看看我的房源最近定价情况怎么样"
+
+
+def parse_metrics(text: str) -> dict[str, float]:
+    """解析 Prometheus 文本格式中不带标签的样本"""
+    values = {}
+    for line in text.splitlines():
+        if line and not line.startswith("#") and "{" not in line:
+            name, _, value = line.partition(" ")
+            values[name] = float(value)
+    return values
+
+
+async def read_stream(client: httpx.AsyncClient, conversation_id: str) -> dict:
+    """发送一条消息并读完 SSE 流，返回本轮的计时（秒）与 token 数"""
+    start = time.perf_counter()
+    first_frame = first_token = None
+    text = ""
+    error = None
+    event = None
+    async with client.stream(
+        "POST", f"{API}/chat/conversations/{conversation_id}/messages/stream", json={"content": MESSAGE}
+    ) as response:
+        if response.status_code != 200:
+            await response.aread()
+            return {"error": f"HTTP {response.status_code}"}
+        async for line in response.aiter_lines():
+            if first_frame is None and line:
+                first_frame = time.perf_counter()
+            if line.startswith("event: "):
+                event = line[len("event: "):]
+            elif line.startswith("data: "):
+                data = json.loads(line[len("data: "):])
+                if event in ("thinking", "content"):
+                    first_token = first_token or time.perf_counter()
+                    text += data["content"]
+                elif event == "error":
+                    error = data.get("message")
+    end = time.perf_counter()
+    if error or first_token is None:
+        return {"error": error or "no tokens"}
+    return {
+        "ttfb": first_frame - start,
+        "ttft": first_token - start,
+        "total": end - start,
+        "tokens": estimate_tokens(text),
+        "stream": end - first_token,
+    }
+
+
+async def run_conversation(client: httpx.AsyncClient, turns: int, results: list) -> None:
+    try:
+        response = await client.post(f"{API}/chat/conversations", json={"title": "压测"})
+        response.raise_for_status()
+    except httpx.HTTPError as e:
+        results.extend({"error": f"create conversation: {type(e).__name__}"} for _ in range(turns))
+        return
+    for _ in range(turns):
+        try:
+            results.append(await read_stream(client, response.json()["id"]))
+        except httpx.HTTPError as e:
+            results.append({"error": type(e).__name__})
+
+
+async def sample_metrics(client: httpx.AsyncClient, interval: float, samples: list, stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        try:
+            samples.append(parse_metrics((await client.get(f"{API}/metrics")).text))
+        except httpx.HTTPError:
+            pass
+        try:
+            await asyncio.wait_for(stop.wait(), interval)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def start_local_server():
+    """重建基准数据库并预置房源，在当前事件循环中启动 uvicorn，返回 (server, task, base_url)"""
+    import uvicorn
+    from sqlalchemy import insert
+
+    from sqlalchemy.engine import make_url
+
+    from app.core.config import settings
+    from app.main import app
+    from app.models.property import Property
+
+    url = make_url(settings.DATABASE_URL)
+    if url.get_backend_name() != "sqlite" or os.path.basename(url.database or "") != "bench.db":
+        raise SystemExit(
+            f"本地模式会重建数据库，DATABASE_URL 必须是基准 SQLite 库 bench.db，当前为 "
+            f"{url.render_as_string(hide_password=True)}；请取消该环境变量，或用 --url 压测已启动的服务"
+        )
+
+    engine, session_factory = await create_bench_db(settings.DATABASE_URL)
+    async with session_factory() as db:
+        await db.execute(insert(Property), [
+            {
+                "name": f"房源{i}", "address": f"杭州市西湖区{i}号", "room_type": "整套", "area": 60.0 + i % 80,
+                "min_price": 200.0, "max_price": 1200.0, "facilities": {},
+            }
+            for i in range(PROPERTY_COUNT)
+        ])
+        await db.commit()
+    await engine.dispose()
+
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+    return server, task, f"http://127.0.0.1:{port}"
+
+
+def report(results: list[dict], samples: list[dict], elapsed: float) -> None:
+    ok = [r for r in results if "error" not in r]
+    errors = [r["error"] for r in results if "error" in r]
+
+    print(f"turns={len(results)}  ok={len(ok)}  errors={len(errors)}  wall={elapsed:.2f}s")
+    for reason in sorted(set(errors)):
+        print(f"  error {errors.count(reason):>4} × {reason}")
+    if not ok:
+        return
+
+    for name in ("ttfb", "ttft", "total"):
+        print(f"  {name:<6} {format_stats(summarize([r[name] * 1000 for r in ok]))}")
+    rates = [r["tokens"] / r["stream"] for r in ok if r["stream"] > 0]
+    tokens = sum(r["tokens"] for r in ok)
+    print(f"  tokens/s per reply  mean={statistics.fmean(rates):8.1f}  p50={summarize(rates)['p50']:8.1f}")
+    print(f"  tokens/s overall    {tokens / elapsed:8.1f}  ({tokens} tokens)")
+
+    if samples:
+        checked_out = [s.get("db_pool_checked_out", 0) for s in samples]
+        capacity = max(s.get("db_pool_capacity", 0) for s in samples)
+        queue = [s.get("chat_admission_queue_depth", 0) for s in samples]
+        saturation = f"  peak saturation={max(checked_out) / capacity:6.1%}" if capacity else ""
+        print(
+            f"  db pool  checked_out mean={statistics.fmean(checked_out):5.1f} max={max(checked_out):3.0f}"
+            f" capacity={capacity:3.0f}{saturation}"
+        )
+        print(f"  admission queue depth mean={statistics.fmean(queue):5.1f} max={max(queue):3.0f}")
+
+
+async def main(conversations: int, turns: int, url: str | None, sample_ms: float) -> None:
+    server = task = None
+    if url is None:
+        server, task, url = await start_local_server()
+
+    limits = httpx.Limits(max_connections=conversations + 4, max_keepalive_connections=conversations + 4)
+    async with httpx.AsyncClient(base_url=url, timeout=httpx.Timeout(120), limits=limits) as client:
+        results: list[dict] = []
+        samples: list[dict] = []
+        stop = asyncio.Event()
+        sampler = asyncio.create_task(sample_metrics(client, sample_ms / 1000, samples, stop))
+
+        start = time.perf_counter()
+        await asyncio.gather(*(run_conversation(client, turns, results) for _ in range(conversations)))
+        elapsed = time.perf_counter() - start
+
+        stop.set()
+        await sampler
+
+    print(f"conversations={conversations} turns/conversation={turns} target={url}")
+    report(results, samples, elapsed)
+
+    if server is not None:
+        server.should_exit = True
+        await task
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--conversations", type=int, default=50, help="并发会话数")
+    parser.add_argument("--turns", type=int, default=3, help="每个会话依次发送的消息数")
+    parser.add_argument("--url", default=None, help="压测已启动的服务；不传则在进程内启动")
+    parser.add_argument("--sample-ms", type=float, default=100, help="抓取 /metrics 的间隔")
+    args = parser.parse_args()
+    asyncio.run(main(args.conversations, args.turns, args.url, args.sample_ms))
@@ -2,8 +2,14 @@ import os
 import pytest
 from httpx import AsyncClient, ASGITransport
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from langgraph.checkpoint.memory import InMemorySaver
+from app.agent.checkpointer import configure_checkpointer
+from app.core.cache import MemoryCache, configure_cache
 from app.core.database import Base, get_db
 from app.main import app
+from app.services.action_store import SqlActionStore, configure_action_store
+from app.services.admission import configure_admission
+from app.services.message_writer import configure_message_writer
 
 os.environ.setdefault("DASHSCOPE_API_KEY", "test-key-for-unit-tests")
 
@@ -23,6 +29,12 @@ app.dependency_overrides[get_db] = override_get_db
 
 @pytest.fixture(autouse=True)
 async def setup_db():
+    # 每个用例独立的进程内缓存，避免跨用例读到旧数据
+    configure_cache(MemoryCache())
+    configure_checkpointer(InMemorySaver())
+    configure_action_store(SqlActionStore())
+    configure_admission(None)
+    configure_message_writer(None)
     async with test_engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
     yield
@@ -0,0 +1,282 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import func, insert, select
+
+from app.core.config import settings
+from app.models.pending_action import PendingAction
+from app.services.action_store import (
+    MemoryActionStore,
+    RedisActionStore,
+    SqlActionStore,
+    configure_action_store,
+    get_action_store,
+    get_pending_action,
+    list_pending_actions,
+    pop_pending_action,
+    save_pending_action,
+    sweep_expired_actions,
+)
+from tests.conftest import TestSession
+from tests.test_message_writer import _Statements
+
+
+class FakeRedis:
+    """RedisActionStore 用到的 Redis 命令的进程内实现，commands 记录每次往返执行的命令"""
+
+    def __init__(self):
+        self.values: dict[str, str] = {}
+        self.zsets: dict[str, dict[str, float]] = {}
+        self.expires: dict[str, float] = {}
+        self.commands: list[list[str]] = []
+
+    def _alive(self, key: str) -> bool:
+        if key in self.expires and self.expires[key] <= time.time():
+            self.values.pop(key, None)
+            self.zsets.pop(key, None)
+            del self.expires[key]
+        return key in self.values or key in self.zsets
+
+    def _set(self, key, value, ex=None):
+        self.values[key] = value
+        if ex is not None:
+            self.expires[key] = time.time() + ex
+        return True
+
+    def _zadd(self, key, mapping):
+        self._alive(key)
+        self.zsets.setdefault(key, {}).update(mapping)
+        return len(mapping)
+
+    def _expire(self, key, seconds):
+        if not self._alive(key):
+            return False
+        self.expires[key] = time.time() + seconds
+        return True
+
+    async def get(self, key):
+        self.commands.append(["GET"])
+        return self.values.get(key) if self._alive(key) else None
+
+    async def getdel(self, key):
+        self.commands.append(["GETDEL"])
+        value = self.values.get(key) if self._alive(key) else None
+        self.values.pop(key, None)
+        self.expires.pop(key, None)
+        return value
+
+    async def mget(self, keys):
+        self.commands.append(["MGET"])
+        return [self.values.get(key) if self._alive(key) else None for key in keys]
+
+    async def zrangebyscore(self, key, min, max):
+        self.commands.append(["ZRANGEBYSCORE"])
+        members = self.zsets.get(key, {}) if self._alive(key) else {}
+        high = float("inf") if max == "+inf" else max
+        return [m for m, score in sorted(members.items(), key=lambda item: item[1]) if min <= score <= high]
+
+    def pipeline(self, transaction=True):
+        return _FakePipeline(self)
+
+
+class _FakePipeline:
+    def __init__(self, redis: FakeRedis):
+        self._redis = redis
+        self._queued: list[tuple[str, tuple, dict]] = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        pass
+
+    def set(self, *args, **kwargs):
+        self._queued.append(("set", args, kwargs))
+        return self
+
+    def zadd(self, *args, **kwargs):
+        self._queued.append(("zadd", args, kwargs))
+        return self
+
+    def expire(self, *args, **kwargs):
+        self._queued.append(("expire", args, kwargs))
+        return self
+
+    async def execute(self):
+        self._redis.commands.append([name.upper() for name, _, _ in self._queued])
+        return [getattr(self._redis, f"_{name}")(*args, **kwargs) for name, args, kwargs in self._queued]
+
+
+@pytest.fixture(params=["sql", "memory", "redis"])
+def store(request):
+    backend = {
+        "sql": lambda: SqlActionStore(),
+        "memory": lambda: MemoryActionStore(capacity=100),
+        "redis": lambda: RedisActionStore(FakeRedis()),
+    }[request.param]()
+    configure_action_store(backend)
+    return backend
+
+
+@pytest.mark.asyncio
+async def test_store_save_get_list_pop(store):
+    async with TestSession() as db:
+        first = await save_pending_action(db, "conv-1", "create_property", {"name": "西湖小筑"})
+        second = await save_pending_action(db, "conv-1", "record_feedback", {"pricing_record_id": 7})
+        await save_pending_action(db, "conv-2", "record_feedback", {})
+
+        assert await get_pending_action(db, first) == {
+            "conversation_id": "conv-1", "action_type": "create_property", "data": {"name": "西湖小筑"},
+        }
+        listed = await list_pending_actions(db, "conv-1")
+        assert [a["action_type"] for a in listed] == ["create_property", "record_feedback"]
+
+        assert (await pop_pending_action(db, second))["data"] == {"pricing_record_id": 7}
+        assert await pop_pending_action(db, second) is None
+        assert await get_pending_action(db, "missing") is None
+        assert [a["action_type"] for a in await list_pending_actions(db, "conv-1")] == ["create_property"]
+
+
+@pytest.mark.asyncio
+async def test_store_concurrent_pops_return_action_once(store):
+    async with TestSession() as db:
+        action_id = await save_pending_action(db, "conv-1", "record_feedback", {})
+
+    async def pop():
+        async with TestSession() as db:
+            return await pop_pending_action(db, action_id)
+
+    results = await asyncio.gather(*(pop() for _ in range(5)))
+    assert sum(r is not None for r in results) == 1
+
+
+@pytest.mark.asyncio
+async def test_confirm_through_configured_store(client, store):
+    """确认接口经由配置的存储弹出操作，同一操作只能确认一次"""
+    conv_id = (await client.post("/api/v1/chat/conversations", json={})).json()["id"]
+    async with TestSession() as db:
+        action_id = await save_pending_action(db, conv_id, "create_property", {
+            "name": "西湖美宿", "address": "杭州市西湖区北山路100号", "room_type": "整套",
+            "area": 85.5, "min_price": 300.0, "max_price": 1000.0,
+        })
+
+    url = f"/api/v1/chat/conversations/{conv_id}/confirm"
+    first = await client.post(url, json={"action_id": action_id})
+    second = await client.post(url, json={"action_id": action_id})
+    assert first.status_code == 200
+    assert first.json()["name"] == "西湖美宿"
+    assert second.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_redis_store_uses_native_ttl_and_getdel():
+    redis = FakeRedis()
+    store = RedisActionStore(redis)
+    with patch.object(settings, "PENDING_ACTION_TTL", 600):
+        action_id = await store.save(None, "conv-1", "record_feedback", {})
+
+    # 保存一次往返（事务管道），弹出一次往返
+    assert redis.commands == [["SET", "ZADD", "EXPIRE"]]
+    key = f"pending_action:{action_id}"
+    assert redis.expires[key] == pytest.approx(time.time() + 600, abs=5)
+
+    redis.expires[key] = time.time() - 1
+    assert await store.get(None, action_id) is None
+    assert await store.list_by_conversation(None, "conv-1") == []
+
+    action_id = await store.save(None, "conv-1", "record_feedback", {})
+    redis.commands.clear()
+    assert await store.pop(None, action_id) is not None
+    assert redis.commands == [["GETDEL"]]
+
+
+@pytest.mark.asyncio
+async def test_memory_store_evicts_least_recently_used():
+    store = MemoryActionStore(capacity=2)
+    first = await store.save(None, "conv-1", "record_feedback", {"n": 1})
+    second = await store.save(None, "conv-1", "record_feedback", {"n": 2})
+    await store.get(None, first)
+    third = await store.save(None, "conv-1", "record_feedback", {"n": 3})
+
+    assert await store.get(None, second) is None
+    assert await store.get(None, first) is not None
+    assert await store.get(None, third) is not None
+
+
+@pytest.mark.asyncio
+async def test_memory_store_expires_actions():
+    store = MemoryActionStore(capacity=10)
+    with patch.object(settings, "PENDING_ACTION_TTL", -1):
+        action_id = await store.save(None, "conv-1", "record_feedback", {})
+    assert await store.pop(None, action_id) is None
+    assert await store.list_by_conversation(None, "conv-1") == []
+
+
+def test_store_selected_from_settings():
+    try:
+        for backend, redis_url, expected in (
+            ("auto", "redis://localhost:6379/0", RedisActionStore),
+            ("auto", None, SqlActionStore),
+            ("memory", "redis://localhost:6379/0", MemoryActionStore),
+            ("sql", "redis://localhost:6379/0", SqlActionStore),
+        ):
+            configure_action_store(None)
+            with patch.multiple(settings, PENDING_ACTION_STORE=backend, REDIS_URL=redis_url):
+                assert isinstance(get_action_store(), expected)
+    finally:
+        configure_action_store(None)
+
+
+@pytest.mark.asyncio
+async def test_pop_is_single_delete_returning():
+    async with TestSession() as db:
+        action_id = await save_pending_action(db, "conv-1", "record_feedback", {"pricing_record_id": 7})
+
+    async with TestSession() as db:
+        with _Statements() as statements:
+            action = await pop_pending_action(db, action_id)
+        assert await pop_pending_action(db, action_id) is None
+
+    assert statements.sql == ["DELETE"]
+    assert statements.commits == 1
+    assert action == {
+        "conversation_id": "conv-1", "action_type": "record_feedback", "data": {"pricing_record_id": 7},
+    }
+
+
+@pytest.mark.asyncio
+async def test_expired_action_cannot_be_confirmed(client):
+    conv_id = (await client.post("/api/v1/chat/conversations", json={})).json()["id"]
+    async with TestSession() as db:
+        with patch.object(settings, "PENDING_ACTION_TTL", -1):
+            action_id = await save_pending_action(db, conv_id, "record_feedback", {})
+        assert await get_pending_action(db, action_id) is None
+
+    resp = await client.post(f"/api/v1/chat/conversations/{conv_id}/confirm", json={"action_id": action_id})
+    assert resp.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_sweep_purges_expired_in_batches():
+    now = datetime.utcnow()
+    async with TestSession() as db:
+        await db.execute(insert(PendingAction), [
+            {
+                "id": f"action-{i}", "conversation_id": "conv-1", "action_type": "record_feedback", "data": {},
+                "created_at": now, "expires_at": now + timedelta(seconds=-60 if i < 25 else 60),
+            }
+            for i in range(28)
+        ])
+        await db.commit()
+
+    with _Statements() as statements:
+        deleted = await sweep_expired_actions(TestSession, batch_size=10)
+
+    assert deleted == 25
+    assert statements.sql == ["DELETE"] * 3
+    async with TestSession() as db:
+        remaining = (await db.execute(select(func.count(PendingAction.id)))).scalar()
+    assert remaining == 3
@@ -0,0 +1,76 @@
+import asyncio
+
+import pytest
+
+from app.services.admission import (
+    AdmissionController,
+    AdmissionTimeout,
+    ConversationBusy,
+    QueueFull,
+)
+
+
+async def _positions(ticket) -> list[int]:
+    return [position async for position in ticket.wait()]
+
+
+@pytest.mark.asyncio
+async def test_global_cap_queues_and_promotes_in_order():
+    controller = AdmissionController(max_active=2, max_queue=4, queue_timeout=5)
+    first = controller.enter("a")
+    second = controller.enter("b")
+    assert first.admitted and second.admitted
+
+    third = controller.enter("c")
+    fourth = controller.enter("d")
+    assert not third.admitted and not fourth.admitted
+    waits = [asyncio.create_task(_positions(t)) for t in (third, fourth)]
+    await asyncio.sleep(0)
+
+    first.release()
+    assert await waits[0] == [1]
+    assert third.admitted and not fourth.admitted
+    assert controller.active == 2
+
+    second.release()
+    # 第四个请求先排第 2 位，前移到第 1 位后获准
+    assert await waits[1] == [2, 1]
+    assert controller.active == 2
+
+
+@pytest.mark.asyncio
+async def test_one_generation_per_conversation():
+    controller = AdmissionController(max_active=4, max_queue=4, queue_timeout=5)
+    ticket = controller.enter("a")
+    with pytest.raises(ConversationBusy):
+        controller.enter("a")
+
+    ticket.release()
+    ticket.release()
+    assert controller.active == 0
+    controller.enter("a").release()
+
+
+@pytest.mark.asyncio
+async def test_full_queue_rejected():
+    controller = AdmissionController(max_active=1, max_queue=1, queue_timeout=5)
+    controller.enter("a")
+    controller.enter("b")
+    with pytest.raises(QueueFull) as exc:
+        controller.enter("c")
+    assert exc.value.status_code == 503
+
+
+@pytest.mark.asyncio
+async def test_queue_timeout_releases_slot():
+    controller = AdmissionController(max_active=1, max_queue=2, queue_timeout=0.05)
+    active = controller.enter("a")
+    waiting = controller.enter("b")
+
+    with pytest.raises(AdmissionTimeout):
+        await waiting.acquire()
+
+    assert waiting.released
+    active.release()
+    assert controller.active == 0
+    controller.enter("b").release()
@@ -9,3 +9,76 @@ def test_agent_has_tools():
     agent = create_betastay_agent()
     # create_react_agent returns a CompiledGraph, verify it can be invoked
     assert hasattr(agent, "invoke")
+
+
+def test_shared_agent_reused():
+    from app.agent.betastay_agent import get_betastay_agent
+    assert get_betastay_agent() is get_betastay_agent()
+
+
+def test_classify_turn_profiles():
+    from app.agent.model_router import FAST_PROFILE, MAX_PROFILE, classify_turn
+    assert classify_turn("谢谢") == FAST_PROFILE
+    assert classify_turn("你好") == FAST_PROFILE
+    assert classify_turn("帮我查看一下目前所有房源的列表和基本信息") == FAST_PROFILE
+    assert classify_turn("房源3国庆的价格") == MAX_PROFILE
+    assert classify_turn("上次的价格太贵了没人订") == MAX_PROFILE
+    assert classify_turn("[房源表单提交] 名称：西湖小筑") == MAX_PROFILE
+    assert classify_turn("我在西湖边有一套两居室，最近周末总是订不满怎么办") == MAX_PROFILE
+
+
+def test_select_profile_respects_settings():
+    from unittest.mock import patch
+    from app.agent.model_router import select_profile
+    from app.core.config import settings
+
+    assert select_profile("谢谢") == "fast"
+    with patch.object(settings, "MODEL_ROUTING", False):
+        assert select_profile("谢谢") == settings.MODEL_DEFAULT_PROFILE
+    with patch.object(settings, "MODEL_PROFILES", {"max": {}}):
+        assert select_profile("谢谢") == "max"
+
+
+def test_model_profile_middleware_swaps_model():
+    from langchain.agents import create_agent
+    from langchain_core.language_models.fake_chat_models import FakeListChatModel
+    from app.agent.middleware import ModelProfileMiddleware
+    from app.agent.model_router import model_profile_var
+
+    class Model(FakeListChatModel):
+        def bind_tools(self, tools, **kwargs):
+            return self
+
+    models = {"fast": Model(responses=["快"]), "max": Model(responses=["慢"])}
+    agent = create_agent(model=models["max"], tools=[], middleware=[ModelProfileMiddleware(models)])
+    messages = {"messages": [{"role": "user", "content": "谢谢"}]}
+
+    assert agent.invoke(messages)["messages"][-1].content == "慢"
+    token = model_profile_var.set("fast")
+    try:
+        assert agent.invoke(messages)["messages"][-1].content == "快"
+    finally:
+        model_profile_var.reset(token)
+
+
+def test_fake_model_follows_script():
+    from langchain_core.messages import HumanMessage, ToolMessage
+    from app.agent.fake_model import FakeStreamingChatModel
+
+    model = FakeStreamingChatModel(
+        reasoning="先查询房源",
+        tool_calls=[{"name": "property_query", "args": {"limit": 5}}],
+        reply="共有3套房源",
+        chunk_chars=3,
+    )
+    chunks = list(model.stream([HumanMessage("我有哪些房源")]))
+    assert [c.additional_kwargs.get("reasoning_content") for c in chunks[:2]] == ["先查询", "房源"]
+    first = model.invoke([HumanMessage("我有哪些房源")])
+    assert first.tool_calls[0]["name"] == "property_query"
+    assert first.tool_calls[0]["args"] == {"limit": 5}
+
+    tool_result = ToolMessage("{}", tool_call_id=first.tool_calls[0]["id"])
+    reply = model.invoke([HumanMessage("我有哪些房源"), first, tool_result])
+    assert reply.content == "共有3套房源"
+    assert not reply.tool_calls
+    assert not model.model_copy(update={"enable_thinking": False}).invoke([HumanMessage("你好")]).additional_kwargs
@@ -1,6 +1,25 @@
+import asyncio
+import json
 import re
+import time
+from unittest.mock import patch
 
 import pytest
+from langchain.agents import create_agent
+from langchain_core.tools import tool
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from app.agent.checkpointer import get_checkpointer
+from app.core.config import settings
+from app.services import conversation_service
+from app.services.admission import get_admission_controller
+from app.services.intent_router import IntentRouter, IntentRule, configure_intent_router
+from app.services.replay_buffer import get_generation
+from app.services import chat_service
+from app.services.action_store import save_pending_action
+from tests.conftest import TestSession
 
 UUID_PATTERN = re.compile(
     r"^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$"
@@ -97,3 +116,700 @@ async def test_delete_conversation_not_found(client):
         "/api/v1/chat/conversations/00000000-0000-0000-0000-000000000000"
     )
     assert resp.status_code == 404
+
+
+class SlowStubModel(BaseChatModel):
+    """固定延迟后返回的本地模型，记录同时在途的调用数"""
+
+    delay: float = 0.2
+    in_flight: int = 0
+    peak: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "slow-stub"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self.delay)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="好的"))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight -= 1
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="好的"))])
+
+
+@pytest.mark.asyncio
+async def test_send_message_concurrent_requests_overlap(client):
+    model = SlowStubModel()
+    agent = create_agent(model=model, tools=[], checkpointer=get_checkpointer())
+    n = 8
+
+    conv_ids = []
+    for i in range(n):
+        resp = await client.post("/api/v1/chat/conversations", json={"title": f"并发{i}"})
+        conv_ids.append(resp.json()["id"])
+
+    with patch("app.agent.betastay_agent.get_betastay_agent", return_value=agent):
+        start = time.perf_counter()
+        responses = await asyncio.gather(*(
+            client.post(
+                f"/api/v1/chat/conversations/{conv_id}/messages",
+                json={"content": "你好"},
+            )
+            for conv_id in conv_ids
+        ))
+        elapsed = time.perf_counter() - start
+
+    assert all(r.status_code == 200 for r in responses)
+    assert all(r.json()["content"] == "好的" for r in responses)
+    # 模型调用相互重叠，而不是逐个阻塞事件循环
+    assert model.peak > 1
+    assert elapsed < n * model.delay
+
+
+class RecordingStubModel(BaseChatModel):
+    """记录每次调用收到的消息内容，按顺序回复"""
+
+    seen: list = []
+    replies: list = []
+
+    @property
+    def _llm_type(self) -> str:
+        return "recording-stub"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        self.seen.append([m.content for m in messages])
+        reply = self.replies[len(self.seen) - 1]
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=reply))])
+
+
+def _recording_agent(replies):
+    model = RecordingStubModel(seen=[], replies=replies)
+    return model, create_agent(model=model, tools=[], checkpointer=get_checkpointer())
+
+
+async def _send(client, conv_id, content):
+    resp = await client.post(
+        f"/api/v1/chat/conversations/{conv_id}/messages", json={"content": content}
+    )
+    assert resp.status_code == 200
+    return resp.json()
+
+
+@pytest.mark.asyncio
+async def test_followup_turn_appends_to_thread(client):
+    model, agent = _recording_agent(["答1", "答2", "答3"])
+    conv_id = (await client.post("/api/v1/chat/conversations", json={})).json()["id"]
+
+    with patch("app.agent.betastay_agent.get_betastay_agent", return_value=agent), \
+            patch.object(chat_service, "build_context", wraps=chat_service.build_context) as history:
+        await _send(client, conv_id, "问1")
+        await _send(client, conv_id, "问2")
+        await _send(client, conv_id, "问3")
+
+    # 仅首轮从数据库重建历史，之后只追加新消息
+    assert history.call_count == 1
+    assert model.seen[-1] == ["问1", "答1", "问2", "答2", "问3"]
+
+
+@pytest.mark.asyncio
+async def test_empty_thread_reseeds_from_history(client):
+    model, agent = _recording_agent(["答1", "答2"])
+    conv_id = (await client.post("/api/v1/chat/conversations", json={})).json()["id"]
+
+    with patch("app.agent.betastay_agent.get_betastay_agent", return_value=agent):
+        await _send(client, conv_id, "问1")
+        await chat_service.reset_thread(conv_id)
+        await _send(client, conv_id, "问2")
+
+    assert model.seen[-1] == ["问1", "答1", "问2"]
+
+
+@pytest.mark.asyncio
+async def test_regenerate_rewinds_thread(client):
+    model, agent = _recording_agent(["答1", "答2", "重答2"])
+    conv_id = (await client.post("/api/v1/chat/conversations", json={})).json()["id"]
+
+    with patch("app.agent.betastay_agent.get_betastay_agent", return_value=agent):
+        await _send(client, conv_id, "问1")
+        reply = await _send(client, conv_id, "问2")
+        resp = await client.post(
+            f"/api/v1/chat/conversations/{conv_id}/messages/regenerate",
+            json={"message_id": reply["id"]},
+        )
+        assert resp.status_code == 200
+
+    assert model.seen[-1] == ["问1", "答1", "问2"]
+    state = await agent.aget_state({"configurable": {"thread_id": conv_id}})
+    assert [m.content for m in state.values["messages"]] == ["问1", "答1", "问2", "重答2"]
+
+
+@pytest.mark.asyncio
+async def test_confirm_appends_note_to_thread(client):
+    model, agent = _recording_agent(["请确认录入"])
+    conv_id = (await client.post("/api/v1/chat/conversations", json={})).json()["id"]
+
+    with patch("app.agent.betastay_agent.get_betastay_agent", return_value=agent):
+        await _send(client, conv_id, "录入房源")
+        async with TestSession() as db:
+            action_id = await save_pending_action(db, conv_id, "create_property", {
+                "name": "西湖美宿",
+                "address": "杭州市西湖区北山路100号",
+                "room_type": "整套",
+                "area": 85.5,
+                "min_price": 300.0,
+                "max_price": 1000.0,
+            })
+            await db.commit()
+        resp = await client.post(
+            f"/api/v1/chat/conversations/{conv_id}/confirm", json={"action_id": action_id}
+        )
+        assert resp.status_code == 200
+
+    state = await agent.aget_state({"configurable": {"thread_id": conv_id}})
+    assert state.values["messages"][-1].content.startswith("房源「西湖美宿」已成功录入")
+
+
+class StreamingStubModel(BaseChatModel):
+    """逐字流式输出固定回复，每个片段间隔 delay 秒"""
+
+    reply: str = "今晚建议定价四百八十元"
+    delay: float = 0.01
+    calls: int = 0
+    emitted: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "streaming-stub"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.reply))])
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        self.calls += 1
+        for char in self.reply:
+            await asyncio.sleep(self.delay)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=char))
+            self.emitted += 1
+            if run_manager:
+                await run_manager.on_llm_new_token(char, chunk=chunk)
+            yield chunk
+
+
+def _parse_frames(body: str) -> list[dict]:
+    frames = []
+    for block in body.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.split("\n"))
+        frames.append(fields)
+    return frames
+
+
+def _streamed_content(frames: list[dict]) -> str:
+    return "".join(
+        json.loads(f["data"])["content"] for f in frames if f["event"] == "content"
+    )
+
+
+@pytest.mark.asyncio
+async def test_stream_events_have_sequential_ids(client):
+    model = StreamingStubModel(delay=0)
+    agent = create_agent(model=model, tools=[], checkpointer=get_checkpointer())
+    conv_id = (await client.post("/api/v1/chat/conversations", json={})).json()["id"]
+
+    with patch("app.agent.betastay_agent.get_betastay_agent", return_value=agent), \
+            patch.object(settings, "SSE_COALESCE_MS", 0):
+        resp = await client.post(
+            f"/api/v1/chat/conversations/{conv_id}/messages/stream", json={"content": "定价"}
+        )
+
+    frames = _parse_frames(resp.text)
+    generation_ids = {f["id"].split(":")[0] for f in frames}
+    seqs = [int(f["id"].split(":")[1]) for f in frames]
+    assert len(generation_ids) == 1
+    assert seqs == list(range(1, len(frames) + 1))
+    assert frames[-1]["event"] == "done"
+
+
+@pytest.mark.asyncio
+async def test_resume_replays_missed_events_without_new_model_call(client):
+    model = StreamingStubModel()
+    agent = create_agent(model=model, tools=[], checkpointer=get_checkpointer())
+    conv_id = (await client.post("/api/v1/chat/conversations", json={})).json()["id"]
+
+    with patch("app.agent.betastay_agent.get_betastay_agent", return_value=agent), \
+            patch.object(settings, "SSE_COALESCE_MS", 0):
+        async with TestSession() as db:
+            stream = chat_service.stream_message(db, conv_id, "定价")
+            received = [await stream.__anext__() for _ in range(3)]
+            # 模拟连接中断
+            await stream.aclose()
+
+        last_id = _parse_frames("".join(received))[-1]["id"]
+        resp = await client.get(
+            f"/api/v1/chat/conversations/{conv_id}/messages/stream/resume",
+            headers={"Last-Event-ID": last_id},
+        )
+
+    assert resp.status_code == 200
+    frames = _parse_frames("".join(received)) + _parse_frames(resp.text)
+    assert [int(f["id"].split(":")[1]) for f in frames] == list(range(1, len(frames) + 1))
+    assert _streamed_content(frames) == model.reply
+    assert frames[-1]["event"] == "done"
+    assert model.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_resume_rejects_bad_or_unknown_event_id(client):
+    conv_id = (await client.post("/api/v1/chat/conversations", json={})).json()["id"]
+    url = f"/api/v1/chat/conversations/{conv_id}/messages/stream/resume"
+
+    assert (await client.get(url)).status_code == 400
+    assert (await client.get(url, headers={"Last-Event-ID": "abc"})).status_code == 400
+    assert (await client.get(url, headers={"Last-Event-ID": "missing:3"})).status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_resume_expired_events_returns_409(client):
+    model = StreamingStubModel(delay=0)
+    agent = create_agent(model=model, tools=[], checkpointer=get_checkpointer())
+    conv_id = (await client.post("/api/v1/chat/conversations", json={})).json()["id"]
+
+    with patch("app.agent.betastay_agent.get_betastay_agent", return_value=agent), \
+            patch.object(settings, "SSE_COALESCE_MS", 0), \
+            patch.object(settings, "SSE_REPLAY_BUFFER_SIZE", 4):
+        resp = await client.post(
+            f"/api/v1/chat/conversations/{conv_id}/messages/stream", json={"content": "定价"}
+        )
+        generation_id = _parse_frames(resp.text)[0]["id"].split(":")[0]
+        resp = await client.get(
+            f"/api/v1/chat/conversations/{conv_id}/messages/stream/resume",
+            headers={"Last-Event-ID": f"{generation_id}:1"},
+        )
+
+    assert resp.status_code == 409
+
+
+@pytest.mark.asyncio
+async def test_slow_subscriber_gets_error_when_frames_evicted(client):
+    """订阅者落后超过重放缓冲容量：发送 error 事件后结束，而不是异常断开"""
+    model = StreamingStubModel(delay=0)
+    agent = create_agent(model=model, tools=[], checkpointer=get_checkpointer())
+    conv_id = (await client.post("/api/v1/chat/conversations", json={})).json()["id"]
+
+    with patch("app.agent.betastay_agent.get_betastay_agent", return_value=agent), \
+            patch.object(settings, "SSE_COALESCE_MS", 0), \
+            patch.object(settings, "SSE_REPLAY_BUFFER_SIZE", 4):
+        async with TestSession() as db:
+            stream = chat_service.stream_message(db, conv_id, "定价")
+            first = await stream.__anext__()
+            generation = get_generation(_parse_frames(first)[0]["id"].split(":")[0])
+            # 不读取，等生成产出的帧超过缓冲容量
+            await generation.task
+            rest = [frame async for frame in stream]
+
+    frames = _parse_frames("".join(rest))
+    assert frames[-1]["event"] == "error"
+    assert "过期" in json.loads(frames[-1]["data"])["message"]
+
+
+class DisconnectingRequest:
+    """在 after 秒后报告连接已断开的 Starlette Request 替身"""
+
+    def __init__(self, after: float):
+        self._deadline = time.perf_counter() + after
+
+    async def is_disconnected(self) -> bool:
+        return time.perf_counter() >= self._deadline
+
+
+async def _consume(stream) -> list[str]:
+    return [frame async for frame in stream]
+
+
+@pytest.mark.asyncio
+async def test_disconnect_cancels_generation_and_saves_partial(client):
+    model = StreamingStubModel(reply="价" * 200, delay=0.01)
+    agent = create_agent(model=model, tools=[], checkpointer=get_checkpointer())
+    conv_id = (await client.post("/api/v1/chat/conversations", json={})).json()["id"]
+
+    with patch("app.agent.betastay_agent.get_betastay_agent", return_value=agent), \
+            patch.object(settings, "SSE_COALESCE_MS", 0), \
+            patch.object(settings, "SSE_DISCONNECT_GRACE", 0), \
+            patch.object(settings, "SSE_DISCONNECT_POLL", 0.02):
+        async with TestSession() as db:
+            frames = await _consume(
+                chat_service.stream_message(db, conv_id, "定价", DisconnectingRequest(0.3))
+            )
+        generation = get_generation(_parse_frames("".join(frames))[0]["id"].split(":")[0])
+
+        start = time.perf_counter()
+        await asyncio.wait_for(asyncio.wait([generation.task]), timeout=1.0)
+        assert time.perf_counter() - start < 1.0
+
+    emitted = model.emitted
+    assert emitted < len(model.reply)
+    await asyncio.sleep(0.1)
+    assert model.emitted == emitted
+
+    async with TestSession() as db:
+        messages = await conversation_service.get_messages(db, conv_id)
+    reply = messages[-1]
+    assert reply.role == "assistant"
+    assert reply.tool_calls == {"truncated": True}
+    assert 0 < len(reply.content) < len(model.reply)
+    assert model.reply.startswith(reply.content)
+
+
+class ToolCallingStubModel(BaseChatModel):
+    """首次调用请求执行 slow_tool，之后直接回复"""
+
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "tool-calling-stub"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        self.calls += 1
+        if self.calls == 1:
+            message = AIMessage(content="", tool_calls=[{"name": "slow_tool", "args": {}, "id": "call-1"}])
+        else:
+            message = AIMessage(content="完成")
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+@pytest.mark.asyncio
+async def test_disconnect_cancels_inflight_tool_call(client):
+    tool_state = {"started": False, "cancelled": False}
+
+    @tool
+    async def slow_tool() -> str:
+        """耗时工具"""
+        tool_state["started"] = True
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            tool_state["cancelled"] = True
+            raise
+        return "done"
+
+    agent = create_agent(
+        model=ToolCallingStubModel(), tools=[slow_tool], checkpointer=get_checkpointer()
+    )
+    conv_id = (await client.post("/api/v1/chat/conversations", json={})).json()["id"]
+
+    with patch("app.agent.betastay_agent.get_betastay_agent", return_value=agent), \
+            patch.object(settings, "SSE_DISCONNECT_GRACE", 0), \
+            patch.object(settings, "SSE_DISCONNECT_POLL", 0.02):
+        async with TestSession() as db:
+            start = time.perf_counter()
+            stream = chat_service.stream_message(db, conv_id, "定价", DisconnectingRequest(0.2))
+            await asyncio.wait_for(_consume(stream), timeout=2.0)
+            for _ in range(50):
+                if tool_state["cancelled"]:
+                    break
+                await asyncio.sleep(0.02)
+            elapsed = time.perf_counter() - start
+
+    assert tool_state["started"]
+    assert tool_state["cancelled"]
+    assert elapsed < 2.0
+
+
+@pytest.mark.asyncio
+async def test_stream_reports_queue_position_when_at_capacity(client):
+    model = StreamingStubModel(reply="好的", delay=0.05)
+    agent = create_agent(model=model, tools=[], checkpointer=get_checkpointer())
+    conv_ids = [
+        (await client.post("/api/v1/chat/conversations", json={})).json()["id"]
+        for _ in range(2)
+    ]
+
+    with patch("app.agent.betastay_agent.get_betastay_agent", return_value=agent), \
+            patch.object(settings, "LLM_MAX_CONCURRENCY", 1):
+        first, second = await asyncio.gather(*(
+            client.post(
+                f"/api/v1/chat/conversations/{conv_id}/messages/stream",
+                json={"content": "你好"},
+            )
+            for conv_id in conv_ids
+        ))
+
+    # 先到的直接开始，后到的排在第 1 位
+    admitted, queued = sorted(
+        (_parse_frames(first.text), _parse_frames(second.text)),
+        key=lambda frames: frames[0]["event"] == "queued",
+    )
+    assert admitted[0]["event"] != "queued"
+    assert queued[0]["event"] == "queued"
+    assert json.loads(queued[0]["data"]) == {"position": 1}
+    assert admitted[-1]["event"] == queued[-1]["event"] == "done"
+    assert model.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_busy_conversation_rejected_with_409(client):
+    model = StreamingStubModel(delay=0.02)
+    agent = create_agent(model=model, tools=[], checkpointer=get_checkpointer())
+    conv_id = (await client.post("/api/v1/chat/conversations", json={})).json()["id"]
+    url = f"/api/v1/chat/conversations/{conv_id}/messages/stream"
+
+    with patch("app.agent.betastay_agent.get_betastay_agent", return_value=agent):
+        async with TestSession() as db:
+            stream = chat_service.stream_message(db, conv_id, "定价")
+            await stream.__anext__()
+            busy = await client.post(url, json={"content": "再问一次"})
+            await _consume(stream)
+
+        assert busy.status_code == 409
+        # 上一轮结束后会话即可开始下一轮
+        resp = await client.post(url, json={"content": "再问一次"})
+        assert resp.status_code == 200
+
+    async with TestSession() as db:
+        messages = await conversation_service.get_messages(db, conv_id)
+    assert [m.content for m in messages if m.role == "user"] == ["定价", "再问一次"]
+
+
+@pytest.mark.asyncio
+async def test_admission_metrics_exposed(client):
+    resp = await client.get("/api/v1/metrics")
+    assert resp.status_code == 200
+    assert "chat_admission_queue_depth" in resp.text
+    assert "chat_admission_wait_seconds_bucket" in resp.text
+    assert "db_pool_checked_out" in resp.text
+    assert "db_pool_capacity" in resp.text
+
+
+@pytest.mark.asyncio
+async def test_pricing_intent_skips_model(client):
+    prop = await client.post("/api/v1/property", json={
+        "name": "测试房源", "address": "测试", "room_type": "整套", "area": 80.0,
+        "min_price": 300.0, "max_price": 800.0,
+    })
+    property_id = prop.json()["id"]
+    conv_id = (await client.post("/api/v1/chat/conversations", json={})).json()["id"]
+
+    model, agent = _recording_agent([])
+    with patch("app.agent.betastay_agent.get_betastay_agent", return_value=agent):
+        resp = await client.post(
+            f"/api/v1/chat/conversations/{conv_id}/messages/stream",
+            json={"content": f"给房源{property_id}算一下2026-05-01的价格"},
+        )
+    assert model.seen == []
+
+    frames = _parse_frames(resp.text)
+    assert [f["event"] for f in frames] == ["pricing", "content", "done"]
+    pricing = json.loads(frames[0]["data"])
+    assert pricing["property_id"] == property_id
+    assert pricing["target_date"] == "2026-05-01"
+    assert f"¥{pricing['suggested_price']:.0f}" in _streamed_content(frames)
+
+    async with TestSession() as db:
+        messages = await conversation_service.get_messages(db, conv_id)
+    assert [m.role for m in messages] == ["user", "assistant"]
+    assert messages[-1].tool_calls == {"pricing": [pricing]}
+
+
+@pytest.mark.asyncio
+async def test_property_form_intent_emits_form_and_keeps_thread(client):
+    model, agent = _recording_agent(["答1", "答2"])
+    conv_id = (await client.post("/api/v1/chat/conversations", json={})).json()["id"]
+    url = f"/api/v1/chat/conversations/{conv_id}/messages/stream"
+
+    with patch("app.agent.betastay_agent.get_betastay_agent", return_value=agent):
+        await client.post(url, json={"content": "你好"})
+        resp = await client.post(url, json={"content": "录入房源"})
+        await client.post(url, json={"content": "表单在哪"})
+
+    frames = _parse_frames(resp.text)
+    assert [f["event"] for f in frames] == ["content", "form", "done"]
+    assert json.loads(frames[1]["data"])["form_type"] == "property_create"
+    # 快速通道这一轮不调用模型，但追加到了会话线程
+    assert len(model.seen) == 2
+    assert "录入房源" in model.seen[-1]
+    assert "请在下方表单中填写房源信息，完成后点击提交。" in model.seen[-1]
+
+
+class FailingRule(IntentRule):
+    name = "failing"
+
+    def match(self, text):
+        return {} if text == "触发失败" else None
+
+    async def handle(self, db, params):
+        raise RuntimeError("工具不可用")
+
+
+@pytest.mark.asyncio
+async def test_fast_path_failure_replies_with_error(client):
+    conv_id = (await client.post("/api/v1/chat/conversations", json={})).json()["id"]
+    configure_intent_router(IntentRouter([FailingRule()]))
+    try:
+        resp = await client.post(
+            f"/api/v1/chat/conversations/{conv_id}/messages/stream",
+            json={"content": "触发失败"},
+        )
+    finally:
+        configure_intent_router(None)
+
+    frames = _parse_frames(resp.text)
+    assert [f["event"] for f in frames] == ["content", "done"]
+    assert "工具不可用" in _streamed_content(frames)
+
+    async with TestSession() as db:
+        messages = await conversation_service.get_messages(db, conv_id)
+    assert [m.role for m in messages] == ["user", "assistant"]
+    assert "工具不可用" in messages[-1].content
+
+
+@pytest.mark.asyncio
+async def test_fast_path_waits_for_live_generation(client):
+    conv_id = (await client.post("/api/v1/chat/conversations", json={})).json()["id"]
+    ticket = get_admission_controller().enter(conv_id)
+    try:
+        async with TestSession() as db:
+            frames = _parse_frames("".join([
+                event async for event in chat_service.stream_message(db, conv_id, "录入房源")
+            ]))
+    finally:
+        ticket.release()
+
+    assert [f["event"] for f in frames] == ["error"]
+    async with TestSession() as db:
+        assert await conversation_service.get_messages(db, conv_id) == []
+
+    # 快速通道结束后释放会话，后续请求可正常受理
+    resp = await client.post(
+        f"/api/v1/chat/conversations/{conv_id}/messages/stream", json={"content": "录入房源"}
+    )
+    assert [f["event"] for f in _parse_frames(resp.text)] == ["content", "form", "done"]
+    get_admission_controller().check(conv_id)
+
+
+@pytest.mark.asyncio
+async def test_model_profile_recorded_per_message(client):
+    model = StreamingStubModel(reply="好的", delay=0)
+    agent = create_agent(model=model, tools=[], checkpointer=get_checkpointer())
+    conv_id = (await client.post("/api/v1/chat/conversations", json={})).json()["id"]
+    url = f"/api/v1/chat/conversations/{conv_id}/messages/stream"
+
+    with patch("app.agent.betastay_agent.get_betastay_agent", return_value=agent):
+        resp = await client.post(url, json={"content": "谢谢"})
+        assert json.loads(_parse_frames(resp.text)[-1]["data"])["model_profile"] == "fast"
+        await client.post(url, json={"content": "为什么国庆的价格比平时高这么多"})
+
+    history = (await client.get(f"/api/v1/chat/conversations/{conv_id}/messages")).json()
+    assert [m["model_profile"] for m in history] == [None, "fast", None, "max"]
+
+
+class RangePricingStubModel(BaseChatModel):
+    """首次调用请求区间定价，之后直接回复"""
+
+    property_id: int = 0
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "range-pricing-stub"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        self.calls += 1
+        if self.calls == 1:
+            args = {"property_id": self.property_id, "start_date": "2026-05-01", "end_date": "2026-05-07"}
+            message = AIMessage(content="", tool_calls=[
+                {"name": "pricing_calculate_range", "args": args, "id": "call-1"},
+            ])
+        else:
+            message = AIMessage(content="下周价格如上")
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+@pytest.mark.asyncio
+async def test_range_pricing_emits_single_pricing_event(client):
+    from app.tools.pricing_tool import pricing_calculate_range
+
+    prop = await client.post("/api/v1/property", json={
+        "name": "测试房源", "address": "测试", "room_type": "整套", "area": 80.0,
+        "min_price": 300.0, "max_price": 800.0,
+    })
+    property_id = prop.json()["id"]
+    model = RangePricingStubModel(property_id=property_id)
+    agent = create_agent(
+        model=model, tools=[pricing_calculate_range], checkpointer=get_checkpointer()
+    )
+    conv_id = (await client.post("/api/v1/chat/conversations", json={})).json()["id"]
+
+    with patch("app.agent.betastay_agent.get_betastay_agent", return_value=agent):
+        resp = await client.post(
+            f"/api/v1/chat/conversations/{conv_id}/messages/stream",
+            json={"content": "下周每天的价格"},
+        )
+
+    pricing_frames = [f for f in _parse_frames(resp.text) if f["event"] == "pricing"]
+    assert len(pricing_frames) == 1
+    data = json.loads(pricing_frames[0]["data"])
+    assert data["property_id"] == property_id
+    assert len(data["prices"]) == 7
+    assert model.calls == 2
+
+    async with TestSession() as db:
+        messages = await conversation_service.get_messages(db, conv_id)
+    assert len(messages[-1].tool_calls["pricing"]) == 7
+
+
+@pytest.mark.asyncio
+async def test_fake_llm_provider_streams_script(client):
+    """LLM_PROVIDER=fake 时 Agent 使用本地模拟模型：思考片段 → 工具调用 → 正文"""
+    from app.agent.betastay_agent import create_betastay_agent
+
+    prop = await client.post("/api/v1/property", json={
+        "name": "测试房源", "address": "测试", "room_type": "整套", "area": 80.0,
+        "min_price": 300.0, "max_price": 800.0,
+    })
+    property_id = prop.json()["id"]
+    script = {
+        "reasoning": "先计算五一当天的价格",
+        "tool_calls": [{"name": "pricing_calculate", "args": {"property_id": property_id, "target_date": "2026-05-01"}}],
+        "reply": "五一的建议价格如上",
+    }
+    with patch.multiple(
+        settings, LLM_PROVIDER="fake", FAKE_LLM_SCRIPT=script,
+        FAKE_LLM_FIRST_TOKEN_MS=0, FAKE_LLM_TOKEN_DELAY_MS=0,
+    ):
+        agent = create_betastay_agent(checkpointer=get_checkpointer())
+    conv_id = (await client.post("/api/v1/chat/conversations", json={})).json()["id"]
+
+    with patch("app.agent.betastay_agent.get_betastay_agent", return_value=agent):
+        resp = await client.post(
+            f"/api/v1/chat/conversations/{conv_id}/messages/stream",
+            json={"content": "帮我看看五一的价格"},
+        )
+
+    frames = _parse_frames(resp.text)
+    thinking = "".join(json.loads(f["data"])["content"] for f in frames if f["event"] == "thinking")
+    assert thinking == script["reasoning"]
+    assert _streamed_content(frames) == script["reply"]
+    pricing = [json.loads(f["data"]) for f in frames if f["event"] == "pricing"]
+    assert [p["property_id"] for p in pricing] == [property_id]
+    assert frames[-1]["event"] == "done"
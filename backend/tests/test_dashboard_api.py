@@ -1,4 +1,7 @@
 import pytest
+from sqlalchemy import event
+
+from tests.conftest import test_engine
 
 
 @pytest.mark.asyncio
@@ -17,3 +20,138 @@ async def test_dashboard_summary(client):
     assert "feedback_count" in data
     assert "properties" in data
     assert data["property_count"] >= 1
+
+
+@pytest.mark.asyncio
+async def test_dashboard_summary_empty(client):
+    response = await client.get("/api/v1/dashboard/summary")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["property_count"] == 0
+    assert data["properties"] == []
+
+
+@pytest.mark.asyncio
+async def test_dashboard_latest_pricing_single_query(client):
+    ids = []
+    for name in ("房源A", "房源B"):
+        resp = await client.post("/api/v1/property", json={
+            "name": name, "address": "测试", "room_type": "整套", "area": 80.0,
+            "min_price": 300.0, "max_price": 800.0,
+        })
+        ids.append(resp.json()["id"])
+    for target_date in ("2026-05-01", "2026-05-09"):
+        await client.post("/api/v1/pricing/calculate", json={
+            "property_id": ids[0], "target_date": target_date,
+        })
+
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(test_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        response = await client.get("/api/v1/dashboard/summary")
+    finally:
+        event.remove(test_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+
+    assert len(statements) == 1
+    data = response.json()
+    assert data["property_count"] == 2
+    assert data["recent_pricing_count"] == 2
+    by_id = {p["id"]: p for p in data["properties"]}
+    assert by_id[ids[0]]["latest_pricing_date"] == "2026-05-09"
+    assert by_id[ids[1]]["latest_suggested_price"] is None
+
+
+@pytest.mark.asyncio
+async def test_dashboard_summary_cached_until_write(client):
+    await client.post("/api/v1/property", json={
+        "name": "房源A", "address": "测试", "room_type": "整套", "area": 80.0,
+        "min_price": 300.0, "max_price": 800.0,
+    })
+    first = await client.get("/api/v1/dashboard/summary")
+    assert first.json()["property_count"] == 1
+
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(test_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        cached = await client.get("/api/v1/dashboard/summary")
+    finally:
+        event.remove(test_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    assert statements == []
+    assert cached.json() == first.json()
+
+    # 写入房源 / 定价 / 反馈后缓存失效
+    prop_resp = await client.post("/api/v1/property", json={
+        "name": "房源B", "address": "测试", "room_type": "单间", "area": 30.0,
+    })
+    assert (await client.get("/api/v1/dashboard/summary")).json()["property_count"] == 2
+
+    pricing = await client.post("/api/v1/pricing/calculate", json={
+        "property_id": prop_resp.json()["id"], "target_date": "2026-05-01",
+    })
+    assert (await client.get("/api/v1/dashboard/summary")).json()["recent_pricing_count"] == 1
+
+    await client.post("/api/v1/feedback", json={
+        "pricing_record_id": pricing.json()["id"], "feedback_type": "adopted",
+    })
+    assert (await client.get("/api/v1/dashboard/summary")).json()["feedback_count"] == 1
+
+
+@pytest.mark.asyncio
+async def test_memory_cache_ttl_expiry(monkeypatch):
+    from app.core import cache as cache_module
+
+    cache = cache_module.MemoryCache()
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, "monotonic", lambda: now[0])
+
+    await cache.set("k", {"v": 1}, ttl=60)
+    assert await cache.get("k") == {"v": 1}
+    now[0] += 61
+    assert await cache.get("k") is None
+
+
+@pytest.mark.asyncio
+async def test_slow_compute_does_not_overwrite_invalidation():
+    """计算期间另一个 worker 写入并失效：旧结果不会回填到共享缓存中被读取"""
+    import asyncio
+    from unittest.mock import patch
+
+    from app.services import dashboard_service
+
+    release = asyncio.Event()
+    results = iter([{"property_count": 1}, {"property_count": 2}])
+
+    async def compute(db):
+        summary = next(results)
+        if summary["property_count"] == 1:
+            await release.wait()
+        return summary
+
+    with patch.object(dashboard_service, "compute_summary", compute):
+        slow = asyncio.create_task(dashboard_service.get_summary(None))
+        await asyncio.sleep(0)
+        # 版本号只存在于共享缓存中，等价于另一个 worker 的写入
+        await dashboard_service.invalidate_summary()
+        release.set()
+        assert (await slow)["property_count"] == 1
+
+        assert (await dashboard_service.get_summary(None))["property_count"] == 2
+
+
+@pytest.mark.asyncio
+async def test_invalidation_does_not_grow_memory_cache(client):
+    from app.core.cache import get_cache
+    from app.services import dashboard_service
+
+    for _ in range(20):
+        await client.get("/api/v1/dashboard/summary")
+        await dashboard_service.invalidate_summary()
+    assert len(get_cache()._data) == 2
@@ -1,6 +1,5 @@
 import pytest
 import pandas as pd
-import os
 from io import BytesIO
 
 
@@ -21,11 +20,10 @@ def create_test_excel(path: str):
     df.to_excel(path, index=False)
 
 
-def test_parse_excel_basic():
+def test_parse_excel_basic(tmp_path):
     from app.tools.excel_parser import parse_excel
 
-    path = "tests/fixtures/test_property.xlsx"
-    os.makedirs("tests/fixtures", exist_ok=True)
+    path = str(tmp_path / "test_property.xlsx")
     create_test_excel(path)
 
     result = parse_excel(path)
@@ -0,0 +1,198 @@
+from unittest.mock import patch
+
+import pytest
+from langchain.agents import create_agent
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from app.agent.checkpointer import get_checkpointer
+from app.agent.tokens import MESSAGE_OVERHEAD_TOKENS, estimate_messages_tokens, estimate_tokens
+from app.core.config import settings
+from app.models.conversation import Conversation
+from app.services import conversation_service, history_service
+from app.services.action_store import save_pending_action
+from tests.conftest import TestSession
+
+
+class StubModel(BaseChatModel):
+    """记录每次调用的输入，回复固定前缀加调用序号"""
+
+    prefix: str = "回复"
+    seen: list = []
+    fail: bool = False
+
+    @property
+    def _llm_type(self) -> str:
+        return "history-stub"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        if self.fail:
+            raise RuntimeError("model unavailable")
+        self.seen.append([m.content for m in messages])
+        content = f"{self.prefix}{len(self.seen)}"
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=content))])
+
+
+async def _seed_turns(db, conversation_id, start, stop):
+    for i in range(start, stop):
+        await conversation_service.save_message(db, conversation_id, "user", f"问{i}")
+        await conversation_service.save_message(db, conversation_id, "assistant", f"答{i}")
+
+
+def test_estimate_tokens():
+    assert estimate_tokens("") == 0
+    short = estimate_tokens("帮我定价")
+    assert 0 < short < estimate_tokens("帮我给西湖边的整套房源定一下国庆期间的价格")
+    messages = [{"role": "user", "content": "帮我定价"}, HumanMessage(content="帮我定价")]
+    assert estimate_messages_tokens(messages) == 2 * (short + MESSAGE_OVERHEAD_TOKENS)
+
+
+@pytest.mark.asyncio
+async def test_build_context_summarizes_older_turns_incrementally():
+    summarizer = StubModel(prefix="摘要", seen=[])
+    async with TestSession() as db:
+        conv = await conversation_service.create_conversation(db)
+        await _seed_turns(db, conv.id, 0, 5)
+
+        with patch.object(settings, "HISTORY_KEEP_TURNS", 2), \
+                patch("app.agent.betastay_agent.get_summary_model", return_value=summarizer):
+            context = await history_service.build_context(db, conv.id)
+            assert context[0] == {"role": "system", "content": "【早期对话摘要】\n摘要1"}
+            assert [m["content"] for m in context[1:]] == ["问3", "答3", "问4", "答4"]
+            assert "问2" in summarizer.seen[0][1]
+
+            await _seed_turns(db, conv.id, 5, 7)
+            context = await history_service.build_context(db, conv.id)
+
+        # 第二次只摘要新移出窗口的两轮，并带上已有摘要
+        second_input = summarizer.seen[1][1]
+        assert "摘要1" in second_input
+        assert "问3" in second_input and "问4" in second_input
+        assert "问2" not in second_input
+        assert [m["content"] for m in context[1:]] == ["问5", "答5", "问6", "答6"]
+
+        refreshed = await db.get(Conversation, conv.id)
+        await db.refresh(refreshed)
+        assert refreshed.summary == "摘要2"
+
+
+@pytest.mark.asyncio
+async def test_build_context_respects_token_budget():
+    async with TestSession() as db:
+        conv = await conversation_service.create_conversation(db)
+        for i in range(3):
+            filler = "".join(chr(0x4E00 + (j * 37) % 5000) for j in range(400))
+            await conversation_service.save_message(db, conv.id, "user", f"问{i}" + filler)
+            await conversation_service.save_message(db, conv.id, "assistant", f"答{i}")
+
+        with patch.object(settings, "HISTORY_TOKEN_BUDGET", 1000), \
+                patch.object(settings, "HISTORY_SUMMARY_MAX_TOKENS", 200), \
+                patch("app.agent.betastay_agent.get_summary_model", return_value=StubModel(seen=[])):
+            context = await history_service.build_context(db, conv.id)
+
+    verbatim = [m for m in context if m["role"] != "system"]
+    assert [m["content"][:2] for m in verbatim] == ["问2", "答2"]
+    assert estimate_messages_tokens(context) <= 1000
+
+
+@pytest.mark.asyncio
+async def test_summary_falls_back_to_excerpt_when_model_fails():
+    async with TestSession() as db:
+        conv = await conversation_service.create_conversation(db)
+        await _seed_turns(db, conv.id, 0, 3)
+
+        with patch.object(settings, "HISTORY_KEEP_TURNS", 1), \
+                patch("app.agent.betastay_agent.get_summary_model", return_value=StubModel(fail=True)):
+            context = await history_service.build_context(db, conv.id)
+
+    assert context[0]["content"] == "【早期对话摘要】\n房东：问0\n助手：答0\n房东：问1\n助手：答1"
+
+
+@pytest.mark.asyncio
+async def test_pending_action_and_pricing_pinned():
+    pricing = {
+        "pricing_record_id": 7,
+        "property_id": 3,
+        "target_date": "2026-10-01",
+        "conservative_price": 420.0,
+        "suggested_price": 480.0,
+        "aggressive_price": 540.0,
+    }
+    async with TestSession() as db:
+        conv = await conversation_service.create_conversation(db)
+        await conversation_service.save_message(db, conv.id, "user", "国庆定价")
+        await conversation_service.save_message(
+            db, conv.id, "assistant", "建议480元", tool_calls={"pricing": [pricing]}
+        )
+        await save_pending_action(db, conv.id, "record_feedback", {"pricing_record_id": 7})
+        await db.commit()
+        await _seed_turns(db, conv.id, 0, 3)
+
+        with patch.object(settings, "HISTORY_KEEP_TURNS", 1), \
+                patch("app.agent.betastay_agent.get_summary_model", return_value=StubModel(seen=[])):
+            context = await history_service.build_context(db, conv.id)
+
+    pinned = context[1]["content"]
+    assert pinned.startswith("【置顶上下文】")
+    assert "record_feedback" in pinned
+    assert "房源3 2026-10-01 保守420.0 建议480.0 激进540.0" in pinned
+    assert [m["content"] for m in context[2:]] == ["问2", "答2"]
+
+
+@pytest.mark.asyncio
+async def test_deleting_summarized_messages_clears_summary():
+    async with TestSession() as db:
+        conv = await conversation_service.create_conversation(db)
+        await _seed_turns(db, conv.id, 0, 3)
+        with patch.object(settings, "HISTORY_KEEP_TURNS", 1), \
+                patch("app.agent.betastay_agent.get_summary_model", return_value=StubModel(seen=[])):
+            await history_service.build_context(db, conv.id)
+
+        messages = await conversation_service.get_messages(db, conv.id)
+        await conversation_service.delete_messages_from_id(db, conv.id, messages[1].id)
+
+        await db.refresh(conv)
+        assert conv.summary is None
+        assert conv.summary_until_id is None
+        assert (conv.message_count, conv.user_message_count) == (1, 1)
+
+
+@pytest.mark.asyncio
+async def test_long_conversation_prompt_stays_bounded(client):
+    model = StubModel(seen=[])
+    agent = create_agent(model=model, tools=[], checkpointer=get_checkpointer())
+    conv_id = (await client.post("/api/v1/chat/conversations", json={})).json()["id"]
+
+    with patch.object(settings, "HISTORY_KEEP_TURNS", 2), \
+            patch("app.agent.betastay_agent.get_betastay_agent", return_value=agent), \
+            patch("app.agent.betastay_agent.get_summary_model", return_value=StubModel(prefix="摘要", seen=[])):
+        for i in range(12):
+            resp = await client.post(
+                f"/api/v1/chat/conversations/{conv_id}/messages", json={"content": f"问{i}"}
+            )
+            assert resp.status_code == 200
+
+    # 线程超过 2 * HISTORY_KEEP_TURNS 轮后重建，模型输入不随对话长度增长
+    assert max(len(seen) for seen in model.seen) <= 2 * 2 * 2 + 2
+    assert model.seen[-1][-1] == "问11"
+    assert any(content.startswith("【早期对话摘要】") for content in model.seen[-1])
+
+
+@pytest.mark.asyncio
+async def test_context_messages_merged_into_system_prompt():
+    from app.agent.middleware import ContextMessageMiddleware
+
+    model = StubModel(seen=[])
+    agent = create_agent(
+        model=model, tools=[], system_prompt="系统提示", middleware=[ContextMessageMiddleware()]
+    )
+    await agent.ainvoke({"messages": [
+        {"role": "system", "content": "【早期对话摘要】\n摘要"},
+        {"role": "user", "content": "问"},
+    ]})
+
+    assert model.seen[0] == ["系统提示\n\n【早期对话摘要】\n摘要", "问"]
@@ -0,0 +1,88 @@
+from datetime import date
+
+import numpy as np
+import pytest
+
+
+def _calendar():
+    from app.engine.holiday_calendar import HolidayCalendar
+
+    return HolidayCalendar({
+        "2026": [
+            {"name": "劳动节", "start": "2026-05-01", "end": "2026-05-05"},
+            {"name": "端午", "start": "2026-06-19", "end": "2026-06-21"},
+        ],
+        "2027": [
+            {"name": "元旦", "start": "2027-01-01", "end": "2027-01-03"},
+        ],
+    })
+
+
+def test_lookup_holiday_day():
+    info = _calendar().lookup(date(2026, 5, 3))
+    assert info.is_holiday is True
+    assert info.name == "劳动节"
+    assert info.distance_days == 0
+
+
+def test_lookup_nearest_holiday():
+    cal = _calendar()
+    before = cal.lookup(date(2026, 4, 29))
+    assert before.is_holiday is False
+    assert before.name == "劳动节"
+    assert before.distance_days == 2
+
+    after = cal.lookup(date(2026, 5, 7))
+    assert after.distance_days == 2
+
+    # 跨年邻近
+    new_year = cal.lookup(date(2026, 12, 30))
+    assert new_year.name == "元旦"
+    assert new_year.distance_days == 2
+
+
+def test_lookup_out_of_range():
+    from app.engine.holiday_calendar import NO_HOLIDAY_DISTANCE
+
+    info = _calendar().lookup(date(2030, 1, 1))
+    assert info.is_holiday is False
+    assert info.name is None
+    assert info.distance_days == NO_HOLIDAY_DISTANCE
+
+
+def test_lookup_array_matches_single_lookup():
+    cal = _calendar()
+    days = np.arange(np.datetime64("2026-04-20"), np.datetime64("2027-01-10"))
+    is_holiday, distance = cal.lookup_array(days)
+    for i, d in enumerate(days.astype(object)):
+        info = cal.lookup(d)
+        assert is_holiday[i] == info.is_holiday
+        assert distance[i] == info.distance_days
+
+
+def test_default_calendar_covers_multiple_years():
+    from app.engine.holiday_calendar import get_holiday_calendar
+
+    cal = get_holiday_calendar()
+    for year in (2025, 2026, 2027):
+        assert cal.is_holiday_on(date(year, 10, 1))
+    assert not cal.is_holiday_on(date(2027, 3, 10))
+
+
+def test_engine_uses_calendar_beyond_2026():
+    from app.engine.pricing_engine import PricingEngine
+
+    engine = PricingEngine()
+    assert engine._calc_time_factor(date(2027, 10, 1)) == pytest.approx(0.30)
+
+
+def test_holiday_events_single_nearest():
+    from app.services.pricing_service import _holiday_events
+
+    assert _holiday_events(date(2026, 5, 1)) == [
+        {"type": "holiday", "name": "劳动节", "distance_days": 0}
+    ]
+    assert _holiday_events(date(2026, 5, 7)) == [
+        {"type": "holiday_adjacent", "name": "劳动节", "distance_days": 2}
+    ]
+    assert _holiday_events(date(2026, 5, 20)) == []
@@ -0,0 +1,82 @@
+from datetime import date, timedelta
+
+import pytest
+
+from app.services.intent_router import (
+    IntentResult,
+    IntentRouter,
+    IntentRule,
+    PricingRule,
+    PropertyFormRule,
+)
+
+
+@pytest.fixture
+def router():
+    return IntentRouter([PropertyFormRule(), PricingRule()])
+
+
+@pytest.mark.parametrize("text", ["录入房源", "我想新建一个房源", "帮我添加一套新房源。", " 新增民宿 "])
+def test_property_form_intent(router, text):
+    rule, params = router.route(text)
+    assert rule.name == "property_form"
+    assert params == {}
+
+
+@pytest.mark.parametrize("text, target", [
+    ("给房源3算一下2026-05-01的价格", date(2026, 5, 1)),
+    ("房源3 2026年5月1日定价", date(2026, 5, 1)),
+    ("帮我给房源 3 算算明天的价格", date.today() + timedelta(days=1)),
+])
+def test_pricing_intent(router, text, target):
+    rule, params = router.route(text)
+    assert rule.name == "pricing"
+    assert params == {"property_id": 3, "target_date": target}
+
+
+def test_pricing_without_year_picks_next_occurrence(router):
+    today = date.today()
+    _, params = router.route(f"给房源3算一下{today.month}月{today.day}日的价格")
+    assert params["target_date"] == today
+
+    yesterday = today - timedelta(days=1)
+    _, params = router.route(f"给房源3算一下{yesterday.month}月{yesterday.day}日的价格")
+    assert params["target_date"] > today
+
+
+@pytest.mark.parametrize("text", [
+    "录入房源，名字叫西湖小筑",
+    "房源3 5月1日",
+    "给房源3算一下2月30日的价格",
+    "给房源3算一下下周每天的价格",
+    "房源3五一的价格为什么这么高",
+    "谢谢",
+])
+def test_ambiguous_messages_fall_through(router, text):
+    assert router.route(text) is None
+
+
+def test_multiple_matching_rules_fall_through(router):
+    class Greedy(IntentRule):
+        name = "greedy"
+
+        def match(self, text):
+            return {}
+
+        async def handle(self, db, params):
+            return IntentResult(content="")
+
+    router.register(Greedy())
+    assert router.route("录入房源") is None
+    assert router.route("你好")[0].name == "greedy"
+
+
+def test_rule_must_implement_handle():
+    class MatchOnly(IntentRule):
+        name = "match_only"
+
+        def match(self, text):
+            return {}
+
+    with pytest.raises(TypeError):
+        MatchOnly()
@@ -0,0 +1,210 @@
+import asyncio
+import json
+from datetime import datetime
+from unittest.mock import patch
+
+import pytest
+from langchain.agents import create_agent
+from sqlalchemy import event, select
+
+from app.agent.checkpointer import get_checkpointer
+from app.models.conversation import Conversation, Message
+from app.services import conversation_service
+from app.services.message_writer import MessageWriter, configure_message_writer
+from tests.conftest import TestSession, test_engine
+from tests.test_chat_api import StreamingStubModel, _parse_frames
+
+
+def _values(conversation_id: str, i: int) -> dict:
+    return {
+        "conversation_id": conversation_id,
+        "role": "assistant",
+        "content": f"回复{i}",
+        "created_at": datetime.utcnow(),
+    }
+
+
+async def _new_conversation() -> str:
+    async with TestSession() as db:
+        return (await conversation_service.create_conversation(db)).id
+
+
+class _Statements:
+    """记录执行的 SQL 语句与提交次数"""
+
+    def __init__(self):
+        self.sql: list[str] = []
+        self.commits = 0
+
+    def _execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.sql.append(statement.lstrip().split()[0].upper())
+
+    def _commit(self, conn):
+        self.commits += 1
+
+    def __enter__(self):
+        event.listen(test_engine.sync_engine, "before_cursor_execute", self._execute)
+        event.listen(test_engine.sync_engine, "commit", self._commit)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(test_engine.sync_engine, "before_cursor_execute", self._execute)
+        event.remove(test_engine.sync_engine, "commit", self._commit)
+
+
+@pytest.mark.asyncio
+async def test_close_flushes_queued_messages_in_one_transaction():
+    """关闭时写完队列：积压的消息合并为一个事务写入，全部落库"""
+    conv_id = await _new_conversation()
+    writer = MessageWriter(TestSession, max_queue=100, max_batch=100)
+    futures = [await writer.submit(_values(conv_id, i)) for i in range(20)]
+
+    with _Statements() as statements:
+        writer.start()
+        await writer.close()
+
+    assert statements.commits == 1
+    ids = [f.result() for f in futures]
+    assert ids == sorted(ids)
+    async with TestSession() as db:
+        messages = await conversation_service.get_messages(db, conv_id)
+    assert [m.content for m in messages] == [f"回复{i}" for i in range(20)]
+    assert [m.id for m in messages] == ids
+
+
+@pytest.mark.asyncio
+async def test_full_queue_applies_backpressure():
+    conv_id = await _new_conversation()
+    writer = MessageWriter(TestSession, max_queue=2, max_batch=10)
+    await writer.submit(_values(conv_id, 0))
+    await writer.submit(_values(conv_id, 1))
+
+    blocked = asyncio.create_task(writer.submit(_values(conv_id, 2)))
+    await asyncio.sleep(0.05)
+    assert not blocked.done()
+
+    writer.start()
+    await (await blocked)
+    await writer.close()
+    async with TestSession() as db:
+        assert len(await conversation_service.get_messages(db, conv_id)) == 3
+
+
+@pytest.mark.asyncio
+async def test_cancelled_submit_does_not_block_readers():
+    """队列满时入队被取消：消息不入队，读屏障不会永远等待"""
+    conv_id = await _new_conversation()
+    writer = MessageWriter(TestSession, max_queue=1, max_batch=10)
+    await writer.submit(_values(conv_id, 0))
+
+    blocked = asyncio.create_task(writer.submit(_values(conv_id, 1)))
+    await asyncio.sleep(0.05)
+    blocked.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await blocked
+
+    writer.start()
+    await asyncio.wait_for(writer.wait_for(conv_id), timeout=1)
+    await writer.close()
+    async with TestSession() as db:
+        assert [m.content for m in await conversation_service.get_messages(db, conv_id)] == ["回复0"]
+
+
+@pytest.mark.asyncio
+async def test_failed_batch_retries_rows_individually():
+    """一条坏数据不拖累同批其他消息"""
+    conv_id = await _new_conversation()
+    writer = MessageWriter(TestSession, max_queue=10, max_batch=10)
+    good = await writer.submit(_values(conv_id, 0))
+    bad = await writer.submit({**_values(conv_id, 1), "content": None})
+    writer.start()
+    await writer.close()
+
+    assert isinstance(good.result(), int)
+    assert bad.exception() is not None
+    async with TestSession() as db:
+        assert [m.content for m in await conversation_service.get_messages(db, conv_id)] == ["回复0"]
+
+
+@pytest.mark.asyncio
+async def test_save_user_message_single_transaction():
+    """用户消息与首条消息的标题更新在同一事务提交"""
+    conv_id = await _new_conversation()
+
+    async with TestSession() as db:
+        with _Statements() as statements:
+            await conversation_service.save_user_message(db, conv_id, "五一假期西湖边的房源怎么定价")
+        await conversation_service.save_user_message(db, conv_id, "第二条消息")
+
+    assert statements.sql == ["INSERT", "UPDATE"]
+    assert statements.commits == 1
+    async with TestSession() as db:
+        conv = await db.get(Conversation, conv_id)
+        assert conv.title == "五一假期西湖边的房源"
+        roles = (await db.execute(select(Message.role).where(Message.conversation_id == conv_id))).scalars()
+        assert list(roles) == ["user", "user"]
+
+
+@pytest.mark.asyncio
+async def test_streamed_reply_deferred_and_durable(client):
+    """开启 write-behind：done 不等待落库（id 为空），读取历史前等待落库，关闭时写完"""
+    writer = MessageWriter(TestSession, max_queue=10, max_batch=10)
+    configure_message_writer(writer)
+    model = StreamingStubModel(reply="好的", delay=0)
+    agent = create_agent(model=model, tools=[], checkpointer=get_checkpointer())
+    conv_id = (await client.post("/api/v1/chat/conversations", json={})).json()["id"]
+
+    try:
+        with patch("app.agent.betastay_agent.get_betastay_agent", return_value=agent):
+            resp = await client.post(
+                f"/api/v1/chat/conversations/{conv_id}/messages/stream", json={"content": "你好"}
+            )
+        done = json.loads(_parse_frames(resp.text)[-1]["data"])
+        assert done["id"] is None
+        assert done["created_at"]
+
+        # 后台写入任务尚未启动，读取历史会等待；启动后返回完整历史
+        history = asyncio.create_task(client.get(f"/api/v1/chat/conversations/{conv_id}/messages"))
+        await asyncio.sleep(0.05)
+        assert not history.done()
+        writer.start()
+        messages = (await history).json()
+        assert [(m["role"], m["content"]) for m in messages] == [("user", "你好"), ("assistant", "好的")]
+    finally:
+        configure_message_writer(None)
+        await writer.close()
+
+
+@pytest.mark.asyncio
+async def test_turn_round_trip_budget(client):
+    """每轮对话的数据库往返：调用模型前只有查会话、插入用户消息、更新计数与标题三条语句"""
+    statements = _Statements()
+
+    class MarkedModel(StreamingStubModel):
+        async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+            statements.sql.append("LLM")
+            async for chunk in super()._astream(messages, stop, run_manager, **kwargs):
+                yield chunk
+
+    agent = create_agent(model=MarkedModel(reply="好的", delay=0), tools=[], checkpointer=get_checkpointer())
+    conv_id = (await client.post("/api/v1/chat/conversations", json={})).json()["id"]
+
+    turns = []
+    with patch("app.agent.betastay_agent.get_betastay_agent", return_value=agent):
+        for content in ("五一假期西湖边的房源怎么定价", "那国庆呢"):
+            with statements:
+                resp = await client.post(
+                    f"/api/v1/chat/conversations/{conv_id}/messages/stream", json={"content": content}
+                )
+            assert _parse_frames(resp.text)[-1]["event"] == "done"
+            turns.append((statements.sql, statements.commits))
+            statements.sql, statements.commits = [], 0
+
+    # 首轮线程不存在，从数据库历史重建：会话摘要、消息、待确认操作、最近定价结果
+    assert turns[0] == (["SELECT", "INSERT", "UPDATE"] + ["SELECT"] * 4 + ["LLM", "INSERT", "UPDATE"], 2)
+    assert turns[1] == (["SELECT", "INSERT", "UPDATE", "LLM", "INSERT", "UPDATE"], 2)
+
+    async with TestSession() as db:
+        conv = await db.get(Conversation, conv_id)
+    assert conv.title == "五一假期西湖边的房源"
+    assert (conv.message_count, conv.user_message_count) == (4, 2)
@@ -1,4 +1,10 @@
+from datetime import date
+
 import pytest
+from sqlalchemy import event
+
+from app.services import pricing_service
+from tests.conftest import TestSession, test_engine
 
 
 @pytest.mark.asyncio
@@ -38,3 +44,204 @@ async def test_list_pricing_records(client):
     response = await client.get(f"/api/v1/pricing/records/{property_id}")
     assert response.status_code == 200
     assert len(response.json()) >= 1
+
+
+@pytest.mark.asyncio
+async def test_batch_pricing_matrix(client):
+    ids = []
+    for name, room_type, area in [("整套A", "整套", 80.0), ("单间B", "单间", 25.0)]:
+        resp = await client.post("/api/v1/property", json={
+            "name": name, "address": "测试", "room_type": room_type, "area": area,
+            "min_price": 200.0, "max_price": 1000.0,
+        })
+        ids.append(resp.json()["id"])
+
+    response = await client.post("/api/v1/pricing/batch", json={
+        "start_date": "2026-04-28", "end_date": "2026-05-04", "property_ids": ids,
+    })
+    assert response.status_code == 200
+    data = response.json()
+    assert len(data["dates"]) == 7
+    assert [p["property_id"] for p in data["properties"]] == ids
+    assert data["saved_count"] == 0
+    for prop in data["properties"]:
+        assert len(prop["suggested_price"]) == 7
+        for c, s, a in zip(prop["conservative_price"], prop["suggested_price"], prop["aggressive_price"]):
+            assert c <= s <= a
+
+    # 与单日定价结果一致
+    single = await client.post("/api/v1/pricing/calculate", json={
+        "property_id": ids[0], "target_date": "2026-05-01",
+    })
+    assert single.json()["suggested_price"] == pytest.approx(
+        data["properties"][0]["suggested_price"][3], abs=0.01
+    )
+
+
+@pytest.mark.asyncio
+async def test_batch_pricing_save(client):
+    prop_resp = await client.post("/api/v1/property", json={
+        "name": "测试", "address": "测试", "room_type": "整套", "area": 80.0,
+        "min_price": 200.0, "max_price": 1000.0,
+    })
+    property_id = prop_resp.json()["id"]
+
+    response = await client.post("/api/v1/pricing/batch", json={
+        "start_date": "2026-05-01", "end_date": "2026-05-03", "save": True,
+    })
+    assert response.status_code == 200
+    assert response.json()["saved_count"] == 3
+
+    records = await client.get(f"/api/v1/pricing/records/{property_id}")
+    assert len(records.json()) == 3
+
+
+@pytest.mark.asyncio
+async def test_batch_pricing_invalid_range(client):
+    response = await client.post("/api/v1/pricing/batch", json={
+        "start_date": "2026-05-03", "end_date": "2026-05-01",
+    })
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_batch_pricing_malformed_date(client):
+    response = await client.post("/api/v1/pricing/batch", json={
+        "start_date": "2026-13-01", "end_date": "2026-05-01",
+    })
+    assert response.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_batch_save_dedupes_dates(client):
+    prop_resp = await client.post("/api/v1/property", json={
+        "name": "测试", "address": "测试", "room_type": "整套", "area": 80.0,
+        "min_price": 200.0, "max_price": 1000.0,
+    })
+    property_id = prop_resp.json()["id"]
+
+    async with TestSession() as db:
+        matrix = await pricing_service.calculate_batch(
+            db, [date(2026, 5, 2), date(2026, 5, 1), date(2026, 5, 2)], [property_id], save=True
+        )
+    assert matrix["saved_count"] == 2
+    assert matrix["suggested_price"].shape == (1, 2)
+
+    records = await client.get(f"/api/v1/pricing/records/{property_id}")
+    assert sorted(r["target_date"] for r in records.json()) == ["2026-05-01", "2026-05-02"]
+
+
+@pytest.mark.asyncio
+async def test_calculate_pricing_query_count(client):
+    """一次定价 = 1 条因素查询（CTE）+ 1 条 INSERT"""
+    prop_resp = await client.post("/api/v1/property", json={
+        "name": "测试", "address": "测试", "room_type": "整套", "area": 80.0,
+        "min_price": 200.0, "max_price": 1000.0,
+    })
+    property_id = prop_resp.json()["id"]
+    # 先产生一条定价记录，使市场/历史因素查询都有数据可读
+    await client.post("/api/v1/pricing/calculate", json={
+        "property_id": property_id, "target_date": "2026-05-01",
+    })
+
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(test_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        response = await client.post("/api/v1/pricing/calculate", json={
+            "property_id": property_id, "target_date": "2026-05-02",
+        })
+    finally:
+        event.remove(test_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+
+    assert response.status_code == 200
+    assert len(statements) == 2, statements
+    assert statements[0].lstrip().upper().startswith("WITH")
+    assert statements[1].lstrip().upper().startswith("INSERT")
+
+
+async def _call_tool(tool, args: dict) -> dict:
+    """以工具调用的方式执行，返回完整结果（artifact）"""
+    message = await tool.ainvoke({"type": "tool_call", "id": "call-1", "name": tool.name, "args": args})
+    return message.artifact
+
+
+@pytest.mark.asyncio
+async def test_pricing_range_tool_single_pass(client):
+    """区间定价 = 1 条因素查询 + 1 条批量 INSERT，逐日结果与单日定价一致"""
+    from app.tools.context import db_session_var
+    from app.tools.pricing_tool import pricing_calculate_range
+    from tests.conftest import TestSession
+
+    prop_resp = await client.post("/api/v1/property", json={
+        "name": "测试", "address": "测试", "room_type": "整套", "area": 80.0,
+        "min_price": 200.0, "max_price": 1000.0,
+    })
+    property_id = prop_resp.json()["id"]
+
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    async with TestSession() as db:
+        token = db_session_var.set(db)
+        event.listen(test_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            result = await _call_tool(pricing_calculate_range, {
+                "property_id": property_id, "start_date": "2026-04-28", "end_date": "2026-05-04",
+            })
+        finally:
+            event.remove(test_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+            db_session_var.reset(token)
+
+    assert result["success"]
+    prices = result["prices"]
+    assert [p["target_date"] for p in prices] == [f"2026-{d}" for d in (
+        "04-28", "04-29", "04-30", "05-01", "05-02", "05-03", "05-04"
+    )]
+    assert len({p["pricing_record_id"] for p in prices}) == 7
+    assert [s.lstrip().upper().split()[0] for s in statements] == ["WITH", "INSERT"]
+
+    records = (await client.get(f"/api/v1/pricing/records/{property_id}")).json()
+    by_id = {r["id"]: r for r in records}
+    for price in prices:
+        record = by_id[price["pricing_record_id"]]
+        assert record["target_date"] == price["target_date"]
+        assert record["suggested_price"] == pytest.approx(price["suggested_price"])
+
+    single = await client.post("/api/v1/pricing/calculate", json={
+        "property_id": property_id, "target_date": "2026-05-01",
+    })
+    assert single.json()["suggested_price"] == pytest.approx(prices[3]["suggested_price"], abs=0.01)
+
+
+@pytest.mark.asyncio
+async def test_pricing_range_tool_validation():
+    from app.tools.context import db_session_var
+    from app.tools.pricing_tool import pricing_calculate_range
+    from tests.conftest import TestSession
+
+    async with TestSession() as db:
+        token = db_session_var.set(db)
+        try:
+            calls = [
+                {"property_id": 1},
+                {"property_id": 1, "start_date": "2026-05-03", "end_date": "2026-05-01"},
+                {"property_id": 1, "start_date": "2026-01-01", "end_date": "2026-03-01"},
+                {"property_id": 1, "dates": ["2026/05/01"]},
+                {"property_id": 999, "dates": ["2026-05-01"]},
+                # 超出天数上限的区间与列表在展开、解析日期前即被拒绝
+                {"property_id": 1, "start_date": "0001-01-01", "end_date": "9999-12-31"},
+                {"property_id": 1, "dates": ["不是日期"] * 32},
+            ]
+            results = [await _call_tool(pricing_calculate_range, args) for args in calls]
+        finally:
+            db_session_var.reset(token)
+
+    assert all(not r["success"] for r in results)
+    assert "999" in results[4]["error"]
+    assert all("一次最多计算31天" in r["error"] for r in results[5:])
@@ -1,5 +1,6 @@
 import pytest
 from datetime import date
+import numpy as np
 
 
 def test_basic_pricing():
@@ -253,3 +254,173 @@ class TestCalcExternal:
             {"type": "booking_urgency", "avg_advance_days": 30, "days_until_target": 5},
         ])
         assert result == pytest.approx(0.15, abs=0.001)
+
+
+# --------------- Date-range pricing tests ---------------
+
+class TestCalculateRange:
+    PREF = {
+        "min_price": 300.0,
+        "max_price": 900.0,
+        "expected_return_rate": 0.1,
+        "vacancy_tolerance": 0.4,
+    }
+    INFO = {"room_type": "整套", "area": 120.0}
+    HIST = {
+        "transactions": [
+            {"actual_price": 400, "check_in_date": date(2026, 1, 1)},
+            {"actual_price": 440, "check_in_date": date(2026, 2, 1)},
+        ],
+        "feedbacks": [],
+    }
+    MARKET = {"similar_avg": 520, "similar_min": 400, "similar_max": 650, "own_avg": 480}
+
+    def _engine(self):
+        from app.engine.pricing_engine import PricingEngine
+        return PricingEngine()
+
+    def test_full_year_shape(self):
+        engine = self._engine()
+        result = engine.calculate_range(
+            base_price=500.0,
+            owner_preference=self.PREF,
+            property_info=self.INFO,
+            start_date=date(2026, 1, 1),
+            end_date=date(2026, 12, 31),
+        )
+        assert len(result["dates"]) == 365
+        assert result["dates"][0] == np.datetime64("2026-01-01")
+        assert result["dates"][-1] == np.datetime64("2026-12-31")
+        assert (result["conservative_price"] <= result["suggested_price"]).all()
+        assert (result["suggested_price"] <= result["aggressive_price"]).all()
+        assert (result["conservative_price"] >= 300.0).all()
+        assert (result["aggressive_price"] <= 900.0).all()
+
+    def test_matches_single_date_calculation(self):
+        from datetime import timedelta
+        from app.services.pricing_service import _holiday_events
+
+        engine = self._engine()
+        today = date(2026, 4, 20)
+        start, end = date(2026, 4, 25), date(2026, 5, 12)
+        result = engine.calculate_range(
+            base_price=500.0,
+            owner_preference=self.PREF,
+            property_info=self.INFO,
+            start_date=start,
+            end_date=end,
+            historical_data=self.HIST,
+            market_data=self.MARKET,
+            avg_advance_days=14.0,
+            today=today,
+        )
+
+        for i in range((end - start).days + 1):
+            target = start + timedelta(days=i)
+            events = _holiday_events(target)
+            events.append({
+                "type": "booking_urgency",
+                "avg_advance_days": 14.0,
+                "days_until_target": (target - today).days,
+            })
+            single = engine.calculate(
+                base_price=500.0,
+                owner_preference=self.PREF,
+                property_info=self.INFO,
+                target_date=target,
+                historical_data=self.HIST,
+                market_data=self.MARKET,
+                external_events=events,
+            )
+            assert result["suggested_price"][i] == pytest.approx(single["suggested_price"], abs=0.01)
+            assert result["conservative_price"][i] == pytest.approx(single["conservative_price"], abs=0.01)
+            assert result["aggressive_price"][i] == pytest.approx(single["aggressive_price"], abs=0.01)
+            assert result["composite_adjustment"][i] == pytest.approx(single["composite_adjustment"], abs=1e-4)
+
+    def test_invalid_range(self):
+        engine = self._engine()
+        with pytest.raises(ValueError):
+            engine.calculate_range(
+                base_price=500.0,
+                owner_preference=self.PREF,
+                property_info=self.INFO,
+                start_date=date(2026, 5, 2),
+                end_date=date(2026, 5, 1),
+            )
+
+
+# --------------- Portfolio matrix tests ---------------
+
+class TestCalculateMatrix:
+    def _engine(self):
+        from app.engine.pricing_engine import PricingEngine
+        return PricingEngine()
+
+    def test_rows_match_single_property_range(self):
+        engine = self._engine()
+        today = date(2026, 4, 1)
+        properties = [
+            {
+                "pref": {"min_price": 300.0, "max_price": 900.0, "expected_return_rate": 0.1, "vacancy_tolerance": 0.4},
+                "info": {"room_type": "整套", "area": 120.0},
+                "hist": {
+                    "transactions": [
+                        {"actual_price": 400, "check_in_date": date(2026, 1, 1)},
+                        {"actual_price": 460, "check_in_date": date(2026, 2, 1)},
+                        {"actual_price": 480, "check_in_date": date(2026, 3, 1)},
+                    ],
+                    "feedbacks": [
+                        {"feedback_type": "采纳", "actual_price": 500, "suggested_price": 500},
+                        {"feedback_type": "调整", "actual_price": 550, "suggested_price": 500},
+                    ],
+                },
+                "market": {"similar_avg": 520, "own_avg": 480},
+                "avg_advance": 10.0,
+            },
+            {
+                "pref": {"min_price": 100.0, "max_price": 400.0, "expected_return_rate": 0, "vacancy_tolerance": 0.8},
+                "info": {"room_type": "单间", "area": 20.0},
+                "hist": None,
+                "market": None,
+                "avg_advance": None,
+            },
+        ]
+        table = {
+            "property_id": [1, 2],
+            "base_price": [500.0, 200.0],
+            "room_type": [p["info"]["room_type"] for p in properties],
+            "area": [p["info"]["area"] for p in properties],
+            "min_price": [p["pref"]["min_price"] for p in properties],
+            "max_price": [p["pref"]["max_price"] for p in properties],
+            "expected_return_rate": [p["pref"]["expected_return_rate"] for p in properties],
+            "vacancy_tolerance": [p["pref"]["vacancy_tolerance"] for p in properties],
+            "similar_avg": [520, None],
+            "own_avg": [480, None],
+            "avg_advance_days": [10.0, None],
+        }
+        stats = engine._summarize_historical(properties[0]["hist"])
+        for key, value in stats.items():
+            table[key] = [value, None]
+
+        start, end = date(2026, 4, 28), date(2026, 5, 10)
+        matrix = engine.calculate_matrix(
+            table, np.arange(np.datetime64(start), np.datetime64(end) + 1), today=today
+        )
+        assert matrix["suggested_price"].shape == (2, 13)
+        assert matrix["property_ids"].tolist() == [1, 2]
+
+        for i, prop in enumerate(properties):
+            expected = engine.calculate_range(
+                base_price=table["base_price"][i],
+                owner_preference=prop["pref"],
+                property_info=prop["info"],
+                start_date=start,
+                end_date=end,
+                historical_data=prop["hist"],
+                market_data=prop["market"],
+                avg_advance_days=prop["avg_advance"],
+                today=today,
+            )
+            np.testing.assert_allclose(matrix["suggested_price"][i], expected["suggested_price"], atol=0.01)
+            np.testing.assert_allclose(matrix["conservative_price"][i], expected["conservative_price"], atol=0.01)
+            np.testing.assert_allclose(matrix["aggressive_price"][i], expected["aggressive_price"], atol=0.01)
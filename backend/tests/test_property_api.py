@@ -76,3 +76,96 @@ async def test_delete_property(client):
     # Verify deleted
     get_resp = await client.get(f"/api/v1/property/{property_id}")
     assert get_resp.status_code == 404
+
+
+async def _seed_properties(client):
+    rows = [
+        ("西湖小筑", "杭州市西湖区北山路1号", "整套", 80.0, 300.0, 800.0),
+        ("湖畔雅居", "杭州市西湖区南山路2号", "单间", 25.0, 150.0, 300.0),
+        ("滨江公寓", "杭州市滨江区江南大道3号", "整套", 120.0, None, 1500.0),
+        ("100%_海景", "宁波市象山县4号", "别墅", 300.0, 1200.0, None),
+    ]
+    ids = []
+    for name, address, room_type, area, min_price, max_price in rows:
+        resp = await client.post("/api/v1/property", json={
+            "name": name, "address": address, "room_type": room_type, "area": area,
+            "min_price": min_price, "max_price": max_price,
+        })
+        ids.append(resp.json()["id"])
+    return ids
+
+
+@pytest.mark.asyncio
+async def test_list_properties_filters(client):
+    await _seed_properties(client)
+
+    async def names(**params):
+        resp = await client.get("/api/v1/property", params=params)
+        assert resp.status_code == 200
+        return [p["name"] for p in resp.json()]
+
+    assert len(await names()) == 4
+    assert await names(keyword="西湖") == ["湖畔雅居", "西湖小筑"]
+    assert await names(keyword="滨江") == ["滨江公寓"]
+    # LIKE 通配符按字面匹配
+    assert await names(keyword="%_") == ["100%_海景"]
+    assert await names(room_type="整套") == ["滨江公寓", "西湖小筑"]
+    assert await names(min_area=50, max_area=150) == ["滨江公寓", "西湖小筑"]
+    # 价格区间有交集即命中，未设置的最低/最高价视为不限
+    assert await names(price_from=1000) == ["100%_海景", "滨江公寓"]
+    assert await names(price_to=200) == ["滨江公寓", "湖畔雅居"]
+    assert await names(room_type="整套", price_from=900) == ["滨江公寓"]
+
+
+@pytest.mark.asyncio
+async def test_list_properties_keyset_pagination(client):
+    ids = await _seed_properties(client)
+
+    first = (await client.get("/api/v1/property", params={"limit": 3})).json()
+    assert [p["id"] for p in first] == ids[::-1][:3]
+    rest = (await client.get("/api/v1/property", params={"limit": 3, "after_id": first[-1]["id"]})).json()
+    assert [p["id"] for p in rest] == [ids[0]]
+
+
+@pytest.mark.asyncio
+async def test_property_query_tool_pages(client):
+    """工具只取所需的一页（LIMIT 查询 + COUNT 查询），next_after_id 用于翻页"""
+    import json
+    from sqlalchemy import event
+    from app.tools.context import db_session_var
+    from app.tools.property_tool import property_query
+    from tests.conftest import TestSession, test_engine
+
+    ids = await _seed_properties(client)
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    async def query(**args):
+        message = await property_query.ainvoke({
+            "type": "tool_call", "id": "call-1", "name": "property_query", "args": args,
+        })
+        assert json.loads(message.content)["total"] == message.artifact["total"]
+        return message.artifact
+
+    async with TestSession() as db:
+        token = db_session_var.set(db)
+        event.listen(test_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            first = await query(limit=2)
+            second = await query(limit=2, after_id=first["next_after_id"])
+            filtered = await query(keyword="西湖", room_type="整套")
+        finally:
+            event.remove(test_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+            db_session_var.reset(token)
+
+    assert first["total"] == 4
+    assert [p["id"] for p in first["properties"]] == ids[::-1][:2]
+    assert [p["id"] for p in second["properties"]] == ids[::-1][2:]
+    assert "next_after_id" not in second
+    assert filtered["total"] == 1
+    assert [p["name"] for p in filtered["properties"]] == ["西湖小筑"]
+    assert len(statements) == 6
+    assert all("LIMIT" in s.upper() for s in statements[::2])
+    assert all("count(" in s.lower() for s in statements[1::2])
@@ -0,0 +1,145 @@
+"""查询计划回归测试：对热点服务查询执行 EXPLAIN，出现热点表全表扫描即失败"""
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from app.models.conversation import Conversation, Message
+from app.models.feedback import Feedback
+from app.models.pricing import PricingRecord
+from app.models.property import Property
+from app.models.transaction import Transaction
+from app.services import (
+    conversation_service,
+    feedback_service,
+    pricing_service,
+)
+from tests.conftest import TestSession, test_engine
+
+HOT_TABLES = {"pricing_record", "transaction", "feedback", "message", "conversation"}
+
+
+@contextmanager
+def capture_selects():
+    """记录代码块内执行的所有 SELECT/WITH 语句及参数"""
+    captured: list[tuple[str, tuple]] = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "WITH")):
+            captured.append((statement, parameters))
+
+    event.listen(test_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield captured
+    finally:
+        event.remove(test_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+
+
+async def sequential_scans(statement: str, parameters) -> list[str]:
+    """返回执行计划中对热点表的全表扫描节点"""
+    async with test_engine.connect() as conn:
+        if conn.dialect.name == "postgresql":
+            await conn.exec_driver_sql("SET enable_seqscan = off")
+            result = await conn.exec_driver_sql(f"EXPLAIN {statement}", parameters)
+            return [
+                line for (line,) in result.all()
+                if "Seq Scan on" in line
+                and line.split("Seq Scan on", 1)[1].split()[0].strip('"') in HOT_TABLES
+            ]
+
+        result = await conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)
+        scans = []
+        for row in result.all():
+            detail = row[-1]
+            words = detail.split()
+            if len(words) >= 2 and words[0] == "SCAN" and words[1] in HOT_TABLES and "INDEX" not in detail:
+                scans.append(detail)
+        return scans
+
+
+@pytest.fixture
+async def seeded():
+    async with TestSession() as db:
+        props = [
+            Property(name=f"房源{i}", address="测试", room_type="整套" if i % 2 else "单间", area=40.0 + i * 10)
+            for i in range(5)
+        ]
+        db.add_all(props)
+        await db.flush()
+        for prop in props:
+            for day in range(5):
+                record = PricingRecord(
+                    property_id=prop.id,
+                    target_date=date(2026, 5, 1) + timedelta(days=day),
+                    conservative_price=300.0,
+                    suggested_price=400.0 + day,
+                    aggressive_price=500.0,
+                    calculation_details={},
+                )
+                db.add(record)
+                await db.flush()
+                db.add(Feedback(pricing_record_id=record.id, feedback_type="采纳", actual_price=400.0))
+                db.add(Transaction(
+                    property_id=prop.id,
+                    check_in_date=date(2026, 5, 1) + timedelta(days=day),
+                    actual_price=420.0,
+                    advance_days=7,
+                ))
+        conv = Conversation(title="测试")
+        db.add(conv)
+        await db.flush()
+        for i in range(5):
+            db.add(Message(conversation_id=conv.id, role="user", content=f"消息{i}"))
+        await db.commit()
+        return {"property_id": props[0].id, "property_ids": [p.id for p in props[:3]], "conversation_id": conv.id}
+
+
+async def _assert_index_only(call):
+    with capture_selects() as captured:
+        await call()
+    assert captured, "no SELECT statements were captured"
+    for statement, parameters in captured:
+        scans = await sequential_scans(statement, parameters)
+        assert not scans, f"sequential scan on hot table: {scans}\n{statement}"
+
+
+@pytest.mark.asyncio
+async def test_pricing_factor_query_uses_indexes(seeded):
+    async with TestSession() as db:
+        await _assert_index_only(
+            lambda: pricing_service._fetch_factor_inputs(db, seeded["property_id"])
+        )
+
+
+@pytest.mark.asyncio
+async def test_pricing_batch_queries_use_indexes(seeded):
+    async with TestSession() as db:
+        await _assert_index_only(
+            lambda: pricing_service.calculate_batch(db, [date(2026, 5, 1)], seeded["property_ids"])
+        )
+
+
+@pytest.mark.asyncio
+async def test_pricing_records_query_uses_indexes(seeded):
+    async with TestSession() as db:
+        await _assert_index_only(
+            lambda: pricing_service.list_by_property(db, seeded["property_id"])
+        )
+
+
+@pytest.mark.asyncio
+async def test_feedback_query_uses_indexes(seeded):
+    async with TestSession() as db:
+        await _assert_index_only(
+            lambda: feedback_service.list_by_property(db, seeded["property_id"])
+        )
+
+
+@pytest.mark.asyncio
+async def test_conversation_queries_use_indexes(seeded):
+    async with TestSession() as db:
+        await _assert_index_only(lambda: conversation_service.list_conversations(db))
+        await _assert_index_only(
+            lambda: conversation_service.get_messages(db, seeded["conversation_id"])
+        )
@@ -0,0 +1,105 @@
+import asyncio
+import time
+
+import orjson
+import pytest
+
+from app.services.sse import coalesce_events, format_event
+
+
+def _parse(frame: str) -> tuple[str, dict]:
+    event_line, data_line = frame.strip().split("\n")
+    return event_line.removeprefix("event: "), orjson.loads(data_line.removeprefix("data: "))
+
+
+async def _source(items, delay=0.0):
+    for item in items:
+        if delay:
+            await asyncio.sleep(delay)
+        yield item
+
+
+async def _collect(source, window_ms=30, max_bytes=1024):
+    return [_parse(f) async for f in coalesce_events(source, window_ms, max_bytes)]
+
+
+def test_format_event_keeps_unicode():
+    assert format_event("content", {"content": "你好"}) == 'event: content\ndata: {"content":"你好"}\n\n'
+
+
+@pytest.mark.asyncio
+async def test_burst_is_coalesced_after_leading_chunk():
+    items = [("content", {"content": f"字{i}"}) for i in range(200)]
+    frames = await _collect(_source(items))
+
+    # 首个片段立即发出，其余合并
+    assert frames[0] == ("content", {"content": "字0"})
+    assert len(frames) < 10
+    assert "".join(data["content"] for _, data in frames) == "".join(f"字{i}" for i in range(200))
+
+
+@pytest.mark.asyncio
+async def test_order_preserved_across_event_types():
+    items = [
+        ("thinking", {"content": "想"}),
+        ("thinking", {"content": "一想"}),
+        ("content", {"content": "好"}),
+        ("content", {"content": "的"}),
+        ("pricing", {"suggested_price": 480.0}),
+        ("content", {"content": "。"}),
+        ("done", {"id": 1}),
+    ]
+    frames = await _collect(_source(items))
+
+    assert [event for event, _ in frames] == [
+        "thinking", "thinking", "content", "pricing", "content", "done",
+    ]
+    assert frames[1][1] == {"content": "一想"}
+    assert frames[2][1] == {"content": "好的"}
+
+
+@pytest.mark.asyncio
+async def test_max_bytes_flushes_early():
+    items = [("content", {"content": "a" * 100}) for _ in range(20)]
+    frames = await _collect(_source(items), window_ms=10_000, max_bytes=300)
+
+    assert all(len(data["content"]) <= 300 for _, data in frames[1:])
+    assert sum(len(data["content"]) for _, data in frames) == 2000
+
+
+@pytest.mark.asyncio
+async def test_buffer_flushed_when_upstream_stalls():
+    async def stalling():
+        yield "content", {"content": "一"}
+        yield "content", {"content": "二"}
+        await asyncio.sleep(0.5)
+        yield "done", {}
+
+    arrivals = []
+    start = time.perf_counter()
+    async for frame in coalesce_events(stalling(), 30, 1024):
+        arrivals.append((_parse(frame), time.perf_counter() - start))
+
+    assert arrivals[1][0] == ("content", {"content": "二"})
+    assert arrivals[1][1] < 0.3
+
+
+@pytest.mark.asyncio
+async def test_zero_window_disables_coalescing():
+    items = [("content", {"content": str(i)}) for i in range(5)]
+    frames = await _collect(_source(items), window_ms=0)
+
+    assert len(frames) == 5
+
+
+@pytest.mark.asyncio
+async def test_upstream_error_propagates_after_flush():
+    async def failing():
+        yield "content", {"content": "部分"}
+        raise RuntimeError("boom")
+
+    frames = []
+    with pytest.raises(RuntimeError):
+        async for frame in coalesce_events(failing(), 30, 1024):
+            frames.append(_parse(frame))
+    assert frames == [("content", {"content": "部分"})]
@@ -0,0 +1,141 @@
+import json
+from datetime import date
+
+import pytest
+
+from app.agent.tokens import estimate_tokens
+from app.tools.serialization import (
+    compact,
+    pending_action_view,
+    pricing_range_view,
+    pricing_view,
+    tool_result,
+)
+
+
+def _full_tokens(result: dict) -> int:
+    """原来直接返回 dict 时，LangChain 以 json.dumps(ensure_ascii=False) 转成 ToolMessage 内容"""
+    return estimate_tokens(json.dumps(result, ensure_ascii=False))
+
+
+def _pricing_result(target: date, record_id: int = 1) -> dict:
+    from app.engine.pricing_engine import PricingEngine
+
+    priced = PricingEngine().calculate(
+        base_price=468.0,
+        owner_preference={
+            "min_price": 298.0, "max_price": 1288.0,
+            "expected_return_rate": 0.18, "vacancy_tolerance": 0.25,
+        },
+        property_info={
+            "room_type": "整套", "area": 86.5,
+            "facilities": {"wifi": True, "ac": True, "kitchen": True, "parking": False},
+        },
+        target_date=target,
+        historical_data={
+            "transactions": [{"actual_price": p} for p in (418.0, 436.5, 452.0, 489.0)],
+            "feedbacks": [
+                {"feedback_type": "采纳"},
+                {"feedback_type": "调整", "actual_price": 455.0, "suggested_price": 479.62},
+            ],
+        },
+        market_data={"similar_avg": 503.81, "own_avg": 452.37},
+    )
+    return {
+        "success": True,
+        "pricing_record_id": record_id,
+        "property_id": 3,
+        "target_date": target.isoformat(),
+        "conservative_price": priced["conservative_price"],
+        "suggested_price": priced["suggested_price"],
+        "aggressive_price": priced["aggressive_price"],
+        "calculation_details": priced["calculation_details"],
+    }
+
+
+def test_pricing_view_tokens():
+    result = _pricing_result(date(2026, 10, 3))
+    content, artifact = tool_result(result, pricing_view(result))
+
+    assert artifact is result
+    assert estimate_tokens(content) <= _full_tokens(result) * 0.5
+
+    view = json.loads(content)
+    assert view["prices"] == [
+        round(result["conservative_price"]),
+        round(result["suggested_price"]),
+        round(result["aggressive_price"]),
+    ]
+    # 调整幅度保留 3 位小数，无调整的因素省略
+    details = result["calculation_details"]
+    assert view["factors"]["time"] == [round(details["time_factor"]["adjustment"], 3), details["time_factor"]["weight"]]
+    assert "ext" not in view["factors"]
+
+
+def test_pricing_range_view_tokens():
+    results = [_pricing_result(date(2026, 10, d), record_id=d) for d in range(1, 8)]
+    result = {"success": True, "property_id": 3, "prices": results}
+    content, _ = tool_result(result, pricing_range_view(result))
+
+    assert estimate_tokens(content) <= _full_tokens(result) * 0.3
+    view = json.loads(content)
+    assert view["rows"][0][:2] == ["2026-10-01", 1]
+    assert len(view["rows"]) == 7
+
+
+def test_compact_values():
+    assert compact({"a": 1.0, "b": 2.345, "c": None, "d": [0.5, None]}) == {"a": 1, "b": 2.35, "d": [0.5, None]}
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("tool_name, args, action", [
+    ("property_create", {
+        "name": "西湖小筑", "address": "杭州", "room_type": "整套", "area": 60.0, "min_price": 200.0,
+    }, "create_property"),
+    ("feedback_record", {
+        "pricing_record_id": 3, "feedback_type": "adjusted", "actual_price": 420.0,
+    }, "record_feedback"),
+])
+async def test_pending_action_view_drops_display(tool_name, args, action):
+    """待确认工具送入模型的内容保留 action 与 data，display 只留在 artifact 中供前端展示"""
+    from app.tools.feedback_tool import feedback_record
+    from app.tools.property_tool import property_create
+
+    tools = {"property_create": property_create, "feedback_record": feedback_record}
+    message = await tools[tool_name].ainvoke({
+        "type": "tool_call", "id": "call-1", "name": tool_name, "args": args,
+    })
+
+    content = json.loads(message.content)
+    assert content == pending_action_view(message.artifact)
+    assert "display" not in content
+    assert content["action"] == action
+    assert content["pending_confirmation"] is True
+    assert content["data"] == compact(message.artifact["data"])
+    assert message.artifact["display"]["items"]
+
+
+@pytest.mark.asyncio
+async def test_tool_call_returns_compact_content_and_full_artifact(client):
+    """ToolMessage.content 是紧凑视图，artifact 保留完整结果供 SSE 事件使用"""
+    from app.tools.context import db_session_var
+    from app.tools.property_tool import property_query
+    from tests.conftest import TestSession
+
+    await client.post("/api/v1/property", json={
+        "name": "西湖小筑", "address": "杭州", "room_type": "整套", "area": 60.0, "min_price": 200.0,
+    })
+
+    async with TestSession() as db:
+        token = db_session_var.set(db)
+        try:
+            message = await property_query.ainvoke({
+                "type": "tool_call", "id": "call-1", "name": "property_query", "args": {"property_id": 1},
+            })
+        finally:
+            db_session_var.reset(token)
+
+    view = json.loads(message.content)
+    assert view["property"]["min_price"] == 200
+    assert "description" not in view["property"]
+    assert message.artifact["property"]["description"] is None
@@ -5,8 +5,9 @@ def test_property_tool_schema():
 
 
 def test_pricing_tool_schema():
-    from app.tools.pricing_tool import pricing_calculate_tool
+    from app.tools.pricing_tool import pricing_calculate_range_tool, pricing_calculate_tool
     assert pricing_calculate_tool.name == "pricing_calculate"
+    assert pricing_calculate_range_tool.name == "pricing_calculate_range"
 
 
 def test_feedback_tool_schema():
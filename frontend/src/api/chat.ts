@@ -36,7 +36,17 @@ export function deleteConversation(conversationId: string) {
   })
 }
 
+export interface PriceCalendarDay {
+  pricing_record_id: number
+  target_date: string
+  conservative_price: number
+  suggested_price: number
+  aggressive_price: number
+}
+
 export interface StreamCallbacks {
+  /** 排队等待模型调用，position 从 1 开始 */
+  onQueued?: (position: number) => void
   onThinking?: (chunk: string) => void
   onContent?: (chunk: string) => void
   onAction?: (data: {
@@ -45,13 +55,15 @@ export interface StreamCallbacks {
     display: { title: string; items: Record<string, string> }
     data: Record<string, any>
   }) => void
+  /** 单日定价为一条记录；区间定价合并为一个事件，prices 为逐日价格 */
   onPricing?: (data: {
-    pricing_record_id: number
+    pricing_record_id?: number
     property_id: number
-    target_date: string
-    conservative_price: number
-    suggested_price: number
-    aggressive_price: number
+    target_date?: string
+    conservative_price?: number
+    suggested_price?: number
+    aggressive_price?: number
+    prices?: PriceCalendarDay[]
   }) => void
   onForm?: (data: {
     form_type: string
@@ -65,12 +77,15 @@ export interface StreamCallbacks {
     }>
   }) => void
   onDone?: (data: {
-    id: number
+    /** 服务端开启消息后台写入时为 null，重新加载会话后获得 */
+    id: number | null
     content: string
     thinking: string
     created_at: string
     pending_actions: any[]
   }) => void
+  /** 每个事件的 id，断线后传给 resumeMessageStream 续接 */
+  onEventId?: (id: string) => void
   onError?: (error: Error) => void
   onAbort?: () => void
 }
@@ -82,6 +97,8 @@ async function parseSSEStream(response: Response, callbacks: StreamCallbacks) {
   const reader = response.body!.getReader()
   const decoder = new TextDecoder()
   let buffer = ''
+  // 服务端以 error 事件结束流（如排队超时）
+  let streamError: Error | null = null
 
   while (true) {
     const { done, value } = await reader.read()
@@ -93,11 +110,14 @@ async function parseSSEStream(response: Response, callbacks: StreamCallbacks) {
     const lines = buffer.split('\n')
     buffer = ''
 
+    let currentId = ''
     let currentEvent = ''
     let currentData = ''
 
     for (const line of lines) {
-      if (line.startsWith('event: ')) {
+      if (line.startsWith('id: ')) {
+        currentId = line.slice(4).trim()
+      } else if (line.startsWith('event: ')) {
         currentEvent = line.slice(7).trim()
       } else if (line.startsWith('data: ')) {
         currentData = line.slice(6)
@@ -105,7 +125,9 @@ async function parseSSEStream(response: Response, callbacks: StreamCallbacks) {
         // Empty line = end of event
         try {
           const parsed = JSON.parse(currentData)
-          if (currentEvent === 'thinking' && callbacks.onThinking) {
+          if (currentEvent === 'queued' && callbacks.onQueued) {
+            callbacks.onQueued(parsed.position)
+          } else if (currentEvent === 'thinking' && callbacks.onThinking) {
             callbacks.onThinking(parsed.content)
           } else if (currentEvent === 'content' && callbacks.onContent) {
             callbacks.onContent(parsed.content)
@@ -117,10 +139,14 @@ async function parseSSEStream(response: Response, callbacks: StreamCallbacks) {
             callbacks.onForm(parsed)
           } else if (currentEvent === 'done' && callbacks.onDone) {
             callbacks.onDone(parsed)
+          } else if (currentEvent === 'error') {
+            streamError = new Error(parsed.message)
           }
         } catch {
           // Ignore parse errors for incomplete chunks
         }
+        if (currentId) callbacks.onEventId?.(currentId)
+        currentId = ''
         currentEvent = ''
         currentData = ''
       } else if (line !== '') {
@@ -129,6 +155,7 @@ async function parseSSEStream(response: Response, callbacks: StreamCallbacks) {
       }
     }
   }
+  if (streamError) throw streamError
 }
 
 /**
@@ -136,21 +163,24 @@ async function parseSSEStream(response: Response, callbacks: StreamCallbacks) {
  */
 function fetchSSEStream(
   url: string,
-  body: Record<string, any>,
+  body: Record<string, any> | null,
   callbacks: StreamCallbacks,
+  headers: Record<string, string> = {},
 ): AbortController {
   const controller = new AbortController()
   const baseUrl = getBaseUrl()
 
   fetch(`${baseUrl}${url}`, {
-    method: 'POST',
-    headers: { 'Content-Type': 'application/json' },
-    body: JSON.stringify(body),
+    method: body ? 'POST' : 'GET',
+    headers: body ? { 'Content-Type': 'application/json', ...headers } : headers,
+    body: body ? JSON.stringify(body) : undefined,
     signal: controller.signal,
   })
     .then(async (response) => {
       if (!response.ok) {
-        throw new Error(`Stream request failed: ${response.status}`)
+        // 409 会话正在生成 / 503 排队已满时，后端在 detail 中给出提示
+        const detail = await response.json().then((r) => r.detail).catch(() => null)
+        throw new Error(detail || `Stream request failed: ${response.status}`)
       }
       await parseSSEStream(response, callbacks)
     })
@@ -210,3 +240,19 @@ export function regenerateMessageStream(
     callbacks,
   )
 }
+
+/**
+ * 断线重连 (SSE) — 按最后收到的事件 id 续接，服务端重放错过的事件后继续推送，不会重新生成
+ */
+export function resumeMessageStream(
+  conversationId: string,
+  lastEventId: string,
+  callbacks: StreamCallbacks,
+): AbortController {
+  return fetchSSEStream(
+    `/chat/conversations/${conversationId}/messages/stream/resume`,
+    null,
+    callbacks,
+    { 'Last-Event-ID': lastEventId },
+  )
+}
@@ -7,6 +7,8 @@ export interface ChatMessage {
   role: string
   content: string
   thinking?: string
+  // 排队等待模型调用时的位置
+  queuePosition?: number
   created_at: string
   // 消息附带的结构化数据
   pricing?: {
@@ -15,6 +17,11 @@ export interface ChatMessage {
     suggested_price: number
     aggressive_price: number
   }
+  // 区间定价的逐日价格
+  pricingCalendar?: {
+    property_id: number
+    prices: chatApi.PriceCalendarDay[]
+  }
   // 内联表单数据
   form?: {
     form_type: string
@@ -60,21 +67,36 @@ export const useChatStore = defineStore('chat', () => {
    */
   function _createStreamCallbacks(assistantIdx: number, resolve: () => void, reject: (err: Error) => void): chatApi.StreamCallbacks {
     return {
+      onQueued: (position) => {
+        const msg = messages.value[assistantIdx]
+        if (msg) msg.queuePosition = position
+      },
       onThinking: (chunk) => {
         thinking.value = true
         const msg = messages.value[assistantIdx]
-        if (msg) msg.thinking = (msg.thinking || '') + chunk
+        if (msg) {
+          msg.queuePosition = undefined
+          msg.thinking = (msg.thinking || '') + chunk
+        }
       },
       onContent: (chunk) => {
         thinking.value = false
         const msg = messages.value[assistantIdx]
-        if (msg) msg.content += chunk
+        if (msg) {
+          msg.queuePosition = undefined
+          msg.content += chunk
+        }
       },
       onAction: (data) => {
         pendingAction.value = data
       },
       onPricing: (data) => {
-        pricingResult.value = data
+        if (data.prices) {
+          const msg = messages.value[assistantIdx]
+          if (msg) msg.pricingCalendar = { property_id: data.property_id, prices: data.prices }
+          return
+        }
+        pricingResult.value = data as typeof pricingResult.value
       },
       onForm: (data) => {
         const msg = messages.value[assistantIdx]
@@ -88,7 +110,7 @@ export const useChatStore = defineStore('chat', () => {
         abortController.value = null
         const msg = messages.value[assistantIdx]
         if (msg) {
-          msg.id = data.id
+          msg.id = data.id ?? undefined
           msg.content = data.content
           msg.thinking = data.thinking
           msg.created_at = data.created_at
@@ -112,7 +134,10 @@ export const useChatStore = defineStore('chat', () => {
         loading.value = false
         abortController.value = null
         const msg = messages.value[assistantIdx]
-        if (msg) msg.content = `发送失败：${err.message}`
+        if (msg) {
+          msg.queuePosition = undefined
+          msg.content = `发送失败：${err.message}`
+        }
         error.value = err.message
         reject(err)
       },